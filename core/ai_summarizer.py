@@ -1,48 +1,36 @@
 import logging
 import json
 import os
+import time
 from typing import List, Dict, Any, Optional
-import ollama
+
+from core.model_registry import ModelRegistry, DEFAULT_MODEL
+from core.metrics import OLLAMA_LATENCY, OLLAMA_TOKENS_PER_SECOND
 
 logger = logging.getLogger(__name__)
 
 class AISummarizer:
-    def __init__(self, model: str = "llama2"):
-        self.model = self._validate_model(model)
+    def __init__(self, model: str = DEFAULT_MODEL, registry: Optional[ModelRegistry] = None):
+        # The shared registry lists models in the background, so construction never waits on Ollama
+        self.registry = registry or ModelRegistry()
+        self.requested_model = model
     
-    def _validate_model(self, model: str) -> str:
-        """Validate and return a valid model name"""
-        try:
-            # Get list of available models
-            models = ollama.list()
-            available_models = [m['name'] for m in models['models']]
-            
-            # If model exists, use it
-            if model in available_models:
-                return model
-            
-            # If model doesn't exist, try to find a close match
-            for available_model in available_models:
-                if model.lower() in available_model.lower():
-                    logger.info(f"Using model {available_model} instead of {model}")
-                    return available_model
-            
-            # If no match found, use first available model
-            if available_models:
-                default_model = available_models[0]
-                logger.warning(f"Model {model} not found. Using {default_model} instead")
-                return default_model
-            
-            # If no models available, use llama2 as default
-            logger.warning("No models found. Using llama2 as default")
-            return "llama2"
-        except Exception as e:
-            logger.error(f"Error validating model: {e}")
-            return "llama2"
+    def set_model(self, model: str) -> None:
+        """Use a different model from the next summarization on"""
+        if model != self.requested_model:
+            logger.info(f"AI model changed to {model}")
+            self.requested_model = model
+    
+    @property
+    def model(self) -> str:
+        """The installed model used for the configured name"""
+        return self.registry.resolve(self.requested_model)
     
     def summarize(self, emails: List[Dict[str, Any]], prompt: str) -> str:
         """Summarize a list of emails using Ollama"""
         try:
+            import ollama
+            
             # Format emails for the prompt
             email_text = self._format_emails_for_prompt(emails)
             
@@ -50,8 +38,10 @@ class AISummarizer:
             full_prompt = f"{prompt}\n\n{email_text}"
             
             # Call Ollama API
+            model = self.model
+            started = time.perf_counter()
             response = ollama.chat(
-                model=self.model,
+                model=model,
                 messages=[
                     {
                         "role": "user",
@@ -59,9 +49,14 @@ class AISummarizer:
                     }
                 ]
             )
+            OLLAMA_LATENCY.observe(time.perf_counter() - started)
+            
+            # Generation speed as reported by Ollama (durations are in nanoseconds)
+            if response.get('eval_count') and response.get('eval_duration'):
+                OLLAMA_TOKENS_PER_SECOND.observe(response['eval_count'] / (response['eval_duration'] / 1e9))
             
             summary = response['message']['content']
-            logger.info(f"Generated summary of {len(emails)} emails using model {self.model}")
+            logger.info(f"Generated summary of {len(emails)} emails using model {model}")
             return summary
         except Exception as e:
             logger.error(f"Error summarizing emails: {e}")
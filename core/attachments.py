@@ -0,0 +1,113 @@
+import os
+import hashlib
+import mimetypes
+import threading
+import logging
+from collections import OrderedDict
+from typing import Dict, List, Tuple, Union
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_ATTACHMENT_BYTES = 20 * 1024 * 1024  # Per file; most servers reject messages over 25 MB
+DEFAULT_CACHE_BYTES = 200 * 1024 * 1024
+
+class AttachmentError(Exception):
+    """An attachment is missing, unreadable or too large"""
+
+class PreparedAttachment:
+    """An attachment read, checked and hashed once, then reused for every recipient"""
+
+    __slots__ = ("path", "filename", "size", "digest", "content_type", "data")
+
+    def __init__(self, path: str, data: bytes, digest: str):
+        self.path = path
+        self.filename = os.path.basename(path)
+        self.size = len(data)
+        self.digest = digest
+        self.content_type = mimetypes.guess_type(path)[0] or "application/octet-stream"
+        self.data = data
+
+# Transports accept prepared attachments or plain file paths
+Attachment = Union[PreparedAttachment, str]
+
+def attachment_path(attachment: Attachment) -> str:
+    """Return the file an attachment came from"""
+    return attachment.path if isinstance(attachment, PreparedAttachment) else attachment
+
+class AttachmentCache:
+    """Attachments of recent runs, held in memory by content hash.
+
+    ``prepare`` resolves and validates a task's attachment paths before
+    anything is sent, so a missing or oversized file fails the run up
+    front instead of once per recipient. A file is only read again when
+    its size or modification time changes, and identical content is kept
+    once. Least recently used content is dropped beyond ``max_bytes``.
+    """
+
+    def __init__(self, max_bytes: int = DEFAULT_CACHE_BYTES,
+                 max_attachment_bytes: int = DEFAULT_MAX_ATTACHMENT_BYTES):
+        self.max_bytes = max_bytes
+        self.max_attachment_bytes = max_attachment_bytes
+        self._files: Dict[Tuple[str, int, int], str] = {}  # (path, size, mtime) -> digest
+        self._content: "OrderedDict[str, PreparedAttachment]" = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def prepare(self, paths: List[str]) -> Tuple[List[PreparedAttachment], int]:
+        """Return the prepared attachments and the bytes read from disk to prepare them"""
+        prepared = []
+        read = 0
+        for path in paths:
+            if not path:
+                continue
+            attachment, nbytes = self._prepare_one(path)
+            prepared.append(attachment)
+            read += nbytes
+        return prepared, read
+
+    def _prepare_one(self, path: str) -> Tuple[PreparedAttachment, int]:
+        path = os.path.abspath(path)
+        try:
+            stat = os.stat(path)
+        except OSError as e:
+            raise AttachmentError(f"Attachment not found: {path} ({e.strerror})")
+        if not os.path.isfile(path):
+            raise AttachmentError(f"Attachment is not a file: {path}")
+        if self.max_attachment_bytes and stat.st_size > self.max_attachment_bytes:
+            raise AttachmentError(
+                f"Attachment {path} is {stat.st_size / 1048576:.1f} MB; "
+                f"the limit is {self.max_attachment_bytes / 1048576:.0f} MB"
+            )
+
+        key = (path, stat.st_size, stat.st_mtime_ns)
+        with self._lock:
+            digest = self._files.get(key)
+            if digest is not None and digest in self._content:
+                self._content.move_to_end(digest)
+                cached = self._content[digest]
+                if cached.path == path:
+                    return cached, 0
+                return PreparedAttachment(path, cached.data, digest), 0
+
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+        except OSError as e:
+            raise AttachmentError(f"Cannot read attachment {path}: {e.strerror}")
+        digest = hashlib.sha256(data).hexdigest()
+        attachment = PreparedAttachment(path, data, digest)
+
+        with self._lock:
+            self._files[key] = digest
+            if digest not in self._content:
+                self._content[digest] = attachment
+                self._size += attachment.size
+                self._evict()
+        return attachment, len(data)
+
+    def _evict(self) -> None:
+        while self._size > self.max_bytes and len(self._content) > 1:
+            digest, attachment = self._content.popitem(last=False)
+            self._size -= attachment.size
+            for key in [key for key, value in self._files.items() if value == digest]:
+                del self._files[key]
@@ -0,0 +1,374 @@
+"""Run the scheduler without the GUI, and inspect tasks, logs and results.
+
+Usage:
+    python -m core.daemon run [--pidfile data/daemon.pid]
+    python -m core.daemon list
+    python -m core.daemon run-task TASK_ID
+    python -m core.daemon tail [-n 20] [-f] [--level LEVEL] [--task TASK_ID]
+    python -m core.daemon export-results TASK_ID [--format csv|json] [-o FILE]
+    python -m core.daemon suppress add|remove|check [EMAIL ...] [--file FILE] [--reason REASON]
+    python -m core.daemon dry-run TASK_ID [--format jsonl|mbox] [-o FILE] [--processes N] [--json]
+
+``run``, ``run-task`` and the GUI take the pidfile as a single-owner lock
+on the data directory, so only one process schedules and runs tasks and
+writes the event log. Nothing here imports Qt. ``list``, ``tail``,
+``export-results`` and ``dry-run`` open storage read-only, so they are
+safe to use while the daemon or the GUI is running; ``dry-run`` renders
+a task's emails to a file and never sends anything.
+"""
+import os
+import sys
+import csv
+import json
+import signal
+import argparse
+import threading
+import logging
+from typing import Dict, List, Any, Optional, Tuple
+
+from core.storage_backend import create_storage_backend, StorageBackend
+
+logger = logging.getLogger(__name__)
+
+DATA_DIR = "data"
+DEFAULT_PIDFILE = os.path.join(DATA_DIR, "daemon.pid")
+
+def load_settings() -> Dict[str, Any]:
+    """Read data/settings.json, or return an empty dict"""
+    try:
+        with open(os.path.join(DATA_DIR, "settings.json"), "r") as f:
+            return json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return {}
+
+def open_storage_read_only() -> StorageBackend:
+    """Open the configured storage backend for reading only"""
+    return create_storage_backend(load_settings().get("storage_backend", "json"), DATA_DIR, read_only=True)
+
+def pid_alive(pid: int) -> bool:
+    """Return True if a process with this pid is running"""
+    if pid <= 0:
+        return False
+    if os.name == "nt":
+        # os.kill would terminate the process on Windows
+        import ctypes
+        kernel32 = ctypes.windll.kernel32
+        handle = kernel32.OpenProcess(0x1000, False, pid)  # PROCESS_QUERY_LIMITED_INFORMATION
+        if not handle:
+            return False
+        try:
+            exit_code = ctypes.c_ulong()
+            kernel32.GetExitCodeProcess(handle, ctypes.byref(exit_code))
+            return exit_code.value == 259  # STILL_ACTIVE
+        finally:
+            kernel32.CloseHandle(handle)
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+def read_pidfile(path: str) -> Optional[Tuple[int, str]]:
+    """Return (pid, owner) of the running process recorded in ``path``, if any"""
+    try:
+        with open(path, "r") as f:
+            fields = f.read().split()
+        pid = int(fields[0])
+    except (OSError, ValueError, IndexError):
+        return None
+    owner = fields[1] if len(fields) > 1 else "daemon"
+    return (pid, owner) if pid_alive(pid) else None
+
+def write_pidfile(path: str, owner: str = "daemon") -> None:
+    """Record this process as the owner of the data directory; fails if another process owns it"""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    for _ in range(3):
+        try:
+            fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL)
+        except FileExistsError:
+            running = read_pidfile(path)
+            if running is not None:
+                raise RuntimeError(f"The {running[1]} (pid {running[0]}) already owns the data directory ({path})")
+            # Left behind by a process that did not exit cleanly
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                pass
+            continue
+        with os.fdopen(fd, "w") as f:
+            f.write(f"{os.getpid()} {owner}")
+        return
+    raise RuntimeError(f"Could not take the data directory lock {path}")
+
+def remove_pidfile(path: str) -> None:
+    """Remove ``path`` if it still belongs to this process"""
+    try:
+        with open(path, "r") as f:
+            fields = f.read().split()
+        if not fields or fields[0] != str(os.getpid()):
+            return
+        os.unlink(path)
+    except OSError:
+        pass
+
+def run_daemon(pidfile: str) -> int:
+    """Run scheduling and execution until SIGINT/SIGTERM"""
+    from core.task_manager import TaskManager
+
+    write_pidfile(pidfile)
+    stop = threading.Event()
+
+    def request_stop(signum, frame):
+        logger.info(f"Received signal {signum}; shutting down")
+        stop.set()
+
+    signal.signal(signal.SIGINT, request_stop)
+    signal.signal(signal.SIGTERM, request_stop)
+    if hasattr(signal, "SIGBREAK"):
+        signal.signal(signal.SIGBREAK, request_stop)
+
+    task_manager = None
+    try:
+        task_manager = TaskManager()
+        task_manager.start_scheduler()
+        task_manager.log_event("Scheduler daemon started")
+        logger.info(f"Scheduler daemon running (pid {os.getpid()})")
+
+        # Wake up regularly so signals are handled promptly on every platform
+        while not stop.wait(1.0):
+            pass
+
+        task_manager.log_event("Scheduler daemon stopped")
+        return 0
+    finally:
+        if task_manager is not None:
+            task_manager.close()
+        remove_pidfile(pidfile)
+
+def run_task(task_id: str, pidfile: str) -> int:
+    """Run one task now on this thread and wait for it to finish"""
+    try:
+        write_pidfile(pidfile, "run-task")
+    except RuntimeError as e:
+        logger.error(f"{e}; stop it before running tasks here")
+        return 1
+
+    task_manager = None
+    try:
+        from core.task_manager import TaskManager
+
+        task_manager = TaskManager()
+        task = task_manager.get_task(task_id)
+        if not task:
+            logger.error(f"Task {task_id} not found")
+            return 1
+        success = task_manager.run_task_now(task_id, wait=True)
+        print(f"Task '{task['name']}' {'completed' if success else 'failed'}")
+        return 0 if success else 1
+    finally:
+        if task_manager is not None:
+            task_manager.close()
+        remove_pidfile(pidfile)
+
+def list_tasks() -> int:
+    """Print all tasks"""
+    storage = open_storage_read_only()
+    try:
+        tasks = storage.tasks.all()
+    finally:
+        storage.close()
+
+    if not tasks:
+        print("No tasks")
+        return 0
+    print(f"{'ID':36}  {'ACTIVE':6}  {'RECURRENCE':10}  {'NEXT RUN':19}  NAME")
+    for task in tasks:
+        print(f"{task['id']:36}  {'yes' if task.get('active', True) else 'no':6}  "
+              f"{task.get('recurrence', 'once'):10}  {task.get('next_run', '')[:19]:19}  {task.get('name', '')}")
+    return 0
+
+def _format_event(entry: Dict[str, Any]) -> str:
+    return f"{entry.get('timestamp', '')[:19]}  {entry.get('level', 'info').upper():7}  {entry.get('message', '')}"
+
+def tail_logs(lines: int, follow: bool, level: Optional[str], task_id: Optional[str]) -> int:
+    """Print the latest events, then optionally keep printing new ones"""
+    storage = open_storage_read_only()
+    stop = threading.Event()
+    try:
+        entries, _ = storage.events.query(level=level, task_id=task_id, limit=lines)
+        for entry in reversed(entries):
+            print(_format_event(entry))
+        if not follow:
+            return 0
+
+        sys.stdout.flush()
+        for entry in storage.events.follow(stop):
+            if level and entry.get("level") != level:
+                continue
+            if task_id and entry.get("task_id") != task_id:
+                continue
+            print(_format_event(entry), flush=True)
+        return 0
+    except KeyboardInterrupt:
+        return 0
+    finally:
+        stop.set()
+        storage.close()
+
+def export_results(task_id: str, output_format: str, output: Optional[str]) -> int:
+    """Write a task's stored results as CSV or JSON"""
+    storage = open_storage_read_only()
+    try:
+        task = storage.tasks.get(task_id)
+        if not task:
+            logger.error(f"Task {task_id} not found")
+            return 1
+        storage_path = task.get("storage_path") or f"data/summaries/{task_id}"
+        results = storage.results.get(storage_path)
+    finally:
+        storage.close()
+
+    stream = open(output, "w", encoding="utf-8", newline="") if output else sys.stdout
+    try:
+        if output_format == "json":
+            json.dump(results, stream, indent=2, ensure_ascii=False)
+            stream.write("\n")
+        else:
+            writer = csv.writer(stream)
+            writer.writerow(["timestamp", "task_name", "emails", "summary"])
+            for result in results:
+                writer.writerow([result.get("timestamp", ""), result.get("task_name", ""),
+                                 len(result.get("emails", [])), result.get("summary", "")])
+    finally:
+        if output:
+            stream.close()
+    if output:
+        print(f"Exported {len(results)} results to {output}")
+    return 0
+
+def manage_suppressions(action: str, emails: List[str], file: Optional[str], reason: str) -> int:
+    """Add, remove or look up addresses on the suppression list"""
+    from core.recipient_filter import SuppressionList, DEFAULT_SUPPRESSION_FILE, normalize_email
+
+    emails = list(emails)
+    if file:
+        # One address per line
+        with open(file, "r", encoding="utf-8") as f:
+            emails.extend(line.strip() for line in f if line.strip())
+    if not emails:
+        logger.error("No email addresses given")
+        return 1
+
+    suppressions = SuppressionList(DEFAULT_SUPPRESSION_FILE)
+    changed = 0
+    for email in emails:
+        if action == "add":
+            changed += suppressions.add(email, reason)
+        elif action == "remove":
+            changed += suppressions.remove(email)
+        else:
+            normalized = normalize_email(email)
+            found = suppressions.reason(normalized) if normalized else None
+            print(f"{email}: {'suppressed (' + found + ')' if found else 'not suppressed'}")
+    if action == "add":
+        print(f"Suppressed {changed} new address(es); {len(suppressions)} in total")
+    elif action == "remove":
+        print(f"Removed {changed} address(es); {len(suppressions)} in total")
+    return 0
+
+def dry_run_task(task_id: str, output_format: str, output: Optional[str], processes: Optional[int],
+                 as_json: bool) -> int:
+    """Render every email of a task to a file and print the report"""
+    from core.dry_run import dry_run
+    from core.recipient_cache import RecipientCache, DEFAULT_CACHE_DIR
+    from core.recipient_filter import SuppressionList, DEFAULT_SUPPRESSION_FILE
+
+    storage = open_storage_read_only()
+    try:
+        task = storage.tasks.get(task_id)
+    finally:
+        storage.close()
+    if not task:
+        logger.error(f"Task {task_id} not found")
+        return 1
+
+    cache_mb = load_settings().get("recipient_cache_mb", 256)
+    cache = RecipientCache(DEFAULT_CACHE_DIR, cache_mb * 1024 * 1024) if cache_mb else None
+    report = dry_run(task, output, output_format, processes, cache, SuppressionList(DEFAULT_SUPPRESSION_FILE))
+    if as_json:
+        print(json.dumps(report.to_dict(), indent=2))
+    else:
+        print(report.summary())
+    return 0
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m core.daemon",
+                                     description="Headless scheduler and command-line tools")
+    subcommands = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = subcommands.add_parser("run", help="Run the scheduler until interrupted")
+    run_parser.add_argument("--pidfile", default=DEFAULT_PIDFILE, help=f"Pidfile (default: {DEFAULT_PIDFILE})")
+
+    subcommands.add_parser("list", help="List tasks")
+
+    run_task_parser = subcommands.add_parser("run-task", help="Run a task now and wait for it")
+    run_task_parser.add_argument("task_id")
+    run_task_parser.add_argument("--pidfile", default=DEFAULT_PIDFILE, help=f"Pidfile (default: {DEFAULT_PIDFILE})")
+
+    tail_parser = subcommands.add_parser("tail", help="Show the latest log events")
+    tail_parser.add_argument("-n", "--lines", type=int, default=20, help="Number of events (default: 20)")
+    tail_parser.add_argument("-f", "--follow", action="store_true", help="Keep printing new events")
+    tail_parser.add_argument("--level", choices=["info", "warning", "error"], help="Only events of this level")
+    tail_parser.add_argument("--task", dest="task_id", help="Only events of this task")
+
+    export_parser = subcommands.add_parser("export-results", help="Export a task's stored results")
+    export_parser.add_argument("task_id")
+    export_parser.add_argument("--format", dest="output_format", choices=["csv", "json"], default="csv")
+    export_parser.add_argument("-o", "--output", help="Output file (default: stdout)")
+
+    suppress_parser = subcommands.add_parser("suppress", help="Manage addresses that are never sent to")
+    suppress_parser.add_argument("action", choices=["add", "remove", "check"])
+    suppress_parser.add_argument("emails", nargs="*", metavar="EMAIL")
+    suppress_parser.add_argument("--file", help="Read addresses from a file, one per line")
+    suppress_parser.add_argument("--reason", choices=["bounce", "opt-out", "manual"], default="manual")
+
+    dry_run_parser = subcommands.add_parser("dry-run", help="Render a task's emails to a file without sending")
+    dry_run_parser.add_argument("task_id")
+    dry_run_parser.add_argument("--format", dest="output_format", choices=["jsonl", "mbox"], default="jsonl")
+    dry_run_parser.add_argument("-o", "--output",
+                                help="Output file, gzip-compressed if it ends in .gz (default: data/dry_runs/<task>-<time>.<format>.gz)")
+    dry_run_parser.add_argument("--processes", type=int, help="Rendering processes (default: one per CPU)")
+    dry_run_parser.add_argument("--json", dest="as_json", action="store_true", help="Print the report as JSON")
+
+    args = parser.parse_args(argv)
+
+    if args.command in ("run", "run-task"):
+        from core.logger import setup_logger
+        from dotenv import load_dotenv
+        load_dotenv()  # SMTP_PASSWORD, as for the GUI
+        setup_logger()
+    else:
+        logging.basicConfig(level=logging.WARNING, format="%(levelname)s - %(message)s")
+
+    try:
+        if args.command == "run":
+            return run_daemon(args.pidfile)
+        if args.command == "run-task":
+            return run_task(args.task_id, args.pidfile)
+        if args.command == "list":
+            return list_tasks()
+        if args.command == "tail":
+            return tail_logs(args.lines, args.follow, args.level, args.task_id)
+        if args.command == "suppress":
+            return manage_suppressions(args.action, args.emails, args.file, args.reason)
+        if args.command == "dry-run":
+            return dry_run_task(args.task_id, args.output_format, args.output, args.processes, args.as_json)
+        return export_results(args.task_id, args.output_format, args.output)
+    except (RuntimeError, ValueError, OSError) as e:
+        logger.error(str(e))
+        return 1
+
+if __name__ == "__main__":
+    sys.exit(main())
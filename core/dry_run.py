@@ -0,0 +1,244 @@
+import os
+import re
+import json
+import base64
+import zlib
+import time
+import array
+import datetime
+import itertools
+import logging
+from collections import Counter, deque
+from concurrent.futures import ProcessPoolExecutor
+from email.header import Header
+from typing import Dict, List, Any, Optional, Iterable, Iterator, Tuple
+
+from core.templating import Template, run_context
+from core.recipients import RecipientSource
+from core.recipient_cache import RecipientCache
+from core.recipient_filter import RecipientFilter, SuppressionList
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_DRY_RUN_DIR = os.path.join("data", "dry_runs")
+OUTPUT_FORMATS = ("jsonl", "mbox")
+CHUNK_SIZE = 5000  # Recipients rendered per worker task
+COMPRESS_LEVEL = 3  # Fast gzip; rendered emails compress well even so
+
+# mboxrd: "From " at the start of a body line (after any ">") gets one more ">"
+_FROM_LINE = re.compile(r"^(>*From )", re.MULTILINE)
+
+# (encoded messages, message sizes, missing placeholder counts, messages)
+ChunkResult = Tuple[bytes, bytes, Dict[str, int], int]
+
+class DryRunReport:
+    """What a dry run rendered: counts, throughput, missing placeholders and message sizes"""
+
+    def __init__(self, task_name: str, path: str, output_format: str):
+        self.task_name = task_name
+        self.path = path
+        self.output_format = output_format
+        self.messages = 0
+        self.seconds = 0.0
+        self.bytes_written = 0
+        self.processes = 1
+        self.removed: Dict[str, int] = {}
+        self.missing: Counter = Counter()  # Placeholder -> messages where it had no value
+        self.sizes = array.array("I")  # Rendered subject + body, in bytes
+
+    @property
+    def rate(self) -> float:
+        """Messages rendered per second"""
+        return self.messages / self.seconds if self.seconds else 0.0
+
+    def size_percentiles(self) -> Dict[str, int]:
+        """Return min, p50, p90, p99 and max message size"""
+        if not self.sizes:
+            return {}
+        sizes = sorted(self.sizes)
+        last = len(sizes) - 1
+        return {
+            "min": sizes[0],
+            "p50": sizes[last * 50 // 100],
+            "p90": sizes[last * 90 // 100],
+            "p99": sizes[last * 99 // 100],
+            "max": sizes[-1],
+        }
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "task_name": self.task_name,
+            "path": self.path,
+            "format": self.output_format,
+            "messages": self.messages,
+            "seconds": round(self.seconds, 3),
+            "messages_per_second": round(self.rate, 1),
+            "processes": self.processes,
+            "bytes_written": self.bytes_written,
+            "removed": {reason: count for reason, count in self.removed.items() if count},
+            "missing": dict(self.missing.most_common()),
+            "message_bytes": self.size_percentiles(),
+        }
+
+    def summary(self) -> str:
+        """Return the report as text"""
+        lines = [
+            f"Rendered {self.messages} emails for task '{self.task_name}' in {self.seconds:.1f}s "
+            f"({self.rate * 60:,.0f} per minute, {self.processes} process(es))",
+            f"Written to {self.path} ({self.bytes_written / 1048576:.1f} MB)",
+        ]
+        removed = {reason: count for reason, count in self.removed.items() if count}
+        if removed:
+            lines.append("Skipped: " + ", ".join(f"{count} {reason}" for reason, count in removed.items()))
+        if self.missing:
+            lines.append("Missing placeholders:")
+            for name, count in self.missing.most_common():
+                lines.append(f"  {{{name}}}: {count} emails")
+        else:
+            lines.append("Missing placeholders: none")
+        sizes = self.size_percentiles()
+        if sizes:
+            lines.append("Email size (bytes): " + ", ".join(f"{key} {value:,}" for key, value in sizes.items()))
+        return "\n".join(lines)
+
+class _Renderer:
+    """Renders chunks of recipients to encoded output; sent once to each worker process"""
+
+    def __init__(self, subject: Template, body: Template, context: Dict[str, Any],
+                 output_format: str, compress: bool):
+        self.subject = subject
+        self.body = body
+        self.context = context
+        self.output_format = output_format
+        self.compress = compress
+        self.from_line = "From dry-run@localhost " + time.asctime() + "\n"
+
+    def render(self, rows: List[Dict[str, Any]]) -> ChunkResult:
+        """Render and encode one chunk; compressed chunks are complete gzip members"""
+        subject_template, body_template, context = self.subject, self.body, self.context
+        encode = self._jsonl if self.output_format == "jsonl" else self._mbox
+        sizes = array.array("I")
+        missing_counts: Counter = Counter()
+        out = []
+        for recipient in rows:
+            missing = []
+            subject = subject_template.render(recipient, context, missing)
+            body = body_template.render(recipient, context, missing)
+            if missing:
+                missing = list(dict.fromkeys(missing))
+                missing_counts.update(missing)
+            sizes.append(len(subject.encode("utf-8")) + len(body.encode("utf-8")))
+            out.append(encode(recipient["email"], subject, body, missing))
+
+        data = "".join(out).encode("utf-8")
+        if self.compress:
+            compressor = zlib.compressobj(COMPRESS_LEVEL, zlib.DEFLATED, 31)  # 31: gzip container
+            data = compressor.compress(data) + compressor.flush()
+        return data, sizes.tobytes(), dict(missing_counts), len(rows)
+
+    @staticmethod
+    def _jsonl(email: str, subject: str, body: str, missing: List[str]) -> str:
+        record = {"to": email, "subject": subject, "body": body}
+        if missing:
+            record["missing"] = missing
+        return json.dumps(record, ensure_ascii=False) + "\n"
+
+    def _mbox(self, email: str, subject: str, body: str, missing: List[str]) -> str:
+        if not subject.isascii():
+            subject = _encode_header(subject)
+        headers = [f"To: {email}", f"Subject: {subject}", "MIME-Version: 1.0",
+                   "Content-Type: text/html; charset=utf-8", "Content-Transfer-Encoding: 8bit"]
+        if missing:
+            headers.append("X-Missing-Placeholders: " + ", ".join(missing))
+        return self.from_line + "\n".join(headers) + "\n\n" + _FROM_LINE.sub(r">\1", body) + "\n\n"
+
+def _encode_header(value: str) -> str:
+    """RFC 2047-encode a header value; short values skip the (slow) email.header machinery"""
+    encoded = value.encode("utf-8")
+    if len(encoded) <= 45:  # Fits one 75-character encoded word
+        return "=?utf-8?b?" + base64.b64encode(encoded).decode("ascii") + "?="
+    return Header(value, "utf-8").encode()
+
+_worker_renderer: Optional[_Renderer] = None
+
+def _init_worker(renderer: _Renderer) -> None:
+    global _worker_renderer
+    _worker_renderer = renderer
+
+def _render_in_worker(rows: List[Dict[str, Any]]) -> ChunkResult:
+    return _worker_renderer.render(rows)
+
+def _chunks(recipients: Iterable[Dict[str, Any]], size: int) -> Iterator[List[Dict[str, Any]]]:
+    chunk = []
+    for recipient in recipients:
+        chunk.append(recipient)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+def default_output_path(task: Dict[str, Any], output_format: str) -> str:
+    """Return data/dry_runs/<task id>-<timestamp>.<format>.gz"""
+    stamp = datetime.datetime.now().strftime("%Y%m%dT%H%M%S")
+    return os.path.join(DEFAULT_DRY_RUN_DIR, f"{task['id']}-{stamp}.{output_format}.gz")
+
+def dry_run(task: Dict[str, Any], path: Optional[str] = None, output_format: str = "jsonl",
+            processes: Optional[int] = None, cache: Optional[RecipientCache] = None,
+            suppressions: Optional[SuppressionList] = None, chunk_size: int = CHUNK_SIZE) -> DryRunReport:
+    """Render every email of a task to a file without sending anything.
+
+    Recipients are streamed and filtered as in a real run, then rendered
+    in chunks on ``processes`` worker processes (default: one per CPU;
+    lists of a single chunk are rendered here). Output is JSON lines or
+    mboxrd, gzip-compressed when ``path`` ends in ".gz"; each compressed
+    chunk is a gzip member, so workers compress in parallel and the file
+    is still one valid gzip stream.
+    """
+    if output_format not in OUTPUT_FORMATS:
+        raise ValueError(f"Unknown dry run format '{output_format}'")
+    path = path or default_output_path(task, output_format)
+    report = DryRunReport(task.get("name", ""), path, output_format)
+    started = time.perf_counter()
+
+    # Step 1: Compile the templates and stream the recipients that would be sent to
+    subject_template = Template(task.get("email_subject", ""))
+    body_template = Template(task.get("email_body", ""), html=True)
+    renderer = _Renderer(subject_template, body_template, run_context(), output_format, path.endswith(".gz"))
+    source = RecipientSource(task, cache=cache)
+    recipient_filter = RecipientFilter(suppressions)
+    chunks = _chunks(recipient_filter.filter(source.rows(subject_template.placeholders + body_template.placeholders)),
+                     chunk_size)
+
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "wb") as f:
+        def write(result: ChunkResult) -> None:
+            data, sizes, missing, count = result
+            f.write(data)
+            report.bytes_written += len(data)
+            report.sizes.frombytes(sizes)
+            report.missing.update(missing)
+            report.messages += count
+
+        # Step 2: Render a single chunk here; start worker processes only for more
+        first = list(itertools.islice(chunks, 2))
+        chunks = itertools.chain(first, chunks)
+        if len(first) < 2 or processes == 1:
+            for chunk in chunks:
+                write(renderer.render(chunk))
+        else:
+            report.processes = processes or os.cpu_count() or 1
+            with ProcessPoolExecutor(report.processes, initializer=_init_worker, initargs=(renderer,)) as pool:
+                # A few chunks in flight per process; results are written in recipient order
+                pending = deque()
+                for chunk in chunks:
+                    pending.append(pool.submit(_render_in_worker, chunk))
+                    if len(pending) >= report.processes * 2:
+                        write(pending.popleft().result())
+                while pending:
+                    write(pending.popleft().result())
+
+    report.removed = dict(recipient_filter.removed)
+    report.seconds = time.perf_counter() - started
+    logger.info(f"Dry run of task '{report.task_name}': {report.messages} emails in {report.seconds:.1f}s")
+    return report
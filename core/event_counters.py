@@ -0,0 +1,166 @@
+import os
+import json
+import datetime
+import threading
+import logging
+from pathlib import Path
+from typing import Dict, Any, Optional, Tuple
+
+from core.event_log import EventLog
+
+logger = logging.getLogger(__name__)
+
+# Event kinds that are counted
+EMAIL_SENT = "email_sent"
+EMAIL_FAILED = "email_failed"
+RESPONSES_FETCHED = "responses_fetched"
+SUMMARY_STORED = "summary_stored"
+
+# Message prefixes used to classify entries logged before events had a kind
+LEGACY_MESSAGES = {
+    "Email sent to": EMAIL_SENT,
+    "Processed and stored": SUMMARY_STORED,
+}
+
+class EventCounters:
+    """Per-hour event counters materialized from the event log.
+
+    Counters are updated by an ``EventLog`` listener as events are appended
+    and saved periodically to ``path`` together with the log position they
+    cover. On open, any events logged after that position are replayed, so
+    a crash never loses counts. Window queries cost O(hours in window).
+    """
+
+    def __init__(self, event_log: EventLog, path: str = "data/events/counters.json",
+                 save_interval: float = 5.0, retention_days: int = 400):
+        self.event_log = event_log
+        self.path = Path(path)
+        self.save_interval = save_interval
+        self.retention_days = retention_days
+        self._lock = threading.Lock()
+        self._dirty = False
+        self._stop = threading.Event()
+
+        # hour number -> {"total": {kind: n}, "tasks": {task_id: {kind: n}}}
+        self.buckets: Dict[int, Dict[str, Any]] = {}
+        position = self._load()
+
+        # Catch up with events the saved snapshot does not cover
+        replayed = 0
+        for entry in event_log.entries_after(position):
+            self.record(entry)
+            replayed += 1
+        if replayed:
+            logger.info(f"Replayed {replayed} events into counters")
+        event_log.add_listener(self.record)
+
+        self._thread = threading.Thread(target=self._run, name="event-counters", daemon=True)
+        self._thread.start()
+
+    @staticmethod
+    def hour_of(moment: datetime.datetime) -> int:
+        """Return the bucket number for a (naive, local) datetime"""
+        return moment.toordinal() * 24 + moment.hour
+
+    def record(self, entry: Dict[str, Any]) -> None:
+        """Count a log entry if it carries (or implies) an event kind"""
+        kind = entry.get("event")
+        if kind is None and "event" not in entry:
+            message = entry.get("message", "")
+            for prefix, legacy_kind in LEGACY_MESSAGES.items():
+                if message.startswith(prefix):
+                    kind = legacy_kind
+                    break
+        if not kind:
+            return
+
+        try:
+            hour = self.hour_of(datetime.datetime.fromisoformat(entry["timestamp"]))
+        except (KeyError, ValueError):
+            return
+
+        count = entry.get("count", 1)
+        with self._lock:
+            bucket = self.buckets.setdefault(hour, {"total": {}, "tasks": {}})
+            bucket["total"][kind] = bucket["total"].get(kind, 0) + count
+            task_id = entry.get("task_id")
+            if task_id:
+                task_counts = bucket["tasks"].setdefault(task_id, {})
+                task_counts[kind] = task_counts.get(kind, 0) + count
+            self._dirty = True
+
+    def counts(self, window: datetime.timedelta, task_id: Optional[str] = None,
+               now: Optional[datetime.datetime] = None) -> Dict[str, int]:
+        """Return event counts by kind for the window ending now.
+
+        The window is resolved to whole hours, so the oldest hour is
+        included in full.
+        """
+        now = now or datetime.datetime.now()
+        first_hour = self.hour_of(now - window)
+        last_hour = self.hour_of(now)
+
+        totals: Dict[str, int] = {}
+        with self._lock:
+            if last_hour - first_hour < len(self.buckets):
+                hours = (h for h in range(first_hour, last_hour + 1) if h in self.buckets)
+            else:
+                hours = (h for h in self.buckets if first_hour <= h <= last_hour)
+            for hour in hours:
+                bucket = self.buckets[hour]
+                source = bucket["tasks"].get(task_id, {}) if task_id else bucket["total"]
+                for kind, count in source.items():
+                    totals[kind] = totals.get(kind, 0) + count
+        return totals
+
+    def count(self, kind: str, window: datetime.timedelta, task_id: Optional[str] = None) -> int:
+        """Return the count of one event kind for the window ending now"""
+        return self.counts(window, task_id).get(kind, 0)
+
+    def close(self) -> None:
+        """Stop the background saver and save a final snapshot"""
+        self._stop.set()
+        self._thread.join()
+        self.save()
+
+    def save(self) -> None:
+        """Persist the counters together with the log position they cover"""
+        self.event_log.checkpoint(self._write_snapshot)
+
+    def _write_snapshot(self, position: Tuple[int, int]) -> None:
+        with self._lock:
+            oldest = self.hour_of(datetime.datetime.now()) - self.retention_days * 24
+            for hour in [h for h in self.buckets if h < oldest]:
+                del self.buckets[hour]
+            data = {
+                "position": list(position),
+                "buckets": {str(hour): bucket for hour, bucket in self.buckets.items()}
+            }
+            self._dirty = False
+
+        temp_path = self.path.with_suffix(".tmp")
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f, separators=(",", ":"))
+        os.replace(temp_path, self.path)
+
+    def _load(self) -> Tuple[int, int]:
+        """Load saved counters; returns the log position to replay from"""
+        if not self.path.exists():
+            return 0, 0
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            self.buckets = {int(hour): bucket for hour, bucket in data["buckets"].items()}
+            return tuple(data["position"])
+        except (json.JSONDecodeError, KeyError, ValueError, TypeError) as e:
+            logger.error(f"Error loading counters, rebuilding from log: {e}")
+            self.buckets = {}
+            return 0, 0
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.save_interval):
+            if self._dirty:
+                try:
+                    self.save()
+                except Exception as e:
+                    logger.error(f"Error saving counters: {e}")
@@ -0,0 +1,805 @@
+import os
+import io
+import gzip
+import json
+import time
+import heapq
+import shutil
+import datetime
+import threading
+import logging
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, List, Any, Optional, Tuple, Callable, Iterator, BinaryIO
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+logger = logging.getLogger(__name__)
+
+# Suffixes of compressed archive segments, by compression method
+ARCHIVE_SUFFIXES = {"gzip": ".gz", "zstd": ".zst"}
+
+class GroupCommitter:
+    """Buffers items and hands them to ``commit`` in groups.
+
+    Items are buffered in memory and committed by a background thread once
+    ``flush_every`` items are pending or ``flush_interval`` seconds have
+    passed since the oldest pending item, whichever comes first.
+    ``commit(items, durable)`` is always called with items in write order;
+    ``durable`` asks it to make the data crash-safe (fsync). ``close``
+    drains the buffer with a durable commit.
+    """
+
+    def __init__(self, commit: Callable[[List[Any], bool], None], flush_every: int = 256,
+                 flush_interval: float = 0.05, name: str = "group-commit"):
+        self.commit = commit
+        self.flush_every = flush_every
+        self.flush_interval = flush_interval
+        self.name = name
+        self._buffer: List[Any] = []
+        self._first_pending = 0.0
+        self._condition = threading.Condition()
+        self._io_lock = threading.Lock()
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self._thread.start()
+
+    def write(self, item: Any) -> None:
+        """Queue a single item for committing"""
+        with self._condition:
+            if self._closed:
+                raise ValueError(f"{self.name} is closed")
+            if not self._buffer:
+                self._first_pending = time.monotonic()
+            self._buffer.append(item)
+            if len(self._buffer) >= self.flush_every:
+                self._condition.notify()
+
+    def flush(self, fsync: bool = False) -> None:
+        """Commit all pending items"""
+        with self._io_lock:
+            with self._condition:
+                pending = self._buffer
+                self._buffer = []
+            if pending or fsync:
+                self.commit(pending, fsync)
+
+    def close(self) -> None:
+        """Commit pending items durably and stop the background thread"""
+        with self._condition:
+            if self._closed:
+                return
+            self._closed = True
+            self._condition.notify()
+        self._thread.join()
+        self.flush(fsync=True)
+
+    def _run(self) -> None:
+        while True:
+            with self._condition:
+                while not self._closed:
+                    if len(self._buffer) >= self.flush_every:
+                        break
+                    if self._buffer:
+                        remaining = self._first_pending + self.flush_interval - time.monotonic()
+                        if remaining <= 0:
+                            break
+                        self._condition.wait(remaining)
+                    else:
+                        self._condition.wait()
+                if self._closed:
+                    return
+            try:
+                self.flush()
+            except Exception as e:
+                logger.error(f"Error committing {self.name}: {e}")
+
+class GroupCommitWriter(GroupCommitter):
+    """Append-only line writer that batches writes into group commits.
+
+    ``close`` drains the buffer, fsyncs and closes the file.
+    """
+
+    def __init__(self, path: Path, flush_every: int = 256, flush_interval: float = 0.05):
+        self.path = Path(path)
+        # newline="": offsets are counted in bytes, so "\n" must not become "\r\n" on Windows
+        self._file = open(self.path, "a", encoding="utf-8", newline="")
+        super().__init__(self._write_lines, flush_every, flush_interval, name=f"group-commit:{self.path.name}")
+
+    def close(self) -> None:
+        """Flush pending lines, fsync and close the file"""
+        super().close()
+        with self._io_lock:
+            self._file.close()
+
+    def _write_lines(self, lines: List[str], fsync: bool) -> None:
+        if self._file.closed:
+            return
+        if lines:
+            self._file.write("".join(line + "\n" for line in lines))
+            self._file.flush()
+        if fsync:
+            os.fsync(self._file.fileno())
+
+class SegmentIndex:
+    """Sparse timestamp index and block postings for one log segment.
+
+    Entries are grouped into fixed-size blocks. For every block the index
+    keeps its byte offset and timestamp range, and for every level and
+    task id the list of blocks containing at least one matching entry, so
+    queries only read the blocks that can match.
+    """
+
+    BLOCK_SIZE = 256
+
+    def __init__(self, number: int, path: Optional[Path] = None):
+        self.number = number
+        self.path = path
+        self.count = 0
+        self.size = 0
+        self.min_ts: Optional[str] = None
+        self.max_ts: Optional[str] = None
+        self.blocks: List[List[Any]] = []  # [offset, count, min_ts, max_ts]
+        self.levels: Dict[str, List[int]] = {}
+        self.tasks: Dict[str, List[int]] = {}
+
+    def add(self, entry: Dict[str, Any], nbytes: int) -> None:
+        """Index an entry occupying ``nbytes`` at the end of the segment"""
+        timestamp = entry.get("timestamp", "")
+        if self.count % self.BLOCK_SIZE == 0:
+            self.blocks.append([self.size, 0, timestamp, timestamp])
+        block = self.blocks[-1]
+        block[1] += 1
+        if timestamp < block[2]:
+            block[2] = timestamp
+        if timestamp > block[3]:
+            block[3] = timestamp
+
+        block_number = len(self.blocks) - 1
+        self._post(self.levels, entry.get("level", "info"), block_number)
+        if entry.get("task_id"):
+            self._post(self.tasks, entry["task_id"], block_number)
+
+        if self.min_ts is None or timestamp < self.min_ts:
+            self.min_ts = timestamp
+        if self.max_ts is None or timestamp > self.max_ts:
+            self.max_ts = timestamp
+        self.count += 1
+        self.size += nbytes
+
+    @staticmethod
+    def _post(postings: Dict[str, List[int]], key: str, block_number: int) -> None:
+        blocks = postings.setdefault(key, [])
+        if not blocks or blocks[-1] != block_number:
+            blocks.append(block_number)
+
+    def block_range(self, block_number: int) -> Tuple[int, int]:
+        """Return the byte range covered by a block"""
+        start = self.blocks[block_number][0]
+        if block_number + 1 < len(self.blocks):
+            return start, self.blocks[block_number + 1][0]
+        return start, self.size
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "count": self.count,
+            "size": self.size,
+            "min_ts": self.min_ts,
+            "max_ts": self.max_ts,
+            "blocks": self.blocks,
+            "levels": self.levels,
+            "tasks": self.tasks
+        }
+
+    @classmethod
+    def from_dict(cls, number: int, path: Path, data: Dict[str, Any]) -> "SegmentIndex":
+        index = cls(number, path)
+        index.count = data["count"]
+        index.size = data["size"]
+        index.min_ts = data["min_ts"]
+        index.max_ts = data["max_ts"]
+        index.blocks = data["blocks"]
+        index.levels = data["levels"]
+        index.tasks = data["tasks"]
+        return index
+
+class EventLog:
+    """Append-only JSON-lines event store with an indexed query path.
+
+    Events are stored one JSON object per line in numbered, time-ordered
+    segment files under ``directory``. New events are appended to the
+    highest-numbered segment through a ``GroupCommitWriter``; once it holds
+    ``segment_max_entries`` events it is sealed, its ``SegmentIndex`` is
+    saved next to it and a new segment is started. On open, a torn last
+    line left by a crash is truncated and a legacy ``logs.json`` array is
+    migrated once.
+
+    A background maintenance thread compresses sealed segments into
+    gzip (or zstd, when ``zstandard`` is installed) archives, which queries
+    still read on demand, and deletes the oldest sealed segments once the
+    log exceeds ``max_age_days``, ``max_entries`` or ``max_bytes``.
+    Retention works on whole segments, so the active segment is always
+    kept.
+
+    With ``read_only`` the log is opened for queries only: nothing is
+    recovered, migrated, appended or compacted, so it is safe to open
+    while another process owns the log. ``follow`` picks up entries that
+    process appends.
+    """
+
+    SEGMENT_SUFFIXES = (".jsonl", ".jsonl.gz", ".jsonl.zst")
+
+    def __init__(self, directory: str = "data/events", legacy_file: Optional[str] = "data/logs.json",
+                 flush_every: int = 256, flush_interval: float = 0.05, segment_max_entries: int = 50000,
+                 segment_max_bytes: int = 16 * 1024 * 1024, max_age_days: Optional[int] = None,
+                 max_entries: Optional[int] = None, max_bytes: Optional[int] = None,
+                 compression: str = "gzip", maintenance_interval: float = 3600.0, read_only: bool = False):
+        self.directory = Path(directory)
+        if not read_only:
+            self.directory.mkdir(parents=True, exist_ok=True)
+        self.flush_every = flush_every
+        self.flush_interval = flush_interval
+        self.segment_max_entries = segment_max_entries
+        self.segment_max_bytes = segment_max_bytes
+        self.max_age_days = max_age_days
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.maintenance_interval = maintenance_interval
+        self.read_only = read_only
+        self._lock = threading.RLock()
+        self._listeners: List[Callable[[Dict[str, Any]], None]] = []
+
+        if compression == "zstd" and zstandard is None:
+            logger.warning("zstandard is not installed; archiving event log segments with gzip")
+            compression = "gzip"
+        self.compression = compression
+
+        # Decompressed archive segments recently read by queries
+        self._archive_cache: "OrderedDict[int, bytes]" = OrderedDict()
+        self._archive_cache_lock = threading.Lock()
+        self._compact_lock = threading.Lock()  # One compaction at a time
+
+        if legacy_file and not read_only:
+            self._migrate_legacy(Path(legacy_file))
+
+        segments = self.segment_paths()
+        if segments and not self._is_archived(segments[-1]):
+            self.active_path = segments[-1]
+            sealed = segments[:-1]
+        else:
+            number = self._segment_number(segments[-1]) + 1 if segments else 1
+            self.active_path = self._segment_path(number)
+            sealed = segments
+        if not read_only:
+            self._recover(self.active_path)
+
+        # Load indexes for sealed segments and rebuild the active one
+        self.indexes: List[SegmentIndex] = []
+        for path in sealed:
+            self.indexes.append(self._load_index(path))
+        self.active_index = self._build_index(self.active_path)
+        self.indexes.append(self.active_index)
+
+        self._stopping = threading.Event()
+        self._maintenance_wakeup = threading.Event()
+        self.writer: Optional[GroupCommitWriter] = None
+        self._maintenance_thread: Optional[threading.Thread] = None
+        if read_only:
+            return
+
+        self.writer = GroupCommitWriter(self.active_path, flush_every, flush_interval)
+
+        # Archive and trim in the background so appends never wait on it
+        self._maintenance_wakeup.set()
+        self._maintenance_thread = threading.Thread(target=self._run_maintenance, name="event-log-maintenance",
+                                                    daemon=True)
+        self._maintenance_thread.start()
+
+    def _segment_path(self, number: int) -> Path:
+        return self.directory / f"segment-{number:08d}.jsonl"
+
+    @staticmethod
+    def _is_archived(path: Path) -> bool:
+        return path.suffix in (".gz", ".zst")
+
+    @staticmethod
+    def _segment_number(path: Path) -> int:
+        return int(path.name.split("-")[1].split(".")[0])
+
+    @staticmethod
+    def _index_path(path: Path) -> Path:
+        return path.with_name(path.name.split(".")[0] + ".idx.json")
+
+    def segment_paths(self) -> List[Path]:
+        """Return segment files (active and archived) ordered oldest first"""
+        paths = [path for path in self.directory.glob("segment-*")
+                 if path.name.endswith(self.SEGMENT_SUFFIXES)]
+        return sorted(paths, key=self._segment_number)
+
+    def append(self, entry: Dict[str, Any]) -> None:
+        """Append an event to the log"""
+        if self.read_only:
+            raise RuntimeError("Event log is open read-only")
+        line = json.dumps(entry, ensure_ascii=False)
+        with self._lock:
+            self.writer.write(line)
+            self.active_index.add(entry, len(line.encode("utf-8")) + 1)
+            for listener in self._listeners:
+                listener(entry)
+            if self.active_index.count >= self.segment_max_entries or \
+                    self.active_index.size >= self.segment_max_bytes:
+                self._roll()
+
+    def add_listener(self, listener: Callable[[Dict[str, Any]], None]) -> None:
+        """Call ``listener`` with every appended entry, in append order"""
+        with self._lock:
+            self._listeners.append(listener)
+
+    def position(self) -> Tuple[int, int]:
+        """Return the log position after the last appended entry"""
+        with self._lock:
+            return self.active_index.number, self.active_index.count
+
+    def checkpoint(self, callback: Callable[[Tuple[int, int]], None]) -> None:
+        """Flush and run ``callback(position)`` while appends are paused"""
+        with self._lock:
+            self.flush()
+            callback((self.active_index.number, self.active_index.count))
+
+    def entries_after(self, position: Tuple[int, int]) -> Iterator[Dict[str, Any]]:
+        """Yield entries appended after ``position`` in append order"""
+        with self._lock:
+            self.flush()
+            indexes = list(self.indexes)
+
+        number, count = position
+        for index in indexes:
+            if index.number < number:
+                continue
+            skip = count if index.number == number else 0
+            try:
+                entries = self._read_segment(index.path)
+            except FileNotFoundError:
+                # Archived while reading (retry at the new path) or dropped by retention
+                try:
+                    entries = self._read_segment(index.path)
+                except FileNotFoundError:
+                    continue
+            for i, entry in enumerate(entries):
+                if i >= skip:
+                    yield entry
+
+    def flush(self) -> None:
+        """Make all appended events visible to readers"""
+        if self.writer:
+            self.writer.flush()
+
+    def close(self) -> None:
+        """Stop background maintenance, then flush and fsync the log"""
+        self._stopping.set()
+        self._maintenance_wakeup.set()
+        if self._maintenance_thread:
+            self._maintenance_thread.join()
+        with self._lock:
+            if self.writer:
+                self.writer.close()
+
+    def follow(self, stop: threading.Event, poll_interval: float = 1.0) -> Iterator[Dict[str, Any]]:
+        """Yield entries appended from now on, by this or another process, until ``stop`` is set.
+
+        Polls the newest plain segment file from its current end and moves
+        on to the next segment once the log rolls over.
+        """
+        def latest() -> Optional[Path]:
+            plain = [path for path in self.segment_paths() if not self._is_archived(path)]
+            return plain[-1] if plain else None
+
+        path = latest()
+        offset = path.stat().st_size if path else 0
+        pending = b""
+        while not stop.is_set():
+            if path is not None:
+                try:
+                    with open(path, "rb") as f:
+                        f.seek(offset)
+                        data = f.read()
+                except FileNotFoundError:
+                    data = b""
+                offset += len(data)
+                pending += data
+                *lines, pending = pending.split(b"\n")
+                for line in lines:
+                    if not line.strip():
+                        continue
+                    try:
+                        yield json.loads(line)
+                    except json.JSONDecodeError:
+                        continue
+                if data:
+                    continue
+
+            # Nothing new; switch to a newer segment once the log has rolled
+            newest = latest()
+            if newest is not None and (path is None or
+                                       self._segment_number(newest) > self._segment_number(path)):
+                path, offset, pending = newest, 0, b""
+                continue
+            stop.wait(poll_interval)
+
+    def read_all(self) -> List[Dict[str, Any]]:
+        """Read every event in append order"""
+        return list(self.entries_after((0, 0)))
+
+    def query(self, level: Optional[str] = None, since: Optional[datetime.datetime] = None,
+              until: Optional[datetime.datetime] = None, text: Optional[str] = None,
+              task_id: Optional[str] = None, limit: Optional[int] = 100, offset: int = 0,
+              cursor: Optional[str] = None) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """Return matching events newest first, plus a cursor for the next page.
+
+        Ordering matches sorting the whole log by timestamp descending
+        (ties keep append order). Blocks are visited in descending order of
+        their newest timestamp and scanning stops as soon as no remaining
+        block can contain an event that would make the page.
+        """
+        since_ts = since.isoformat() if since else None
+        until_ts = until.isoformat() if until else None
+        needle = text.lower() if text else None
+        after = self._decode_cursor(cursor) if cursor else None
+
+        # Snapshot candidate blocks while holding the lock
+        with self._lock:
+            self.flush()
+            candidates = []
+            for index in self.indexes:
+                if not index.count:
+                    continue
+                if since_ts and index.max_ts < since_ts:
+                    continue
+                if until_ts and index.min_ts > until_ts:
+                    continue
+                if after and index.min_ts > after[0]:
+                    continue
+
+                block_numbers = None
+                if level:
+                    block_numbers = set(index.levels.get(level, []))
+                if task_id:
+                    task_blocks = set(index.tasks.get(task_id, []))
+                    block_numbers = task_blocks if block_numbers is None else block_numbers & task_blocks
+                if block_numbers is None:
+                    block_numbers = range(len(index.blocks))
+
+                for block_number in block_numbers:
+                    _, _, block_min, block_max = index.blocks[block_number]
+                    if since_ts and block_max < since_ts:
+                        continue
+                    if until_ts and block_min > until_ts:
+                        continue
+                    if after and block_min > after[0]:
+                        continue
+                    start, end = index.block_range(block_number)
+                    candidates.append((block_max, index.number, block_number, start, end, index))
+
+        # Newest blocks first; keep the best (offset + limit) entries in a heap
+        candidates.sort(key=lambda c: (c[0], -c[1], -c[2]), reverse=True)
+        wanted = None if limit is None else offset + limit
+        heap: List[Tuple[Any, ...]] = []
+        for block_max, number, block_number, start, end, index in candidates:
+            if wanted is not None and len(heap) >= wanted and block_max < heap[0][0]:
+                break
+
+            for ordinal, entry in self._read_block(index, start, end):
+                timestamp = entry.get("timestamp", "")
+                if level and entry.get("level", "info") != level:
+                    continue
+                if task_id and entry.get("task_id") != task_id:
+                    continue
+                if since_ts and timestamp < since_ts:
+                    continue
+                if until_ts and timestamp > until_ts:
+                    continue
+                if needle and needle not in entry.get("message", "").lower():
+                    continue
+
+                # Newer timestamps rank higher; ties rank earlier appends higher
+                rank = (timestamp, (-number, -(block_number * SegmentIndex.BLOCK_SIZE + ordinal)))
+                if after and rank >= (after[0], (-after[1][0], -after[1][1])):
+                    continue
+                item = rank + (entry,)
+                if wanted is None or len(heap) < wanted:
+                    heapq.heappush(heap, item)
+                elif item[:2] > heap[0][:2]:
+                    heapq.heapreplace(heap, item)
+
+        ranked = sorted(heap, key=lambda item: item[:2], reverse=True)[offset:]
+        entries = [item[2] for item in ranked]
+
+        next_cursor = None
+        if wanted is not None and len(heap) >= wanted and ranked:
+            timestamp, negated_seq, _ = ranked[-1]
+            next_cursor = self._encode_cursor(timestamp, (-negated_seq[0], -negated_seq[1]))
+        return entries, next_cursor
+
+    @staticmethod
+    def _encode_cursor(timestamp: str, seq: Tuple[int, int]) -> str:
+        return f"{timestamp}|{seq[0]}|{seq[1]}"
+
+    @staticmethod
+    def _decode_cursor(cursor: str) -> Tuple[str, Tuple[int, int]]:
+        timestamp, number, ordinal = cursor.rsplit("|", 2)
+        return timestamp, (int(number), int(ordinal))
+
+    def _read_block(self, index: SegmentIndex, start: int, end: int) -> List[Tuple[int, Dict[str, Any]]]:
+        """Read the entries of one block as (ordinal, entry) pairs"""
+        try:
+            data = self._read_range(index, start, end)
+        except FileNotFoundError:
+            # The segment was archived while the query ran; retry with the new path
+            try:
+                data = self._read_range(index, start, end)
+            except FileNotFoundError:
+                return []
+
+        entries = []
+        for line in data.split(b"\n"):
+            if not line.strip():
+                continue
+            try:
+                entries.append((len(entries), json.loads(line)))
+            except json.JSONDecodeError:
+                continue
+        return entries
+
+    def _read_range(self, index: SegmentIndex, start: int, end: int) -> bytes:
+        path = index.path
+        if not self._is_archived(path):
+            with open(path, "rb") as f:
+                f.seek(start)
+                return f.read(end - start)
+
+        with self._archive_cache_lock:
+            data = self._archive_cache.get(index.number)
+            if data is not None:
+                self._archive_cache.move_to_end(index.number)
+        if data is None:
+            with self._open_segment(path) as f:
+                data = f.read()
+            with self._archive_cache_lock:
+                self._archive_cache[index.number] = data
+                while len(self._archive_cache) > 2:
+                    self._archive_cache.popitem(last=False)
+        return data[start:end]
+
+    def _open_segment(self, path: Path) -> BinaryIO:
+        """Open a plain or archived segment for binary reading"""
+        if path.suffix == ".gz":
+            return gzip.open(path, "rb")
+        if path.suffix == ".zst":
+            if zstandard is None:
+                raise RuntimeError(f"zstandard is required to read {path}")
+            return io.BufferedReader(zstandard.ZstdDecompressor().stream_reader(open(path, "rb"), closefd=True))
+        return open(path, "rb")
+
+    def _roll(self) -> None:
+        """Seal the active segment and start a new one"""
+        self.writer.close()
+        self._save_index(self.active_path, self.active_index)
+
+        number = self.active_index.number + 1
+        self.active_path = self._segment_path(number)
+        self.active_index = SegmentIndex(number, self.active_path)
+        self.indexes.append(self.active_index)
+        self.writer = GroupCommitWriter(self.active_path, self.flush_every, self.flush_interval)
+        self._maintenance_wakeup.set()
+
+    def compact(self) -> None:
+        """Archive sealed segments and delete those beyond the retention limits"""
+        if self.read_only:
+            return
+        with self._compact_lock:
+            with self._lock:
+                sealed = [index for index in self.indexes if index is not self.active_index]
+
+            for index in sealed:
+                if self._stopping.is_set():
+                    return
+                if not self._is_archived(index.path):
+                    self._archive(index)
+
+            self._apply_retention()
+
+    def _archive(self, index: SegmentIndex) -> None:
+        """Compress a sealed segment; the plain file is removed afterwards"""
+        source = index.path
+        target = source.with_name(source.name + ARCHIVE_SUFFIXES[self.compression])
+        temp_path = target.with_name(target.name + ".tmp")
+
+        with open(source, "rb") as src, open(temp_path, "wb") as raw:
+            if self.compression == "zstd":
+                with zstandard.ZstdCompressor(level=10).stream_writer(raw, closefd=False) as dst:
+                    shutil.copyfileobj(src, dst, 1024 * 1024)
+            else:
+                with gzip.GzipFile(fileobj=raw, mode="wb", compresslevel=6) as dst:
+                    shutil.copyfileobj(src, dst, 1024 * 1024)
+            raw.flush()
+            os.fsync(raw.fileno())
+        os.replace(temp_path, target)
+
+        with self._lock:
+            index.path = target
+        source.unlink()
+        logger.info(f"Archived event log segment {source.name} to {target.name}")
+
+    def _apply_retention(self) -> None:
+        """Delete the oldest sealed segments while any retention limit is exceeded"""
+        if not (self.max_age_days or self.max_entries or self.max_bytes):
+            return
+
+        cutoff = None
+        if self.max_age_days:
+            cutoff = (datetime.datetime.now() - datetime.timedelta(days=self.max_age_days)).isoformat()
+
+        dropped = []
+        with self._lock:
+            sizes = {index.number: self._disk_size(index) for index in self.indexes}
+            total_entries = sum(index.count for index in self.indexes)
+            total_bytes = sum(sizes.values())
+
+            for index in self.indexes:
+                if index is self.active_index:
+                    break
+                too_old = cutoff is not None and (index.max_ts is None or index.max_ts < cutoff)
+                too_many = bool(self.max_entries) and total_entries > self.max_entries
+                too_big = bool(self.max_bytes) and total_bytes > self.max_bytes
+                if not (too_old or too_many or too_big):
+                    break
+                dropped.append(index)
+                total_entries -= index.count
+                total_bytes -= sizes[index.number]
+
+            for index in dropped:
+                self.indexes.remove(index)
+
+        for index in dropped:
+            with self._archive_cache_lock:
+                self._archive_cache.pop(index.number, None)
+            for path in (index.path, self._index_path(index.path)):
+                try:
+                    path.unlink()
+                except FileNotFoundError:
+                    pass
+        if dropped:
+            logger.info(f"Removed {len(dropped)} event log segments past retention")
+
+    def _disk_size(self, index: SegmentIndex) -> int:
+        try:
+            return index.path.stat().st_size
+        except FileNotFoundError:
+            return 0
+
+    def _run_maintenance(self) -> None:
+        while not self._stopping.is_set():
+            self._maintenance_wakeup.wait(self.maintenance_interval)
+            self._maintenance_wakeup.clear()
+            if self._stopping.is_set():
+                return
+            try:
+                self.compact()
+            except Exception as e:
+                logger.error(f"Error compacting event log: {e}")
+
+    def _build_index(self, path: Path) -> SegmentIndex:
+        """Build a segment index by scanning the segment"""
+        index = SegmentIndex(self._segment_number(path), path)
+        if not path.exists():
+            return index
+
+        with self._open_segment(path) as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    # Keep offsets right even for lines that cannot be parsed
+                    index.size += len(line)
+                    continue
+                index.add(entry, len(line))
+        return index
+
+    def _load_index(self, path: Path) -> SegmentIndex:
+        """Load a sealed segment's index, rebuilding it if missing or stale"""
+        index_path = self._index_path(path)
+        number = self._segment_number(path)
+        try:
+            with open(index_path, "r", encoding="utf-8") as f:
+                index = SegmentIndex.from_dict(number, path, json.load(f))
+            if self._is_archived(path) or index.size == path.stat().st_size:
+                return index
+        except (FileNotFoundError, json.JSONDecodeError, KeyError):
+            pass
+
+        index = self._build_index(path)
+        if not self.read_only:
+            self._save_index(path, index)
+        return index
+
+    def _save_index(self, path: Path, index: SegmentIndex) -> None:
+        index_path = self._index_path(path)
+        temp_path = index_path.with_suffix(".tmp")
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump(index.to_dict(), f, separators=(",", ":"))
+        os.replace(temp_path, index_path)
+
+    def _read_segment(self, path: Path) -> List[Dict[str, Any]]:
+        entries = []
+        with self._open_segment(path) as f:
+            for line_number, line in enumerate(f, 1):
+                if not line.strip():
+                    continue
+                try:
+                    entries.append(json.loads(line))
+                except json.JSONDecodeError:
+                    logger.warning(f"Skipping corrupt event at {path}:{line_number}")
+        return entries
+
+    def _recover(self, path: Path) -> None:
+        """Truncate a partially written last line left by a crash"""
+        if not path.exists():
+            return
+
+        with open(path, "rb+") as f:
+            size = f.seek(0, os.SEEK_END)
+            if size == 0:
+                return
+            f.seek(size - 1)
+            if f.read(1) == b"\n":
+                return
+
+            # Scan backwards for the last complete line
+            position = size
+            while position > 0:
+                step = min(65536, position)
+                position -= step
+                f.seek(position)
+                chunk = f.read(step)
+                newline = chunk.rfind(b"\n")
+                if newline != -1:
+                    position += newline + 1
+                    break
+            else:
+                position = 0
+
+            f.truncate(position)
+            f.flush()
+            os.fsync(f.fileno())
+            logger.warning(f"Recovered event log {path}: dropped {size - position} bytes of torn write")
+
+    def _migrate_legacy(self, legacy_file: Path) -> None:
+        """Convert a legacy JSON array log into the first segment"""
+        if not legacy_file.exists():
+            return
+
+        if not self.segment_paths():
+            try:
+                with open(legacy_file, "r", encoding="utf-8") as f:
+                    entries = json.load(f)
+            except (json.JSONDecodeError, OSError) as e:
+                logger.error(f"Could not read legacy log {legacy_file}: {e}")
+                entries = []
+
+            entries.sort(key=lambda x: x.get("timestamp", ""))
+
+            # Write to a temp file first so a crash never leaves a partial segment
+            target = self._segment_path(1)
+            temp_path = target.with_suffix(".tmp")
+            with open(temp_path, "w", encoding="utf-8", newline="") as f:
+                for entry in entries:
+                    f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(temp_path, target)
+            logger.info(f"Migrated {len(entries)} events from {legacy_file}")
+
+        legacy_file.replace(legacy_file.with_name(legacy_file.name + ".migrated"))
@@ -0,0 +1,431 @@
+import os
+import ssl
+import time
+import base64
+import asyncio
+import mimetypes
+import threading
+import datetime
+import logging
+from email.message import EmailMessage
+from email.policy import SMTP as SMTP_POLICY
+from email.utils import make_msgid, formatdate
+from collections import OrderedDict, deque
+from typing import Dict, List, Any, Optional, Tuple
+
+from core.attachments import Attachment, PreparedAttachment, attachment_path
+
+logger = logging.getLogger(__name__)
+
+class MailTransport:
+    """Sends emails one recipient at a time, or one message to many BCC recipients.
+
+    ``send_email(recipient, subject, body, attachments)`` sends an HTML
+    email and returns whether it was accepted; it may be called from
+    several threads at once. ``send_bulk`` sends one message to a list of
+    recipients in BCC and returns whether each was accepted. Attachments
+    are PreparedAttachments (read once per run) or file paths.
+    Implementations: OutlookHandler ("outlook"), SMTPTransport ("smtp")
+    and InMemoryTransport ("memory"). Transports that do not really deliver
+    set ``delivers`` to False, so their sends are not counted or recorded
+    as sent.
+    """
+
+    name = ""
+    delivers = True
+
+    @classmethod
+    def from_settings(cls, settings: Dict[str, Any]) -> "MailTransport":
+        """Create the transport from the application settings"""
+        return cls()
+
+    def send_email(self, recipient: str, subject: str, body: str, attachments: List[Attachment] = None) -> bool:
+        raise NotImplementedError
+
+    def send_bulk(self, recipients: List[str], subject: str, body: str,
+                  attachments: List[Attachment] = None) -> List[bool]:
+        """Send the same email to every recipient in BCC; returns whether each was accepted"""
+        return [self.send_email(recipient, subject, body, attachments) for recipient in recipients]
+
+    def close(self) -> None:
+        """Release connections"""
+
+class InMemoryTransport(MailTransport):
+    """Records messages instead of sending them, for load-testing sends.
+
+    ``latency`` seconds are spent on each send to stand in for a real
+    server. Only the latest ``max_messages`` messages are kept.
+    """
+
+    name = "memory"
+    delivers = False
+
+    def __init__(self, latency: float = 0.0, max_messages: int = 1000):
+        self.latency = latency
+        self.messages: "deque[Dict[str, Any]]" = deque(maxlen=max_messages)
+        self._lock = threading.Lock()
+
+    def send_email(self, recipient: str, subject: str, body: str, attachments: List[Attachment] = None) -> bool:
+        """Record an email"""
+        if self.latency:
+            time.sleep(self.latency)
+        message = {
+            "to": recipient,
+            "subject": subject,
+            "body": body,
+            "attachments": [attachment_path(attachment) for attachment in attachments or []],
+            "sent_at": datetime.datetime.now().isoformat()
+        }
+        with self._lock:
+            self.messages.append(message)
+        return True
+
+    def send_bulk(self, recipients: List[str], subject: str, body: str,
+                  attachments: List[Attachment] = None) -> List[bool]:
+        """Record one email with every recipient in BCC"""
+        if self.latency:
+            time.sleep(self.latency)
+        message = {
+            "to": "",
+            "bcc": list(recipients),
+            "subject": subject,
+            "body": body,
+            "attachments": [attachment_path(attachment) for attachment in attachments or []],
+            "sent_at": datetime.datetime.now().isoformat()
+        }
+        with self._lock:
+            self.messages.append(message)
+        return [True] * len(recipients)
+
+    def clear(self) -> None:
+        """Forget recorded messages"""
+        with self._lock:
+            self.messages.clear()
+
+def attachment_part(attachment: Attachment) -> EmailMessage:
+    """Return an attachment as a MIME part; the base64 encoding happens here, once"""
+    if isinstance(attachment, PreparedAttachment):
+        data, filename, content_type = attachment.data, attachment.filename, attachment.content_type
+    else:
+        with open(attachment, "rb") as f:
+            data = f.read()
+        filename = os.path.basename(attachment)
+        content_type = mimetypes.guess_type(attachment)[0] or "application/octet-stream"
+    maintype, subtype = content_type.split("/", 1)
+    part = EmailMessage()
+    part.set_content(data, maintype=maintype, subtype=subtype, filename=filename)
+    return part
+
+def build_message(sender: str, recipient: str, subject: str, body: str,
+                  parts: Optional[List[EmailMessage]] = None) -> bytes:
+    """Return an HTML email with attachment parts, encoded for SMTP"""
+    message = EmailMessage()
+    message["From"] = sender
+    message["To"] = recipient
+    message["Subject"] = subject
+    message["Date"] = formatdate(localtime=True)
+    message["Message-ID"] = make_msgid()
+    message.set_content(body, subtype="html")
+    if parts:
+        message.make_mixed()
+        for part in parts:
+            message.attach(part)
+    return message.as_bytes(policy=SMTP_POLICY)
+
+class SMTPError(Exception):
+    """The server refused a command"""
+
+    def __init__(self, code: int, message: str):
+        super().__init__(f"{code} {message}")
+        self.code = code
+
+class _SMTPConnection:
+    """One SMTP session over asyncio streams.
+
+    Uses PIPELINING (RFC 2920) when the server offers it, so MAIL FROM,
+    RCPT TO and DATA go out in one write and a message costs two round
+    trips instead of four.
+    """
+
+    def __init__(self, host: str, port: int, security: str, username: str, password: str, timeout: float):
+        self.host = host
+        self.port = port
+        self.security = security
+        self.username = username
+        self.password = password
+        self.timeout = timeout
+        self.reader: Optional[asyncio.StreamReader] = None
+        self.writer: Optional[asyncio.StreamWriter] = None
+        self.pipelining = False
+
+    async def open(self) -> None:
+        """Connect, greet, secure and log in"""
+        context = ssl.create_default_context() if self.security in ("ssl", "starttls") else None
+        self.reader, self.writer = await asyncio.wait_for(
+            asyncio.open_connection(self.host, self.port, ssl=context if self.security == "ssl" else None),
+            self.timeout
+        )
+        await self._expect(220)
+        capabilities = await self._ehlo()
+
+        if self.security == "starttls":
+            if "STARTTLS" not in capabilities:
+                raise SMTPError(502, "Server does not offer STARTTLS")
+            await self._command("STARTTLS", 220)
+            await self.writer.start_tls(context, server_hostname=self.host)
+            capabilities = await self._ehlo()
+
+        if self.username:
+            await self._login(capabilities)
+        self.pipelining = "PIPELINING" in capabilities
+
+    async def send(self, sender: str, recipients: List[str], data: bytes) -> List[bool]:
+        """Send one message; returns which recipients the server accepted.
+
+        Raises SMTPError if the server refuses the message or every recipient.
+        """
+        envelope = [f"MAIL FROM:<{sender}>"] + [f"RCPT TO:<{recipient}>" for recipient in recipients] + ["DATA"]
+        if self.pipelining:
+            self.writer.write("".join(line + "\r\n" for line in envelope).encode("utf-8"))
+            await self.writer.drain()
+            replies = [await self._reply() for _ in envelope]
+        else:
+            replies = []
+            for line in envelope:
+                reply = await self._send_line(line)
+                replies.append(reply)
+                if reply[0] >= 400 and not line.startswith("RCPT"):
+                    break
+
+        mail_reply, recipient_replies = replies[0], replies[1:len(recipients) + 1]
+        data_reply = replies[-1] if len(replies) == len(envelope) else None
+        accepted = [reply[0] in (250, 251) for reply in recipient_replies]
+        accepted += [False] * (len(recipients) - len(accepted))
+
+        if mail_reply[0] != 250 or not any(accepted) or data_reply is None or data_reply[0] != 354:
+            if data_reply is not None and data_reply[0] == 354:
+                # DATA was accepted anyway; end it empty so the session stays usable
+                self.writer.write(b".\r\n")
+                await self.writer.drain()
+                await self._reply()
+            await self._command("RSET", 250)
+            refused = next(reply for reply in replies if reply[0] not in (250, 251, 354))
+            raise SMTPError(refused[0], " ".join(refused[1]))
+
+        self.writer.write(_dot_stuff(data) + b".\r\n")
+        await self.writer.drain()
+        await self._expect(250)
+        return accepted
+
+    async def close(self) -> None:
+        """Say goodbye and close the connection"""
+        if self.writer is None:
+            return
+        try:
+            self.writer.write(b"QUIT\r\n")
+            await self.writer.drain()
+            await asyncio.wait_for(self._reply(), self.timeout)
+        except Exception:
+            pass
+        self.writer.close()
+        self.writer = None
+
+    async def _ehlo(self) -> Dict[str, str]:
+        """Greet the server and return its extensions (keyword -> parameters)"""
+        lines = await self._command("EHLO localhost", 250)
+        capabilities = {}
+        for line in lines[1:]:
+            keyword, _, parameters = line.partition(" ")
+            capabilities[keyword.upper()] = parameters.upper()
+        return capabilities
+
+    async def _login(self, capabilities: Dict[str, str]) -> None:
+        mechanisms = capabilities.get("AUTH", "").split()
+        if "PLAIN" in mechanisms or not mechanisms:
+            token = base64.b64encode(f"\0{self.username}\0{self.password}".encode("utf-8")).decode("ascii")
+            await self._command(f"AUTH PLAIN {token}", 235)
+        else:
+            await self._command("AUTH LOGIN", 334)
+            await self._command(base64.b64encode(self.username.encode("utf-8")).decode("ascii"), 334)
+            await self._command(base64.b64encode(self.password.encode("utf-8")).decode("ascii"), 235)
+
+    async def _command(self, line: str, expected: int) -> List[str]:
+        code, lines = await self._send_line(line)
+        if code != expected:
+            raise SMTPError(code, " ".join(lines))
+        return lines
+
+    async def _send_line(self, line: str) -> Tuple[int, List[str]]:
+        self.writer.write(line.encode("utf-8") + b"\r\n")
+        await self.writer.drain()
+        return await self._reply()
+
+    async def _expect(self, expected: int) -> List[str]:
+        code, lines = await self._reply()
+        if code != expected:
+            raise SMTPError(code, " ".join(lines))
+        return lines
+
+    async def _reply(self) -> Tuple[int, List[str]]:
+        lines = []
+        while True:
+            raw = await asyncio.wait_for(self.reader.readline(), self.timeout)
+            if not raw:
+                raise ConnectionError("SMTP server closed the connection")
+            line = raw.decode("utf-8", errors="replace").rstrip("\r\n")
+            lines.append(line[4:])
+            if len(line) < 4 or line[3] != "-":
+                return int(line[:3]), lines
+
+def _dot_stuff(data: bytes) -> bytes:
+    """Escape lines starting with a dot and make sure the data ends with CRLF"""
+    if data.startswith(b"."):
+        data = b"." + data
+    data = data.replace(b"\r\n.", b"\r\n..")
+    if not data.endswith(b"\r\n"):
+        data += b"\r\n"
+    return data
+
+class SMTPTransport(MailTransport):
+    """Sends through an SMTP server with a pool of persistent connections.
+
+    An asyncio event loop on a background thread drives up to
+    ``pool_size`` connections, each kept open and reused for many
+    messages. ``send_email`` can be called from any number of threads; it
+    waits for a free connection. A connection that went stale is replaced
+    once before the send counts as failed.
+    """
+
+    name = "smtp"
+
+    def __init__(self, host: str = "localhost", port: int = 587, security: str = "starttls",
+                 username: str = "", password: str = "", sender: str = "", pool_size: int = 4,
+                 timeout: float = 30.0):
+        self.host = host
+        self.port = port
+        self.security = security
+        self.username = username
+        self.password = password
+        self.sender = sender or username
+        self.pool_size = max(1, pool_size)
+        self.timeout = timeout
+        self._idle: List[_SMTPConnection] = []
+        self._parts: "OrderedDict[str, EmailMessage]" = OrderedDict()  # Encoded attachments by content hash
+        self._parts_lock = threading.Lock()
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name="smtp-transport", daemon=True)
+        self._thread.start()
+
+    @classmethod
+    def from_settings(cls, settings: Dict[str, Any]) -> "SMTPTransport":
+        """Create the transport from the smtp_* settings; the password comes from SMTP_PASSWORD"""
+        return cls(
+            host=settings.get("smtp_host", "localhost"),
+            port=settings.get("smtp_port", 587),
+            security=settings.get("smtp_security", "starttls"),
+            username=settings.get("smtp_username", ""),
+            password=os.environ.get("SMTP_PASSWORD", ""),
+            sender=settings.get("smtp_sender", ""),
+            pool_size=settings.get("send_workers", 2)
+        )
+
+    def send_email(self, recipient: str, subject: str, body: str, attachments: List[Attachment] = None) -> bool:
+        """Send an email through the SMTP server"""
+        try:
+            parts = [self._part(attachment) for attachment in attachments or []]
+            data = build_message(self.sender, recipient, subject, body, parts)
+            future = asyncio.run_coroutine_threadsafe(self.send_async([recipient], data), self._loop)
+            future.result()
+            logger.info(f"Email sent to {recipient}")
+            return True
+        except Exception as e:
+            logger.error(f"Error sending email: {e}")
+            return False
+
+    def send_bulk(self, recipients: List[str], subject: str, body: str,
+                  attachments: List[Attachment] = None) -> List[bool]:
+        """Send one message with every recipient in the envelope only (BCC)"""
+        try:
+            parts = [self._part(attachment) for attachment in attachments or []]
+            data = build_message(self.sender, "undisclosed-recipients:;", subject, body, parts)
+            future = asyncio.run_coroutine_threadsafe(self.send_async(recipients, data), self._loop)
+            accepted = future.result()
+            logger.info(f"Email sent to {sum(accepted)} of {len(recipients)} BCC recipients")
+            return accepted
+        except Exception as e:
+            logger.error(f"Error sending email to {len(recipients)} BCC recipients: {e}")
+            return [False] * len(recipients)
+
+    def _part(self, attachment: Attachment) -> EmailMessage:
+        """Return the encoded part of a prepared attachment, encoding it on first use"""
+        if not isinstance(attachment, PreparedAttachment):
+            return attachment_part(attachment)
+        with self._parts_lock:
+            part = self._parts.get(attachment.digest)
+            if part is not None:
+                self._parts.move_to_end(attachment.digest)
+                return part
+        part = attachment_part(attachment)
+        with self._parts_lock:
+            self._parts[attachment.digest] = part
+            while len(self._parts) > 8:
+                self._parts.popitem(last=False)
+        return part
+
+    async def send_async(self, recipients: List[str], data: bytes) -> List[bool]:
+        """Send an encoded message on a pooled connection; returns which recipients were accepted"""
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.pool_size)
+        async with self._slots:
+            connection = self._idle.pop() if self._idle else await self._connect()
+            try:
+                try:
+                    accepted = await connection.send(self.sender, recipients, data)
+                except (ConnectionError, asyncio.IncompleteReadError, asyncio.TimeoutError, OSError):
+                    # The server may have dropped an idle connection; retry once on a fresh one
+                    await connection.close()
+                    connection = await self._connect()
+                    accepted = await connection.send(self.sender, recipients, data)
+            except SMTPError:
+                # Refused message; the session was reset and can be reused
+                self._idle.append(connection)
+                raise
+            except BaseException:
+                await connection.close()
+                raise
+            self._idle.append(connection)
+            return accepted
+
+    def close(self) -> None:
+        """Close all connections and stop the event loop"""
+        if self._loop.is_closed():
+            return
+        asyncio.run_coroutine_threadsafe(self._close_all(), self._loop).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._loop.close()
+
+    async def _connect(self) -> _SMTPConnection:
+        connection = _SMTPConnection(self.host, self.port, self.security, self.username, self.password, self.timeout)
+        await connection.open()
+        return connection
+
+    async def _close_all(self) -> None:
+        idle, self._idle = self._idle, []
+        for connection in idle:
+            await connection.close()
+
+def create_transport(name: str, settings: Dict[str, Any]) -> MailTransport:
+    """Create a transport by name ("outlook", "smtp" or "memory")"""
+    # Imported here so the SMTP and in-memory transports work without pywin32
+    from core.outlook_handler import OutlookHandler
+    transports = {
+        OutlookHandler.name: OutlookHandler,
+        SMTPTransport.name: SMTPTransport,
+        InMemoryTransport.name: InMemoryTransport,
+    }
+    transport_class = transports.get(name)
+    if transport_class is None:
+        raise ValueError(f"Unknown mail transport '{name}'")
+    return transport_class.from_settings(settings)
@@ -0,0 +1,280 @@
+import os
+import bisect
+import tempfile
+import threading
+import logging
+from typing import Dict, List, Optional, Sequence, Callable
+
+logger = logging.getLogger(__name__)
+
+# Latency buckets in seconds
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+class Counter:
+    """A value that only goes up"""
+
+    kind = "counter"
+
+    def __init__(self, name: str, help_text: str):
+        self.name = name
+        self.help = help_text
+        self._value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1) -> None:
+        """Increase the counter"""
+        with self._lock:
+            self._value += amount
+
+    def value(self) -> float:
+        return self._value
+
+    def samples(self) -> List[str]:
+        return [f"{self.name} {_format(self._value)}"]
+
+class Gauge:
+    """A value that can go up and down, or is read from a callback"""
+
+    kind = "gauge"
+
+    def __init__(self, name: str, help_text: str, function: Optional[Callable[[], float]] = None):
+        self.name = name
+        self.help = help_text
+        self.function = function
+        self._value = 0.0
+        self._lock = threading.Lock()
+
+    def set(self, value: float) -> None:
+        """Set the gauge"""
+        self._value = value
+
+    def inc(self, amount: float = 1) -> None:
+        """Increase the gauge"""
+        with self._lock:
+            self._value += amount
+
+    def dec(self, amount: float = 1) -> None:
+        """Decrease the gauge"""
+        with self._lock:
+            self._value -= amount
+
+    def value(self) -> float:
+        if self.function is not None:
+            try:
+                return self.function()
+            except Exception as e:
+                logger.error(f"Error reading gauge {self.name}: {e}")
+        return self._value
+
+    def samples(self) -> List[str]:
+        return [f"{self.name} {_format(self.value())}"]
+
+class Histogram:
+    """Counts observations in fixed buckets.
+
+    Bucket counts live in a preallocated list and the bucket is found by
+    bisecting the bounds, so observing does not build any containers.
+    """
+
+    kind = "histogram"
+
+    def __init__(self, name: str, help_text: str, buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.bounds = tuple(sorted(buckets))
+        self._counts = [0] * (len(self.bounds) + 1)  # Last slot is +Inf
+        self._sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        """Record one observation"""
+        index = bisect.bisect_left(self.bounds, value)
+        with self._lock:
+            self._counts[index] += 1
+            self._sum += value
+
+    def count(self) -> int:
+        return sum(self._counts)
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            counts = list(self._counts)
+            total = self._sum
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.bounds, counts):
+            cumulative += count
+            lines.append(f'{self.name}_bucket{{le="{_format(bound)}"}} {cumulative}')
+        cumulative += counts[-1]
+        lines.append(f'{self.name}_bucket{{le="+Inf"}} {cumulative}')
+        lines.append(f"{self.name}_sum {_format(total)}")
+        lines.append(f"{self.name}_count {cumulative}")
+        return lines
+
+def _format(value: float) -> str:
+    if value == int(value):
+        return str(int(value))
+    return repr(float(value))
+
+class MetricsRegistry:
+    """Named counters, gauges and histograms rendered in Prometheus text format"""
+
+    def __init__(self, prefix: str = ""):
+        self.prefix = prefix
+        self._metrics: Dict[str, object] = {}
+        self._lock = threading.Lock()
+
+    def _register(self, metric):
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def counter(self, name: str, help_text: str) -> Counter:
+        """Get or create a counter"""
+        return self._register(Counter(self.prefix + name, help_text))
+
+    def gauge(self, name: str, help_text: str, function: Optional[Callable[[], float]] = None) -> Gauge:
+        """Get or create a gauge"""
+        return self._register(Gauge(self.prefix + name, help_text, function))
+
+    def histogram(self, name: str, help_text: str, buckets: Sequence[float] = LATENCY_BUCKETS) -> Histogram:
+        """Get or create a histogram"""
+        return self._register(Histogram(self.prefix + name, help_text, buckets))
+
+    def render(self) -> str:
+        """Return all metrics in the Prometheus text exposition format"""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.samples())
+        return "\n".join(lines) + "\n"
+
+REGISTRY = MetricsRegistry(prefix="outlook_automation_")
+
+# Email sending
+EMAILS_SENT = REGISTRY.counter("emails_sent_total", "Emails sent successfully")
+EMAILS_FAILED = REGISTRY.counter("emails_failed_total", "Emails that failed to send")
+SEND_LATENCY = REGISTRY.histogram("send_seconds", "Time to send one email (one BCC batch in bulk mode)")
+SEND_CONCURRENCY_LIMIT = REGISTRY.gauge("send_concurrency_limit", "Sends currently allowed in parallel")
+SEND_BACKOFFS = REGISTRY.counter("send_backoffs_total", "Times sending slowed down after errors or high latency")
+SEND_RATE_LIMIT_WAIT = REGISTRY.histogram("send_rate_limit_wait_seconds", "Time spent waiting for the send rate limit")
+
+# Inbox scanning
+INBOX_SCANNED = REGISTRY.counter("inbox_items_scanned_total", "Inbox items examined for responses")
+INBOX_MATCHED = REGISTRY.counter("inbox_items_matched_total", "Inbox items matching a task's response filter")
+
+# Ollama
+OLLAMA_LATENCY = REGISTRY.histogram("ollama_request_seconds", "Duration of Ollama summarization requests")
+OLLAMA_TOKENS_PER_SECOND = REGISTRY.histogram(
+    "ollama_tokens_per_second", "Generation speed of Ollama responses",
+    buckets=(1, 2, 5, 10, 20, 30, 50, 75, 100, 200)
+)
+
+# Storage
+STORAGE_WRITE_BYTES = REGISTRY.counter("storage_write_bytes_total", "Bytes written when storing results")
+STORAGE_WRITE_LATENCY = REGISTRY.histogram("storage_write_seconds", "Time to store one result")
+
+# Scheduling
+SCHEDULER_LAG = REGISTRY.histogram("scheduler_lag_seconds", "Actual task start minus its scheduled next_run")
+TASKS_RUNNING = REGISTRY.gauge("tasks_running", "Task runs currently in progress")
+
+def _make_server(registry: MetricsRegistry, host: str, port: int):
+    """Create an HTTP server for ``/metrics`` (http.server is only imported when needed)"""
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class MetricsRequestHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] not in ("/", "/metrics"):
+                self.send_error(404)
+                return
+            body = registry.render().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            logger.debug(format % args)
+
+    server = ThreadingHTTPServer((host, port), MetricsRequestHandler)
+    server.daemon_threads = True
+    return server
+
+class MetricsExporter:
+    """Serves metrics on localhost and/or writes them to a snapshot file.
+
+    With ``port`` set, ``http://127.0.0.1:<port>/metrics`` returns the
+    Prometheus text format. With ``snapshot_path`` set, the same text is
+    written there every ``snapshot_interval`` seconds (atomically, so a
+    node_exporter textfile collector can pick it up) and once on stop.
+    """
+
+    def __init__(self, registry: MetricsRegistry = REGISTRY, port: int = 0,
+                 snapshot_path: Optional[str] = None, snapshot_interval: float = 60.0,
+                 host: str = "127.0.0.1"):
+        self.registry = registry
+        self.port = port
+        self.host = host
+        self.snapshot_path = snapshot_path
+        self.snapshot_interval = snapshot_interval
+        self._server = None
+        self._stopping = threading.Event()
+        self._threads: List[threading.Thread] = []
+
+    def start(self) -> None:
+        """Start the HTTP endpoint and the snapshot writer"""
+        if self.port:
+            try:
+                self._server = _make_server(self.registry, self.host, self.port)
+            except OSError as e:
+                logger.error(f"Could not serve metrics on {self.host}:{self.port}: {e}")
+            else:
+                self._spawn(self._server.serve_forever, "metrics-http")
+                logger.info(f"Serving metrics on http://{self.host}:{self.port}/metrics")
+        if self.snapshot_path:
+            self._spawn(self._run_snapshots, "metrics-snapshot")
+
+    def stop(self) -> None:
+        """Stop serving and write a final snapshot"""
+        self._stopping.set()
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+        if self.snapshot_path:
+            self.write_snapshot()
+
+    def write_snapshot(self) -> None:
+        """Write the current metrics to the snapshot file"""
+        directory = os.path.dirname(self.snapshot_path) or "."
+        os.makedirs(directory, exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                f.write(self.registry.render())
+            os.replace(temp_path, self.snapshot_path)
+        except OSError as e:
+            logger.error(f"Error writing metrics snapshot: {e}")
+            try:
+                os.unlink(temp_path)
+            except OSError:
+                pass
+
+    def _spawn(self, target: Callable[[], None], name: str) -> None:
+        thread = threading.Thread(target=target, name=name, daemon=True)
+        thread.start()
+        self._threads.append(thread)
+
+    def _run_snapshots(self) -> None:
+        while not self._stopping.wait(self.snapshot_interval):
+            self.write_snapshot()
@@ -0,0 +1,102 @@
+"""Copy tasks, events, results and runs from the JSON files into SQLite.
+
+Usage: python -m core.migrate_storage [--data-dir data] [--force] [--activate]
+"""
+import os
+import sys
+import json
+import argparse
+import logging
+
+from core.storage_backend import JSONStorageBackend, SQLiteStorageBackend, SQLiteDatabase
+
+logger = logging.getLogger(__name__)
+
+def migrate(data_dir: str = "data", force: bool = False) -> dict:
+    """Copy all JSON-backed data into ``<data_dir>/storage.db``; returns counts"""
+    # Refuse to mix into (or, with force, clear) an existing database
+    db = SQLiteDatabase(os.path.join(data_dir, "storage.db"))
+    connection = db.connection()
+    existing = sum(connection.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+                   for table in ("tasks", "events", "results", "runs"))
+    if existing:
+        if not force:
+            raise RuntimeError(f"{db.path} already contains data; use --force to replace it")
+        with connection:
+            for table in ("tasks", "events", "results", "runs"):
+                connection.execute(f"DELETE FROM {table}")
+    db.close()
+
+    source = JSONStorageBackend(data_dir)
+    target = SQLiteStorageBackend(data_dir, flush_every=5000)
+    try:
+        # Tasks
+        tasks = source.tasks.all()
+        target.tasks.save_many(tasks)
+
+        # Events, in append order
+        event_count = 0
+        for entry in source.events.entries_after((0, 0)):
+            target.events.append(entry)
+            event_count += 1
+        target.events.flush()
+
+        # Results, from each task's storage path
+        result_count = 0
+        for task in tasks:
+            storage_path = task.get("storage_path") or f"data/summaries/{task['id']}"
+            try:
+                results = source.results.get(storage_path)
+            except (OSError, json.JSONDecodeError) as e:
+                logger.error(f"Skipping results at {storage_path}: {e}")
+                continue
+            for entry in results:
+                target.results.store(storage_path, entry, task["id"])
+                result_count += 1
+
+        # Run records, oldest first
+        run_count = 0
+        for task in tasks:
+            for run in reversed(source.runs.recent(task["id"], limit=sys.maxsize)):
+                target.runs.record(run)
+                run_count += 1
+
+        return {"tasks": len(tasks), "events": event_count, "results": result_count, "runs": run_count}
+    finally:
+        source.close()
+        target.close()
+
+def activate(data_dir: str = "data") -> None:
+    """Select the SQLite backend in settings"""
+    settings_file = os.path.join(data_dir, "settings.json")
+    settings = {}
+    if os.path.exists(settings_file):
+        with open(settings_file, "r") as f:
+            settings = json.load(f)
+    settings["storage_backend"] = "sqlite"
+    with open(settings_file, "w") as f:
+        json.dump(settings, f, indent=2)
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Migrate JSON storage to SQLite")
+    parser.add_argument("--data-dir", default="data", help="Data directory (default: data)")
+    parser.add_argument("--force", action="store_true", help="Replace data already in the SQLite database")
+    parser.add_argument("--activate", action="store_true", help="Switch settings to the SQLite backend afterwards")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s - %(message)s")
+    try:
+        counts = migrate(args.data_dir, args.force)
+    except RuntimeError as e:
+        logger.error(str(e))
+        return 1
+
+    print(f"Migrated {counts['tasks']} tasks, {counts['events']} events, "
+          f"{counts['results']} results and {counts['runs']} runs")
+    if args.activate:
+        activate(args.data_dir)
+        print("Storage backend set to SQLite; restart the application to use it")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
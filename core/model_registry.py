@@ -0,0 +1,129 @@
+import time
+import threading
+import logging
+from typing import Dict, List, Optional, Callable
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MODEL = "llama2"
+
+class ModelRegistry:
+    """Cached list of the models available in Ollama.
+
+    ``models()`` returns the last known list immediately. When it is older
+    than ``ttl`` seconds a refresh is started on a background thread, so
+    callers never wait for a slow or unreachable Ollama server. Listeners
+    are called (on the refresh thread) with the new list whenever it
+    changes. ``resolve`` maps a configured model name onto an installed
+    model, falling back the same way model validation always has. It waits
+    at most ``load_timeout`` seconds for the first list; after that the
+    configured name is used as is.
+    """
+
+    def __init__(self, ttl: float = 300.0, retry_interval: float = 30.0, load_timeout: float = 5.0):
+        self.ttl = ttl
+        self.retry_interval = retry_interval
+        self.load_timeout = load_timeout
+        self._models: Optional[List[str]] = None
+        self._expires = 0.0
+        self._lock = threading.Lock()
+        self._refreshing: Optional[threading.Thread] = None
+        self._loaded = threading.Event()
+        self._listeners: List[Callable[[List[str]], None]] = []
+        self._resolved: Dict[str, str] = {}
+        self.refresh()
+
+    def add_listener(self, listener: Callable[[List[str]], None]) -> None:
+        """Call ``listener(models)`` whenever the model list changes"""
+        with self._lock:
+            self._listeners.append(listener)
+
+    def models(self) -> List[str]:
+        """Return the last known model names, refreshing in the background when stale"""
+        with self._lock:
+            models = list(self._models or [])
+            stale = time.monotonic() >= self._expires
+        if stale:
+            self.refresh()
+        return models
+
+    def refresh(self) -> None:
+        """Start a background refresh unless one is already running"""
+        with self._lock:
+            if self._refreshing is not None and self._refreshing.is_alive():
+                return
+            self._refreshing = threading.Thread(target=self._refresh, name="ollama-models", daemon=True)
+            self._refreshing.start()
+
+    def wait_until_loaded(self, timeout: Optional[float] = None) -> bool:
+        """Wait for the first refresh attempt to finish"""
+        return self._loaded.wait(timeout)
+
+    def resolve(self, model: str) -> str:
+        """Return an installed model for the configured name"""
+        if not self.wait_until_loaded(self.load_timeout):
+            # Ollama is hanging; don't hold up the caller or remember this answer
+            logger.warning(f"Model list not loaded after {self.load_timeout:g}s. Using {model or DEFAULT_MODEL}")
+            return model or DEFAULT_MODEL
+        models = self.models()
+        with self._lock:
+            resolved = self._resolved.get(model)
+        if resolved is not None:
+            return resolved
+
+        resolved = self._match(model, models)
+        if models:
+            # Only remember answers based on a real model list
+            with self._lock:
+                self._resolved[model] = resolved
+        return resolved
+
+    @staticmethod
+    def _match(model: str, available_models: List[str]) -> str:
+        # If model exists, use it
+        if model in available_models:
+            return model
+
+        # If model doesn't exist, try to find a close match
+        for available_model in available_models:
+            if model.lower() in available_model.lower():
+                logger.info(f"Using model {available_model} instead of {model}")
+                return available_model
+
+        # If no match found, use first available model
+        if available_models:
+            default_model = available_models[0]
+            logger.warning(f"Model {model} not found. Using {default_model} instead")
+            return default_model
+
+        # If no models available, use the configured name as is
+        logger.warning(f"No models found. Using {model or DEFAULT_MODEL}")
+        return model or DEFAULT_MODEL
+
+    def _refresh(self) -> None:
+        try:
+            import ollama
+            response = ollama.list()
+            models = [m['name'] for m in response['models']]
+        except Exception as e:
+            logger.error(f"Error fetching models from Ollama: {e}")
+            with self._lock:
+                self._expires = time.monotonic() + self.retry_interval
+            self._loaded.set()
+            return
+
+        with self._lock:
+            changed = models != self._models
+            self._models = models
+            self._expires = time.monotonic() + self.ttl
+            if changed:
+                self._resolved = {}
+            listeners = list(self._listeners)
+        self._loaded.set()
+
+        if changed:
+            for listener in listeners:
+                try:
+                    listener(list(models))
+                except Exception as e:
+                    logger.error(f"Error in model list listener: {e}")
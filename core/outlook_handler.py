@@ -1,45 +1,56 @@
-import win32com.client
 import datetime
+import threading
 import logging
 from typing import Dict, List, Any, Optional
 from datetime import timezone
 
+from core.metrics import INBOX_SCANNED, INBOX_MATCHED
+from core.mail_transport import MailTransport
+from core.attachments import Attachment, PreparedAttachment, attachment_path
+
 logger = logging.getLogger(__name__)
 
-class OutlookHandler:
+class OutlookHandler(MailTransport):
+    name = "outlook"
+    
     def __init__(self):
-        self.outlook = None
-        self.namespace = None
+        # COM objects belong to the thread that created them, so each worker
+        # thread keeps its own Outlook connection
+        self._local = threading.local()
+    
+    @property
+    def outlook(self):
+        return getattr(self._local, "outlook", None)
+    
+    @property
+    def namespace(self):
+        return getattr(self._local, "namespace", None)
         
     def _connect_to_outlook(self) -> None:
         """Connect to Outlook application"""
         if not self.outlook:
             try:
-                self.outlook = win32com.client.Dispatch("Outlook.Application")
-                self.namespace = self.outlook.GetNamespace("MAPI")
+                import win32com.client
+                self._local.outlook = win32com.client.Dispatch("Outlook.Application")
+                self._local.namespace = self._local.outlook.GetNamespace("MAPI")
                 logger.info("Connected to Outlook")
             except Exception as e:
                 logger.error(f"Error connecting to Outlook: {e}")
                 raise
     
-    def send_email(self, recipient: str, subject: str, body: str, attachments: List[str] = None) -> bool:
+    def send_email(self, recipient: str, subject: str, body: str, attachments: List[Attachment] = None) -> bool:
         """Send an email using Outlook"""
         try:
             self._connect_to_outlook()
             
-            # Create a new mail item
-            mail = self.outlook.CreateItem(0)  # 0 = olMailItem
+            # Create a new mail item, with attachments if any
+            mail = self._new_mail(attachments or [])
             
             # Set properties
             mail.To = recipient
             mail.Subject = subject
             mail.HTMLBody = body
             
-            # Add attachments if any
-            if attachments:
-                for attachment in attachments:
-                    mail.Attachments.Add(attachment)
-            
             # Send the email
             mail.Send()
             
@@ -48,6 +59,67 @@ class OutlookHandler:
         except Exception as e:
             logger.error(f"Error sending email: {e}")
             return False
+
+    def send_bulk(self, recipients: List[str], subject: str, body: str,
+                  attachments: List[Attachment] = None) -> List[bool]:
+        """Send one email using Outlook with every recipient in BCC.
+
+        Outlook refuses the whole item if any recipient cannot be resolved,
+        so a refused group is retried in halves until only the bad
+        addresses fail.
+        """
+        try:
+            self._connect_to_outlook()
+        except Exception as e:
+            logger.error(f"Error sending email to {len(recipients)} BCC recipients: {e}")
+            return [False] * len(recipients)
+        return self._send_bcc(recipients, subject, body, attachments or [])
+
+    def _send_bcc(self, recipients: List[str], subject: str, body: str,
+                  attachments: List[Attachment]) -> List[bool]:
+        try:
+            mail = self._new_mail(attachments)
+            mail.BCC = "; ".join(recipients)
+            mail.Subject = subject
+            mail.HTMLBody = body
+            mail.Send()
+
+            logger.info(f"Email sent to {len(recipients)} BCC recipients")
+            return [True] * len(recipients)
+        except Exception as e:
+            if len(recipients) == 1:
+                logger.error(f"Error sending email to {recipients[0]}: {e}")
+                return [False]
+            logger.warning(f"Outlook refused email to {len(recipients)} BCC recipients, retrying in halves: {e}")
+            middle = len(recipients) // 2
+            return (self._send_bcc(recipients[:middle], subject, body, attachments) +
+                    self._send_bcc(recipients[middle:], subject, body, attachments))
+
+    def _new_mail(self, attachments: List[Attachment]):
+        """Create a mail item; with prepared attachments, copy a per-thread item that already has them"""
+        if not attachments:
+            return self.outlook.CreateItem(0)  # 0 = olMailItem
+        
+        if all(isinstance(attachment, PreparedAttachment) for attachment in attachments):
+            key = tuple(attachment.digest for attachment in attachments)
+            template = getattr(self._local, "template", None)
+            try:
+                if template is None or template[0] != key:
+                    # Attachments are added from disk once per thread, not once per recipient
+                    item = self._add_attachments(self.outlook.CreateItem(0), attachments)
+                    template = self._local.template = (key, item)
+                return template[1].Copy()
+            except Exception as e:
+                logger.warning(f"Could not copy prepared mail item, adding attachments directly: {e}")
+                self._local.template = None
+        
+        return self._add_attachments(self.outlook.CreateItem(0), attachments)
+    
+    @staticmethod
+    def _add_attachments(mail, attachments: List[Attachment]):
+        for attachment in attachments:
+            mail.Attachments.Add(attachment_path(attachment))
+        return mail
     
     def get_responses(self, filter_criteria: Dict[str, Any]) -> List[Dict[str, Any]]:
         """Get email responses based on filter criteria"""
@@ -64,6 +136,7 @@ class OutlookHandler:
             # Process items with manual filtering
             responses = []
             for item in items:
+                INBOX_SCANNED.inc()
                 matches = True
                 
                 # Subject filter
@@ -99,6 +172,7 @@ class OutlookHandler:
                 
                 # If all filters pass, add to responses
                 if matches:
+                    INBOX_MATCHED.inc()
                     responses.append({
                         "id": item.EntryID,
                         "subject": item.Subject,
@@ -0,0 +1,316 @@
+import os
+import sys
+import json
+import mmap
+import array
+import struct
+import hashlib
+import tempfile
+import threading
+import logging
+from typing import Dict, List, Any, Optional, Iterable, Iterator, BinaryIO
+
+from core.recipients import RecipientFile, to_text
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_DIR = os.path.join("data", "cache", "recipients")
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+# Cache files: MAGIC, header length (uint64 LE), JSON header, 8-byte aligned column sections
+MAGIC = b"RCOL1\n\0\0"
+EXTENSION = ".rcol"
+FORMAT_VERSION = 1
+FLUSH_BYTES = 1 << 20  # Spill each column to disk once this much is buffered
+
+def _pad(length: int) -> int:
+    return (8 - length % 8) % 8
+
+class ColumnarRecipients:
+    """A parsed recipient file stored column by column and read through mmap.
+
+    For every column the file holds the UTF-8 text of all rows back to
+    back, an array of ``rows + 1`` offsets into it and one null flag per
+    row. Reading a value slices the mapped file directly, so opening a
+    cache file costs the same for ten rows or a million. Offers the same
+    ``columns()`` / ``rows(columns)`` interface as RecipientFile.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as f:
+            if f.read(len(MAGIC)) != MAGIC:
+                raise ValueError(f"Not a recipient cache file: {path}")
+            header_length = struct.unpack("<Q", f.read(8))[0]
+            self.header = json.loads(f.read(header_length).decode("utf-8"))
+        self.base = len(MAGIC) + 8 + header_length  # Section positions are relative to this
+        if self.header.get("byteorder") != sys.byteorder:
+            raise ValueError(f"Recipient cache file written on another platform: {path}")
+        self.row_count: int = self.header["rows"]
+
+    def columns(self) -> List[str]:
+        """Return the header row"""
+        return [column["name"] for column in self.header["columns"]]
+
+    def rows(self, columns: Optional[Iterable[str]] = None) -> Iterator[Dict[str, Any]]:
+        """Yield one dict per row, restricted to ``columns`` if given"""
+        keep = set(columns) if columns is not None else None
+        wanted = [column for column in self.header["columns"] if keep is None or column["name"] in keep]
+        count = self.row_count
+        if count == 0:
+            return
+
+        with open(self.path, "rb") as f:
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        view = memoryview(mapped)
+        views = []
+        try:
+            for column in wanted:
+                start = self.base + column["offsets"]
+                offsets = view[start:start + 8 * (count + 1)].cast("Q")
+                start = self.base + column["data"]
+                data = view[start:start + column["data_length"]]
+                start = self.base + column["nulls"]
+                nulls = view[start:start + count]
+                views.append((column["name"], offsets, data, nulls))
+
+            for i in range(count):
+                row = {}
+                for name, offsets, data, nulls in views:
+                    row[name] = None if nulls[i] else str(data[offsets[i]:offsets[i + 1]], "utf-8")
+                yield row
+        finally:
+            # Views must be released before the map can be closed
+            for _, offsets, data, nulls in views:
+                offsets.release()
+                data.release()
+                nulls.release()
+            view.release()
+            mapped.close()
+
+class _ColumnSpill:
+    """Buffers one column while converting and spills it to temporary files"""
+
+    def __init__(self, name: str, directory: str):
+        self.name = name
+        self.data_file: BinaryIO = tempfile.TemporaryFile(dir=directory)
+        self.offsets_file: BinaryIO = tempfile.TemporaryFile(dir=directory)
+        self.nulls_file: BinaryIO = tempfile.TemporaryFile(dir=directory)
+        self.data = bytearray()
+        self.offsets = array.array("Q", [0])
+        self.nulls = bytearray()
+        self.position = 0
+
+    def append(self, value: Optional[str]) -> None:
+        if value is None:
+            self.nulls.append(1)
+        else:
+            encoded = value.encode("utf-8")
+            self.data += encoded
+            self.position += len(encoded)
+            self.nulls.append(0)
+        self.offsets.append(self.position)
+        if len(self.data) >= FLUSH_BYTES or len(self.nulls) >= FLUSH_BYTES:
+            self.flush()
+
+    def flush(self) -> None:
+        self.data_file.write(self.data)
+        self.offsets.tofile(self.offsets_file)
+        self.nulls_file.write(self.nulls)
+        self.data = bytearray()
+        self.offsets = array.array("Q")
+        self.nulls = bytearray()
+
+    def close(self) -> None:
+        self.data_file.close()
+        self.offsets_file.close()
+        self.nulls_file.close()
+
+def _copy(source: BinaryIO, target: BinaryIO) -> None:
+    source.seek(0)
+    while True:
+        block = source.read(FLUSH_BYTES)
+        if not block:
+            break
+        target.write(block)
+
+def write_columnar(path: str, columns: List[str], rows: Iterable[Dict[str, Any]]) -> int:
+    """Write ``rows`` as a cache file at ``path`` and return the row count.
+
+    Values are normalized to text with ``to_text``. Columns are spilled to
+    temporary files while reading, so memory use does not grow with the
+    number of rows.
+    """
+    directory = os.path.dirname(path) or "."
+    spills = [_ColumnSpill(name, directory) for name in columns]
+    try:
+        count = 0
+        for row in rows:
+            for spill in spills:
+                spill.append(to_text(row.get(spill.name)))
+            count += 1
+        for spill in spills:
+            spill.flush()
+
+        # Step 1: Lay out the sections; positions are relative to the end of the header
+        sizes = [(8 * (count + 1), spill.position, count) for spill in spills]
+        header = {"version": FORMAT_VERSION, "byteorder": sys.byteorder, "rows": count, "columns": []}
+        position = 0
+        for spill, (offsets_size, data_size, nulls_size) in zip(spills, sizes):
+            column = {"name": spill.name, "offsets": position}
+            position += offsets_size + _pad(offsets_size)
+            column["data"] = position
+            column["data_length"] = data_size
+            position += data_size + _pad(data_size)
+            column["nulls"] = position
+            position += nulls_size + _pad(nulls_size)
+            header["columns"].append(column)
+        encoded = json.dumps(header).encode("utf-8")
+        encoded += b" " * _pad(len(MAGIC) + 8 + len(encoded))
+
+        # Step 2: Write the header and copy each column's sections into place
+        fd, temp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(MAGIC)
+                f.write(struct.pack("<Q", len(encoded)))
+                f.write(encoded)
+                for spill, (offsets_size, data_size, nulls_size) in zip(spills, sizes):
+                    for source, size in ((spill.offsets_file, offsets_size), (spill.data_file, data_size),
+                                         (spill.nulls_file, nulls_size)):
+                        _copy(source, f)
+                        f.write(b"\0" * _pad(size))
+            os.replace(temp_path, path)
+        except BaseException:
+            try:
+                os.unlink(temp_path)
+            except OSError:
+                pass
+            raise
+        return count
+    finally:
+        for spill in spills:
+            spill.close()
+
+class RecipientCache:
+    """Parsed copies of recipient files under ``data/cache/recipients``.
+
+    Entries are content-addressed: named after a hash of the file's bytes,
+    so a changed file is re-parsed automatically and identical files share
+    one entry. Hashing is skipped while the path, size and modification
+    time match the last hash taken (kept in ``index.json``). The least
+    recently used entries are removed once the cache outgrows
+    ``max_bytes``.
+    """
+
+    def __init__(self, directory: str = DEFAULT_CACHE_DIR, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.index_path = os.path.join(directory, "index.json")
+        self._lock = threading.Lock()
+        self._converting: Dict[str, threading.Lock] = {}
+        os.makedirs(directory, exist_ok=True)
+        self._index: Dict[str, Dict[str, Any]] = self._load_index()
+
+    def load(self, path: str, chunk_size: int = 10000) -> ColumnarRecipients:
+        """Return the cached copy of a recipient file, parsing it first if needed"""
+        source = RecipientFile(path, chunk_size)
+        digest = self._digest(path)
+        entry_path = os.path.join(self.directory, digest + EXTENSION)
+
+        with self._lock:
+            converting = self._converting.setdefault(digest, threading.Lock())
+        with converting:
+            cached = None
+            if os.path.exists(entry_path):
+                try:
+                    cached = ColumnarRecipients(entry_path)
+                    os.utime(entry_path)  # Mark as recently used
+                except (OSError, ValueError, KeyError) as e:
+                    logger.warning(f"Discarding unreadable recipient cache entry {entry_path}: {e}")
+
+            if cached is None:
+                count = write_columnar(entry_path, source.columns(), source.rows())
+                logger.info(f"Cached {count} recipients from {path}")
+                cached = ColumnarRecipients(entry_path)
+
+        self._evict(keep=entry_path)
+        return cached
+
+    def _digest(self, path: str) -> str:
+        stat = os.stat(path)
+        key = os.path.abspath(path)
+        with self._lock:
+            entry = self._index.get(key)
+        if entry and entry["size"] == stat.st_size and entry["mtime_ns"] == stat.st_mtime_ns:
+            return entry["hash"]
+
+        # The extension is part of the key since it decides how the bytes are parsed
+        digest = hashlib.blake2b(digest_size=20)
+        digest.update(f"{FORMAT_VERSION}:{os.path.splitext(path)[1].lower()}:".encode("utf-8"))
+        with open(path, "rb") as f:
+            while True:
+                block = f.read(FLUSH_BYTES)
+                if not block:
+                    break
+                digest.update(block)
+        value = digest.hexdigest()
+
+        with self._lock:
+            self._index[key] = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "hash": value}
+            self._save_index()
+        return value
+
+    def _evict(self, keep: str) -> None:
+        """Remove least recently used entries until the cache fits in max_bytes"""
+        entries = []
+        for name in os.listdir(self.directory):
+            if not name.endswith(EXTENSION):
+                continue
+            entry_path = os.path.join(self.directory, name)
+            try:
+                stat = os.stat(entry_path)
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, entry_path))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, entry_path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            if entry_path == keep:
+                continue
+            try:
+                os.unlink(entry_path)
+                total -= size
+            except OSError as e:
+                # Still mapped by a running task on Windows; try again next time
+                logger.debug(f"Could not evict {entry_path}: {e}")
+
+        # Forget hashes of files that no longer exist
+        with self._lock:
+            missing = [key for key in self._index if not os.path.exists(key)]
+            if missing:
+                for key in missing:
+                    del self._index[key]
+                self._save_index()
+
+    def _load_index(self) -> Dict[str, Dict[str, Any]]:
+        try:
+            with open(self.index_path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return {}
+
+    def _save_index(self) -> None:
+        fd, temp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(self._index, f)
+            os.replace(temp_path, self.index_path)
+        except OSError as e:
+            logger.error(f"Error saving recipient cache index: {e}")
+            try:
+                os.unlink(temp_path)
+            except OSError:
+                pass
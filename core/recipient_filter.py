@@ -0,0 +1,167 @@
+import os
+import re
+import hashlib
+import datetime
+import tempfile
+import threading
+import logging
+from typing import Dict, Any, Optional, Iterable, Iterator, Tuple
+
+from core.recipients import to_text
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SUPPRESSION_FILE = os.path.join("data", "suppressions.tsv")
+
+# Reasons a recipient is dropped before sending, in the order they are checked
+REMOVAL_REASONS = ("missing", "malformed", "duplicate", "suppressed")
+SUPPRESSION_REASONS = ("bounce", "opt-out", "manual")
+
+# One @, no whitespace, and a dot in the domain; Outlook rejects anything looser
+EMAIL_PATTERN = re.compile(r"[^@\s<>(),;:\"\[\]]+@[A-Za-z0-9](?:[A-Za-z0-9\-]*[A-Za-z0-9])?(?:\.[A-Za-z0-9](?:[A-Za-z0-9\-]*[A-Za-z0-9])?)+")
+
+def normalize_email(value: Any) -> Optional[str]:
+    """Return the address in canonical form (trimmed, lowercase), or None if empty"""
+    text = to_text(value)
+    if text is None:
+        return None
+    text = text.strip().lower()
+    if text.startswith("mailto:"):
+        text = text[7:]
+    return text or None
+
+def email_hash(email: str) -> str:
+    """Hash of a normalized address; the suppression list stores only these"""
+    return hashlib.blake2b(email.encode("utf-8"), digest_size=16).hexdigest()
+
+class SuppressionList:
+    """Addresses that must never be sent to (bounces, opt-outs).
+
+    Stored in ``data/suppressions.tsv`` as ``hash<TAB>reason<TAB>timestamp``
+    lines: only hashes of the normalized addresses are kept, and lookups
+    are a dict probe. Additions are appended; removals rewrite the file.
+    ``reload_if_changed`` picks up edits made by another process.
+    """
+
+    def __init__(self, path: str = DEFAULT_SUPPRESSION_FILE):
+        self.path = path
+        self._entries: Dict[str, str] = {}  # hash -> reason
+        self._lock = threading.Lock()
+        self._stamp = None
+        self.reload_if_changed()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def reason(self, email: str) -> Optional[str]:
+        """Return why a normalized address is suppressed, or None"""
+        return self._entries.get(email_hash(email))
+
+    def contains_hash(self, hashed: str) -> bool:
+        return hashed in self._entries
+
+    def add(self, email: str, reason: str = "manual") -> bool:
+        """Suppress an address; returns False if it already was"""
+        normalized = normalize_email(email)
+        if normalized is None:
+            raise ValueError("Empty email address")
+        if reason not in SUPPRESSION_REASONS:
+            raise ValueError(f"Unknown suppression reason: {reason}")
+        hashed = email_hash(normalized)
+        with self._lock:
+            if hashed in self._entries:
+                return False
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(f"{hashed}\t{reason}\t{datetime.datetime.now().isoformat()}\n")
+            self._entries[hashed] = reason
+            self._stamp = self._file_stamp()
+        return True
+
+    def remove(self, email: str) -> bool:
+        """Stop suppressing an address; returns False if it was not suppressed"""
+        normalized = normalize_email(email)
+        if normalized is None:
+            return False
+        hashed = email_hash(normalized)
+        with self._lock:
+            if hashed not in self._entries:
+                return False
+            with open(self.path, "r", encoding="utf-8") as f:
+                lines = [line for line in f if not line.startswith(hashed + "\t")]
+            fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(self.path) or ".", suffix=".tmp")
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                f.writelines(lines)
+            os.replace(temp_path, self.path)
+            del self._entries[hashed]
+            self._stamp = self._file_stamp()
+        return True
+
+    def reload_if_changed(self) -> None:
+        """Reload the file if it changed since it was last read"""
+        stamp = self._file_stamp()
+        with self._lock:
+            if stamp == self._stamp:
+                return
+            entries = {}
+            if stamp is not None:
+                try:
+                    with open(self.path, "r", encoding="utf-8") as f:
+                        for line in f:
+                            parts = line.rstrip("\n").split("\t")
+                            if len(parts) >= 2 and parts[0]:
+                                entries[parts[0]] = parts[1]
+                except OSError as e:
+                    logger.error(f"Error loading suppression list: {e}")
+                    return
+            self._entries = entries
+            self._stamp = stamp
+
+    def _file_stamp(self) -> Optional[Tuple[int, int]]:
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+class RecipientFilter:
+    """Cleans a stream of recipients before anything is sent.
+
+    Addresses are normalized (trimmed, lowercase, ``mailto:`` removed) and
+    rows are dropped when the address is missing, malformed, already seen
+    in this run or on the suppression list. Duplicates are detected on a
+    set of address hashes, so memory per recipient stays small. ``removed``
+    counts the dropped rows by reason.
+    """
+
+    def __init__(self, suppressions: Optional[SuppressionList] = None):
+        self.suppressions = suppressions
+        self.removed: Dict[str, int] = dict.fromkeys(REMOVAL_REASONS, 0)
+        self.kept = 0
+        self._seen = set()
+
+    def filter(self, recipients: Iterable[Dict[str, Any]]) -> Iterator[Dict[str, Any]]:
+        """Yield the recipients that should be sent to, with normalized addresses"""
+        removed = self.removed
+        seen = self._seen
+        suppressions = self.suppressions
+        match = EMAIL_PATTERN.fullmatch
+        for recipient in recipients:
+            email = normalize_email(recipient.get("email"))
+            if email is None:
+                removed["missing"] += 1
+                continue
+            if not match(email):
+                removed["malformed"] += 1
+                continue
+            hashed = email_hash(email)
+            if hashed in seen:
+                removed["duplicate"] += 1
+                continue
+            seen.add(hashed)
+            if suppressions is not None and suppressions.contains_hash(hashed):
+                removed["suppressed"] += 1
+                continue
+            recipient = dict(recipient, email=email)
+            self.kept += 1
+            yield recipient
@@ -0,0 +1,181 @@
+import os
+import logging
+from typing import Dict, List, Any, Optional, Iterable, Iterator, Set
+
+logger = logging.getLogger(__name__)
+
+# Columns always kept, whatever the templates reference
+REQUIRED_COLUMNS = ("email", "name")
+
+def to_text(value: Any) -> Optional[str]:
+    """Normalize a cell to text; empty cells become None and whole numbers drop the trailing .0"""
+    # None, or NaN from pandas (NaN is the only value not equal to itself)
+    if value is None or value != value:
+        return None
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value)
+
+class RecipientFile:
+    """A CSV or Excel recipient file read as a stream of rows.
+
+    CSV files are read with pandas in ``chunk_size`` row chunks and .xlsx
+    files through openpyxl's read-only mode, so memory use does not grow
+    with the file. Only the requested columns are kept in each row.
+    Legacy .xls files cannot be streamed and are read whole.
+    """
+
+    def __init__(self, path: str, chunk_size: int = 10000):
+        self.path = path
+        self.chunk_size = chunk_size
+        extension = os.path.splitext(path)[1].lower()
+        if extension not in (".csv", ".xlsx", ".xls"):
+            raise ValueError(f"Unsupported file format: {path}")
+        self.extension = extension
+        self._columns: Optional[List[str]] = None
+
+    def columns(self) -> List[str]:
+        """Return the header row"""
+        if self._columns is None:
+            if self.extension == ".csv":
+                import pandas as pd
+                self._columns = [str(column) for column in pd.read_csv(self.path, nrows=0).columns]
+            elif self.extension == ".xlsx":
+                workbook = self._open_workbook()
+                try:
+                    header = next(workbook.active.iter_rows(max_row=1, values_only=True), ())
+                finally:
+                    workbook.close()
+                self._columns = [str(column) for column in header if column is not None]
+            else:
+                import pandas as pd
+                self._columns = [str(column) for column in pd.read_excel(self.path, nrows=0).columns]
+        return self._columns
+
+    def rows(self, columns: Optional[Iterable[str]] = None) -> Iterator[Dict[str, Any]]:
+        """Yield one dict per row, restricted to ``columns`` if given"""
+        keep = set(columns) if columns is not None else None
+        if self.extension == ".csv":
+            yield from self._csv_rows(keep)
+        elif self.extension == ".xlsx":
+            yield from self._xlsx_rows(keep)
+        else:
+            yield from self._xls_rows(keep)
+
+    def _csv_rows(self, keep: Optional[Set[str]]) -> Iterator[Dict[str, Any]]:
+        import pandas as pd
+        usecols = (lambda column: column in keep) if keep is not None else None
+        # Read everything as text so chunks agree on types and numbers render as written
+        for chunk in pd.read_csv(self.path, chunksize=self.chunk_size, usecols=usecols, dtype=str):
+            yield from chunk.to_dict(orient="records")
+
+    def _xlsx_rows(self, keep: Optional[Set[str]]) -> Iterator[Dict[str, Any]]:
+        workbook = self._open_workbook()
+        try:
+            rows = _sheet_rows(workbook.active)
+            header = next(rows, None)
+            if header is None:
+                return
+            wanted = [(i, str(column)) for i, column in enumerate(header)
+                      if column is not None and (keep is None or str(column) in keep)]
+            for values in rows:
+                if values is None or all(value is None for value in values):
+                    continue
+                yield {column: to_text(values[i]) if i < len(values) else None for i, column in wanted}
+        finally:
+            workbook.close()
+
+    def _xls_rows(self, keep: Optional[Set[str]]) -> Iterator[Dict[str, Any]]:
+        import pandas as pd
+        usecols = (lambda column: column in keep) if keep is not None else None
+        df = pd.read_excel(self.path, usecols=usecols)
+        for start in range(0, len(df), self.chunk_size):
+            for row in df.iloc[start:start + self.chunk_size].to_dict(orient="records"):
+                yield {column: to_text(value) for column, value in row.items()}
+
+    def _open_workbook(self):
+        from openpyxl import load_workbook
+        return load_workbook(self.path, read_only=True, data_only=True)
+
+def _sheet_rows(sheet) -> Iterator[List[Any]]:
+    """Yield the cell values of each row of a read-only worksheet.
+
+    openpyxl's ``iter_rows`` keeps every parsed (emptied) row element in
+    the XML tree until the end of the sheet, about 80 bytes per row; here
+    each row is dropped once parsed, so memory stays flat. Cells are parsed
+    by openpyxl, so values (dates included) are the same.
+    """
+    from openpyxl.xml.functions import iterparse
+    from openpyxl.worksheet._reader import WorkSheetParser, ROW_TAG, DATA_TAG
+
+    workbook = sheet.parent
+    with sheet._get_source() as source:
+        parser = WorkSheetParser(source, sheet._shared_strings, data_only=workbook.data_only,
+                                 epoch=workbook.epoch, date_formats=workbook._date_formats,
+                                 timedelta_formats=workbook._timedelta_formats)
+        sheet_data = None
+        for event, element in iterparse(source, events=("start", "end")):
+            if event == "start":
+                if element.tag == DATA_TAG:
+                    sheet_data = element
+                continue
+            if element.tag != ROW_TAG:
+                continue
+            _, cells = parser.parse_row(element)
+            values = [None] * max((cell["column"] for cell in cells), default=0)
+            for cell in cells:
+                values[cell["column"] - 1] = cell["value"]
+            if sheet_data is not None:
+                sheet_data.clear()
+            yield values
+
+class RecipientSource:
+    """All recipients of a task: manual recipients first, then the recipient file.
+
+    ``fields()`` lists the available columns without reading the file's
+    rows. ``rows(columns)`` streams recipients keeping only ``columns``
+    plus the required ones, so templates decide what is held in memory.
+    With a RecipientCache the file is read from its parsed copy.
+    """
+
+    def __init__(self, task: Dict[str, Any], chunk_size: int = 10000, cache=None):
+        self.manual: List[Dict[str, Any]] = list(task.get("manual_recipients") or [])
+        self.file = None
+        if task.get("recipient_file"):
+            self.file = self._open_file(task["recipient_file"], chunk_size, cache)
+
+    @staticmethod
+    def _open_file(path: str, chunk_size: int, cache):
+        """Open a recipient file through the cache when there is one"""
+        if cache is not None:
+            try:
+                return cache.load(path, chunk_size)
+            except (FileNotFoundError, ValueError):
+                raise
+            except Exception as e:
+                logger.warning(f"Recipient cache unavailable for {path}, reading the file directly: {e}")
+        return RecipientFile(path, chunk_size)
+
+    def fields(self) -> Set[str]:
+        """Return every column a recipient may have"""
+        fields = set(REQUIRED_COLUMNS)
+        for recipient in self.manual:
+            fields.update(recipient.keys())
+        if self.file:
+            fields.update(self.file.columns())
+        return fields
+
+    def rows(self, columns: Optional[Iterable[str]] = None) -> Iterator[Dict[str, Any]]:
+        """Yield recipients as compact dicts"""
+        keep = None
+        if columns is not None:
+            keep = set(columns)
+            keep.update(REQUIRED_COLUMNS)
+
+        for recipient in self.manual:
+            if keep is None:
+                yield recipient
+            else:
+                yield {key: value for key, value in recipient.items() if key in keep}
+        if self.file:
+            yield from self.file.rows(keep)
@@ -0,0 +1,91 @@
+import calendar
+import datetime
+from typing import Dict, Any, Optional, Tuple
+
+# What to do when a task's scheduled time passed while the app was not running
+MISFIRE_POLICIES = ["run_once", "run_all", "skip"]
+DEFAULT_MISFIRE_POLICY = "run_once"
+
+# A run that starts later than this after its slot counts as missed
+MISFIRE_GRACE = datetime.timedelta(minutes=5)
+
+_PERIODS = {
+    "daily": datetime.timedelta(days=1),
+    "weekly": datetime.timedelta(weeks=1),
+}
+
+def normalize_recurrence(recurrence: Optional[str]) -> str:
+    """Map stored recurrence values onto once/daily/weekly/monthly"""
+    recurrence = (recurrence or "once").lower()
+    if recurrence in ("once", "one-time"):
+        return "once"
+    if recurrence in ("weekly", "monthly"):
+        return recurrence
+    return "daily"
+
+def add_months(value: datetime.datetime, months: int, day: Optional[int] = None) -> datetime.datetime:
+    """Shift a datetime by whole months, clamping to the end of shorter months.
+
+    ``day`` is the intended day of the month, so a schedule anchored on
+    the 31st returns to the 31st after passing through February.
+    """
+    index = value.year * 12 + value.month - 1 + months
+    year, month = divmod(index, 12)
+    month += 1
+    day = min(day or value.day, calendar.monthrange(year, month)[1])
+    return value.replace(year=year, month=month, day=day)
+
+def shift(recurrence: str, value: datetime.datetime, periods: int,
+          anchor_day: Optional[int] = None) -> datetime.datetime:
+    """Return the slot ``periods`` occurrences after ``value``"""
+    if recurrence == "monthly":
+        return add_months(value, periods, anchor_day)
+    return value + periods * _PERIODS[recurrence]
+
+def next_occurrence(recurrence: str, scheduled: datetime.datetime, now: datetime.datetime,
+                    anchor_day: Optional[int] = None) -> Tuple[datetime.datetime, int]:
+    """Return the first slot after both ``scheduled`` and ``now``, in O(1).
+
+    Also returns how many slots lie strictly between the two.
+    """
+    if recurrence == "monthly":
+        periods = max((now.year - scheduled.year) * 12 + now.month - scheduled.month, 1)
+        candidate = add_months(scheduled, periods, anchor_day)
+        if candidate <= now:
+            periods += 1
+            candidate = add_months(scheduled, periods, anchor_day)
+    else:
+        period = _PERIODS[recurrence]
+        periods = max((now - scheduled) // period + 1, 1)
+        candidate = scheduled + periods * period
+    return candidate, periods - 1
+
+def advance(task: Dict[str, Any], now: datetime.datetime) -> Tuple[bool, int]:
+    """Move a due task's next_run on according to its misfire policy.
+
+    Updates ``task`` in place and returns ``(run_now, skipped)``: whether
+    the task should run for this slot and how many slots were dropped.
+    """
+    recurrence = normalize_recurrence(task.get("recurrence"))
+    policy = task.get("misfire_policy", DEFAULT_MISFIRE_POLICY)
+    scheduled = datetime.datetime.fromisoformat(task["next_run"])
+    missed = now - scheduled > MISFIRE_GRACE
+    run_now = not (missed and policy == "skip")
+
+    if recurrence == "once":
+        # One-time tasks are deactivated after their slot
+        task["active"] = False
+        return run_now, 0 if run_now else 1
+
+    anchor_day = None
+    if recurrence == "monthly":
+        anchor_day = task.setdefault("anchor_day", scheduled.day)
+
+    if policy == "run_all":
+        # Step one slot at a time; later slots are still due and run in turn
+        task["next_run"] = shift(recurrence, scheduled, 1, anchor_day).isoformat()
+        return True, 0
+
+    next_run, between = next_occurrence(recurrence, scheduled, now, anchor_day)
+    task["next_run"] = next_run.isoformat()
+    return run_now, between + (0 if run_now else 1)
@@ -0,0 +1,193 @@
+import time
+import heapq
+import datetime
+import threading
+import logging
+from typing import Dict, List, Any, Optional, Tuple, Callable
+
+logger = logging.getLogger(__name__)
+
+class Scheduler:
+    """Min-heap of (deadline, task id) that wakes up when the earliest task is due.
+
+    Tasks are armed from their ``next_run`` and re-armed whenever they are
+    saved (``update``) or deleted (``remove``); superseded heap entries are
+    skipped lazily, and the heap is rebuilt once they outnumber the armed
+    tasks. The thread sleeps until the earliest deadline but never
+    longer than ``max_sleep`` seconds, so wall-clock jumps and sleep/resume
+    are noticed promptly. When the wall clock and the monotonic clock
+    disagree, deadlines are recomputed from ``next_run`` (which also
+    handles DST and timezone changes). Each wake-up costs O(log n) per due
+    task, independent of how many tasks are scheduled.
+
+    ``on_due(task_ids)`` is called from the scheduler thread, as is
+    ``watch()`` on every wake-up (at least every ``max_sleep`` seconds),
+    for example to pick up tasks changed by another process.
+    """
+
+    def __init__(self, on_due: Callable[[List[str]], None], max_sleep: float = 5.0,
+                 watch: Optional[Callable[[], None]] = None):
+        self.on_due = on_due
+        self.watch = watch
+        self.max_sleep = max_sleep
+        self._heap: List[Tuple[float, int, str]] = []
+        self._armed: Dict[str, Tuple[float, str]] = {}  # task id -> (deadline, next_run)
+        self._counter = 0
+        self._condition = threading.Condition()
+        self._running = False
+        self._thread: Optional[threading.Thread] = None
+
+    @staticmethod
+    def _deadline(next_run: str) -> float:
+        return datetime.datetime.fromisoformat(next_run).timestamp()
+
+    def load(self, tasks: List[Dict[str, Any]]) -> None:
+        """Arm all active tasks, replacing anything scheduled before"""
+        with self._condition:
+            self._armed = {}
+            for task in tasks:
+                armed = self._armed_time(task)
+                if armed:
+                    self._armed[task["id"]] = armed
+            self._rebuild()
+            self._condition.notify()
+
+    def update(self, task: Dict[str, Any]) -> None:
+        """Re-arm a task after it was created or changed"""
+        with self._condition:
+            self._armed.pop(task["id"], None)
+            armed = self._armed_time(task)
+            if armed:
+                self._push(task["id"], *armed)
+            self._condition.notify()
+
+    def remove(self, task_id: str) -> None:
+        """Disarm a deleted task"""
+        with self._condition:
+            self._armed.pop(task_id, None)
+
+    def retry(self, task_id: str, delay: float) -> None:
+        """Fire a task again after ``delay`` seconds (e.g. if it was busy)"""
+        with self._condition:
+            deadline = time.time() + delay
+            next_run = datetime.datetime.fromtimestamp(deadline).isoformat()
+            self._push(task_id, deadline, next_run)
+            self._condition.notify()
+
+    def next_deadline(self) -> Optional[float]:
+        """Return the earliest armed deadline (epoch seconds), if any"""
+        with self._condition:
+            self._drop_stale()
+            return self._heap[0][0] if self._heap else None
+
+    def start(self) -> None:
+        """Start the scheduler thread"""
+        with self._condition:
+            if self._running:
+                return
+            self._running = True
+        self._thread = threading.Thread(target=self._run, name="scheduler", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stop the scheduler thread"""
+        with self._condition:
+            self._running = False
+            self._condition.notify()
+        if self._thread:
+            self._thread.join()
+            self._thread = None
+
+    def _armed_time(self, task: Dict[str, Any]) -> Optional[Tuple[float, str]]:
+        """Return (deadline, next_run) for an active task, or None"""
+        if not task.get("active", True) or not task.get("next_run"):
+            return None
+        try:
+            return self._deadline(task["next_run"]), task["next_run"]
+        except ValueError:
+            logger.error(f"Task {task['id']} has an invalid next_run: {task['next_run']}")
+            return None
+
+    def _push(self, task_id: str, deadline: float, next_run: str) -> None:
+        self._counter += 1
+        self._armed[task_id] = (deadline, next_run)
+        heapq.heappush(self._heap, (deadline, self._counter, task_id))
+        self._compact_if_needed()
+
+    def _compact_if_needed(self) -> bool:
+        """Rebuild the heap when superseded entries dominate it; returns True if it did"""
+        if len(self._heap) > 2 * len(self._armed) + 64:
+            self._rebuild()
+            return True
+        return False
+
+    def _drop_stale(self) -> None:
+        """Pop heap entries superseded by a later update or removal"""
+        # Lazy deletion leaves garbage throughout the heap, not just at the top
+        if self._compact_if_needed():
+            return
+
+        while self._heap:
+            deadline, _, task_id = self._heap[0]
+            armed = self._armed.get(task_id)
+            if armed is not None and armed[0] == deadline:
+                return
+            heapq.heappop(self._heap)
+
+    def _rebuild(self) -> None:
+        self._heap = []
+        for task_id, (deadline, _) in self._armed.items():
+            self._counter += 1
+            self._heap.append((deadline, self._counter, task_id))
+        heapq.heapify(self._heap)
+
+    def _recompute_deadlines(self) -> None:
+        """Re-derive deadlines from next_run after a clock change"""
+        for task_id, (_, next_run) in list(self._armed.items()):
+            try:
+                self._armed[task_id] = (self._deadline(next_run), next_run)
+            except ValueError:
+                del self._armed[task_id]
+        self._rebuild()
+
+    def _run(self) -> None:
+        last_wall, last_monotonic = time.time(), time.monotonic()
+        while True:
+            if self.watch is not None:
+                try:
+                    self.watch()
+                except Exception as e:
+                    logger.error(f"Error checking for task changes: {e}")
+
+            with self._condition:
+                if not self._running:
+                    return
+
+                # Detect wall-clock jumps and suspend/resume
+                wall, monotonic = time.time(), time.monotonic()
+                drift = (wall - last_wall) - (monotonic - last_monotonic)
+                if abs(drift) > 1.0:
+                    logger.info(f"Clock changed by {drift:.1f}s; recomputing task deadlines")
+                    self._recompute_deadlines()
+                last_wall, last_monotonic = wall, monotonic
+
+                self._drop_stale()
+                due = []
+                while self._heap and self._heap[0][0] <= wall:
+                    _, _, task_id = heapq.heappop(self._heap)
+                    if task_id in self._armed:
+                        del self._armed[task_id]
+                        due.append(task_id)
+                    self._drop_stale()
+
+                if not due:
+                    timeout = self.max_sleep
+                    if self._heap:
+                        timeout = min(timeout, max(0.0, self._heap[0][0] - wall))
+                    self._condition.wait(timeout)
+                    continue
+
+            try:
+                self.on_due(due)
+            except Exception as e:
+                logger.error(f"Error dispatching due tasks: {e}")
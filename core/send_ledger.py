@@ -0,0 +1,218 @@
+import os
+import time
+import datetime
+import tempfile
+import threading
+import logging
+from pathlib import Path
+from typing import Dict, List, Optional, Set, Tuple
+
+from core.event_log import GroupCommitWriter
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_LEDGER_DIR = os.path.join("data", "ledgers")
+DEFAULT_RETENTION_DAYS = 30
+
+# Ledgers being written end in .ledger; completed (compacted) ones in .done
+OPEN_SUFFIX = ".ledger"
+DONE_SUFFIX = ".done"
+
+SENT = "sent"
+FAILED = "failed"
+
+class SendLedger:
+    """Which recipients one send run of a task has already handled.
+
+    Each line is ``recipient hash<TAB>status<TAB>timestamp``, appended
+    through a GroupCommitWriter; ``commit`` fsyncs, and is called once per
+    send batch, so a crash loses at most the batch in flight. The hashes of
+    sent recipients are held in a set, so ``is_sent`` is constant-time even
+    for a million recipients. ``finish`` compacts the ledger down to the
+    sent recipients and marks it done.
+    """
+
+    def __init__(self, path: Path, run_key: str):
+        self.path = Path(path)
+        self.run_key = run_key
+        self._sent: Set[str] = set()
+        self.failed = 0
+        self._writer: Optional[GroupCommitWriter] = None
+
+        # Step 1: Load what an earlier, interrupted attempt already did
+        if self.path.exists():
+            statuses = _read_statuses(self.path)
+            self._sent = {hashed for hashed, status in statuses.items() if status == SENT}
+            _terminate_last_line(self.path)
+        else:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.path, "w", encoding="utf-8") as f:
+                f.write(f"#run\t{run_key}\t{datetime.datetime.now().isoformat()}\n")
+
+        # Step 2: Append from here on
+        self._writer = GroupCommitWriter(self.path)
+
+    @property
+    def sent_count(self) -> int:
+        return len(self._sent)
+
+    def is_sent(self, hashed: str) -> bool:
+        """Return True if the recipient was already sent to in this run"""
+        return hashed in self._sent
+
+    def record(self, hashed: str, status: str) -> None:
+        """Record the outcome of one send"""
+        self._writer.write(f"{hashed}\t{status}\t{datetime.datetime.now().isoformat()}")
+        if status == SENT:
+            self._sent.add(hashed)
+        else:
+            self.failed += 1
+
+    def commit(self) -> None:
+        """Make everything recorded so far durable"""
+        self._writer.flush(fsync=True)
+
+    def finish(self) -> Path:
+        """Close the ledger and compact it into a .done file"""
+        self.close()
+        return compact(self.path)
+
+    def close(self) -> None:
+        """Flush and close without marking the run done (it can be resumed)"""
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+
+class NullLedger:
+    """Stands in for a SendLedger when a run delivers nothing (test transports): nothing to record or resume"""
+
+    run_key = ""
+    sent_count = 0
+    failed = 0
+
+    def is_sent(self, hashed: str) -> bool:
+        return False
+
+    def record(self, hashed: str, status: str) -> None:
+        pass
+
+    def commit(self) -> None:
+        pass
+
+    def finish(self) -> None:
+        pass
+
+    def close(self) -> None:
+        pass
+
+def _read_statuses(path: Path) -> Dict[str, str]:
+    """Return the last status recorded for each recipient hash"""
+    statuses: Dict[str, str] = {}
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            if line.startswith("#"):
+                continue
+            parts = line.rstrip("\n").split("\t")
+            if len(parts) >= 2 and parts[0]:
+                statuses[parts[0]] = parts[1]
+    return statuses
+
+def _terminate_last_line(path: Path) -> None:
+    """Complete a line cut short by a crash so appends start on a fresh line"""
+    with open(path, "rb+") as f:
+        f.seek(0, os.SEEK_END)
+        if f.tell() == 0:
+            return
+        f.seek(-1, os.SEEK_END)
+        if f.read(1) != b"\n":
+            f.write(b"\n")
+
+def compact(path: Path) -> Path:
+    """Rewrite a ledger keeping only the last "sent" line per recipient, as a .done file"""
+    path = Path(path)
+    header = None
+    latest: Dict[str, str] = {}
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            if line.startswith("#run"):
+                header = line
+                continue
+            if line.startswith("#"):
+                continue
+            parts = line.split("\t", 2)
+            if len(parts) >= 2 and parts[0]:
+                latest[parts[0]] = line if parts[1] == SENT else ""
+
+    done_path = path.with_suffix(DONE_SUFFIX)
+    fd, temp_path = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            if header:
+                f.write(header)
+            f.writelines(line for line in latest.values() if line)
+            f.write(f"#complete\t{datetime.datetime.now().isoformat()}\n")
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, done_path)
+    except BaseException:
+        try:
+            os.unlink(temp_path)
+        except OSError:
+            pass
+        raise
+    path.unlink()
+    return done_path
+
+class SendLedgers:
+    """Send ledgers of all tasks, kept in ``data/ledgers/<task id>/<run key>.ledger``.
+
+    A scheduled run is keyed by the occurrence it runs, so a retried
+    occurrence resumes its own ledger while the next occurrence starts a
+    fresh one. A manual run resumes the task's interrupted ledger if there
+    is one. Completed ledgers are deleted after ``retention_days``.
+    """
+
+    def __init__(self, directory: str = DEFAULT_LEDGER_DIR, retention_days: int = DEFAULT_RETENTION_DAYS):
+        self.directory = Path(directory)
+        self.retention_days = retention_days
+        self._lock = threading.Lock()
+
+    def open(self, task_id: str, scheduled: Optional[datetime.datetime] = None) -> SendLedger:
+        """Open the ledger for a run of a task, resuming an interrupted one where it applies"""
+        task_dir = self.directory / task_id
+        with self._lock:
+            self._prune(task_dir)
+            interrupted = sorted(task_dir.glob("*" + OPEN_SUFFIX), key=lambda path: path.stat().st_mtime)
+
+            if scheduled is not None:
+                run_key = scheduled.strftime("%Y%m%dT%H%M%S")
+                # Ledgers of earlier occurrences will not be resumed any more
+                for path in interrupted:
+                    if path.stem != run_key:
+                        logger.warning(f"Closing interrupted send ledger {path} of an earlier run")
+                        compact(path)
+                done_path = task_dir / (run_key + DONE_SUFFIX)
+                if done_path.exists():
+                    # Re-running an occurrence that completed: still skip who was sent to
+                    os.replace(done_path, task_dir / (run_key + OPEN_SUFFIX))
+            elif interrupted:
+                run_key = interrupted[-1].stem
+            else:
+                run_key = "manual-" + datetime.datetime.now().strftime("%Y%m%dT%H%M%S%f")
+
+            return SendLedger(task_dir / (run_key + OPEN_SUFFIX), run_key)
+
+    def interrupted(self) -> List[Tuple[str, str]]:
+        """Return (task id, run key) of every ledger that was not finished"""
+        return [(path.parent.name, path.stem) for path in self.directory.glob("*/*" + OPEN_SUFFIX)]
+
+    def _prune(self, task_dir: Path) -> None:
+        if not self.retention_days:
+            return
+        cutoff = time.time() - self.retention_days * 86400
+        for path in task_dir.glob("*" + DONE_SUFFIX):
+            try:
+                if path.stat().st_mtime < cutoff:
+                    path.unlink()
+            except OSError as e:
+                logger.error(f"Error removing old send ledger {path}: {e}")
@@ -0,0 +1,210 @@
+import time
+import threading
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Any, Iterator, Optional, Sequence, Tuple
+
+from core.task_executor import initialize_worker
+from core.mail_transport import MailTransport
+from core.metrics import SEND_LATENCY, SEND_CONCURRENCY_LIMIT, SEND_BACKOFFS, SEND_RATE_LIMIT_WAIT
+
+logger = logging.getLogger(__name__)
+
+# (recipient, subject, body, attachments), or a list of BCC recipients for bulk sends
+Message = Tuple[Any, str, str, List[Any]]
+
+# (perf_counter() when the send started, seconds it took, worker thread id)
+SendTiming = Tuple[float, float, int]
+
+MAX_BACKOFF = 30.0  # Seconds
+
+class TokenBucket:
+    """Allows ``rate_per_minute`` sends per minute, with bursts of up to ``burst``.
+
+    A rate of 0 means no limit.
+    """
+
+    def __init__(self, rate_per_minute: float, burst: Optional[int] = None):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = float(burst or max(1, round(rate_per_minute / 12)))  # About 5 seconds' worth
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, stop: Optional[threading.Event] = None) -> bool:
+        """Take a token, waiting for one if needed; False if ``stop`` was set meanwhile"""
+        if self.rate <= 0:
+            return True
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return True
+                wait = (1 - self._tokens) / self.rate
+            if stop is not None:
+                if stop.wait(wait):
+                    return False
+            else:
+                time.sleep(wait)
+
+class SendController:
+    """Adapts how many sends run in parallel to how the mail server copes.
+
+    Additive increase, multiplicative decrease: when the recent error rate
+    passes ``error_threshold`` or recent latency grows beyond
+    ``latency_factor`` times its long-run average, the limit is halved and
+    sending pauses for a backoff that doubles while trouble continues (up
+    to MAX_BACKOFF). After ``window`` healthy sends the limit grows by one,
+    up to ``max_concurrency``.
+    """
+
+    def __init__(self, max_concurrency: int, window: int = 20, error_threshold: float = 0.2,
+                 latency_factor: float = 3.0):
+        self.max_concurrency = max(1, max_concurrency)
+        self.limit = self.max_concurrency
+        self.window = window
+        self.error_threshold = error_threshold
+        self.latency_factor = latency_factor
+        self._active = 0
+        self._resume_at = 0.0
+        self._backoff = 0.0
+        self._samples = 0
+        self._healthy = 0
+        self._error_rate = 0.0
+        self._latency = None  # Recent (fast) average
+        self._baseline = None  # Long-run (slow) average
+        self._condition = threading.Condition()
+        SEND_CONCURRENCY_LIMIT.set(self.limit)
+
+    def acquire(self, stop: Optional[threading.Event] = None) -> bool:
+        """Wait for a free send slot; False if ``stop`` was set meanwhile"""
+        with self._condition:
+            while True:
+                if stop is not None and stop.is_set():
+                    return False
+                wait = self._resume_at - time.monotonic()
+                if wait <= 0 and self._active < self.limit:
+                    self._active += 1
+                    return True
+                self._condition.wait(wait if wait > 0 else 0.5)
+
+    def release(self, latency: float, ok: bool) -> None:
+        """Free the slot and learn from the send's outcome"""
+        with self._condition:
+            self._active -= 1
+            self._observe(latency, ok)
+            self._condition.notify_all()
+
+    def _observe(self, latency: float, ok: bool) -> None:
+        self._samples += 1
+        self._error_rate += 0.1 * ((0.0 if ok else 1.0) - self._error_rate)
+        if self._latency is None:
+            self._latency = self._baseline = latency
+        else:
+            self._latency += 0.2 * (latency - self._latency)
+            self._baseline += 0.01 * (latency - self._baseline)
+
+        # Wait for a full window of samples after each change before judging again
+        if self._samples < self.window:
+            return
+        slow = self._latency > self.latency_factor * self._baseline
+        if self._error_rate > self.error_threshold or slow:
+            self.limit = max(1, self.limit // 2)
+            self._backoff = min(MAX_BACKOFF, self._backoff * 2 or 1.0)
+            self._resume_at = time.monotonic() + self._backoff
+            logger.warning(f"Sending slowed down (error rate {self._error_rate:.0%}, latency "
+                           f"{self._latency:.2f}s): {self.limit} in parallel, pausing {self._backoff:.0f}s")
+            SEND_BACKOFFS.inc()
+            self._samples = 0
+            self._healthy = 0
+            self._latency = self._baseline
+            self._error_rate = 0.0
+        else:
+            self._healthy += 1
+            if self._healthy >= self.window:
+                self._healthy = 0
+                self._backoff = 0.0
+                if self.limit < self.max_concurrency:
+                    self.limit += 1
+        SEND_CONCURRENCY_LIMIT.set(self.limit)
+
+class SendQueue:
+    """Sends messages through a transport on a pool of worker threads, within per-account rate limits.
+
+    Each worker thread is COM-initialized, and OutlookHandler keeps one
+    Outlook connection per thread, so every worker sends through its own
+    Outlook handle. Before each send a worker takes a token from the
+    account's TokenBucket (``rate_per_minute``, 0 for no limit) and a
+    slot from the SendController, which narrows parallelism and backs off
+    when errors or latency rise.
+    """
+
+    def __init__(self, transport: MailTransport, workers: int = 2,
+                 rate_per_minute: float = 0, burst: Optional[int] = None):
+        self.transport = transport
+        self.workers = max(1, workers)
+        self.rate_per_minute = rate_per_minute
+        self.burst = burst
+        self.controller = SendController(self.workers)
+        self._buckets: Dict[str, TokenBucket] = {}
+        self._buckets_lock = threading.Lock()
+        self._stopping = threading.Event()
+        self._pool = ThreadPoolExecutor(
+            max_workers=self.workers,
+            thread_name_prefix="send-worker",
+            initializer=initialize_worker
+        )
+
+    def bucket(self, account: str) -> TokenBucket:
+        """Return the rate limit of an account"""
+        with self._buckets_lock:
+            bucket = self._buckets.get(account)
+            if bucket is None:
+                bucket = self._buckets[account] = TokenBucket(self.rate_per_minute, self.burst)
+            return bucket
+
+    def send_batch(self, messages: Sequence[Message], account: str = "default",
+                   bulk: bool = False) -> Iterator[Tuple[int, Any, SendTiming]]:
+        """Send messages in parallel; yields (index, result, timing) in message order.
+
+        The result is whether the message was sent, or with ``bulk`` (messages
+        to lists of BCC recipients) one such flag per recipient. Sends run on
+        worker threads, outside the run's trace, so the caller records the
+        timings.
+        """
+        futures = [self._pool.submit(self._send_one, account, message, bulk) for message in messages]
+        for index, future in enumerate(futures):
+            result, timing = future.result()
+            yield index, result, timing
+
+    def shutdown(self) -> None:
+        """Stop waiting for rate limits and wait for sends in progress"""
+        self._stopping.set()
+        self._pool.shutdown(wait=True, cancel_futures=True)
+
+    def _send_one(self, account: str, message: Message, bulk: bool) -> Tuple[Any, SendTiming]:
+        failed = [False] * len(message[0]) if bulk else False
+        started = time.perf_counter()
+        if not self.bucket(account).acquire(self._stopping):
+            return failed, (started, 0.0, threading.get_ident())
+        SEND_RATE_LIMIT_WAIT.observe(time.perf_counter() - started)
+        if not self.controller.acquire(self._stopping):
+            return failed, (started, 0.0, threading.get_ident())
+
+        started = time.perf_counter()
+        result = failed
+        try:
+            if bulk:
+                result = list(self.transport.send_bulk(*message))
+            else:
+                result = bool(self.transport.send_email(*message))
+        except Exception as e:
+            logger.error(f"Error sending email to {message[0]}: {e}")
+        finally:
+            latency = time.perf_counter() - started
+            SEND_LATENCY.observe(latency)
+            self.controller.release(latency, any(result) if bulk else result)
+        return result, (started, latency, threading.get_ident())
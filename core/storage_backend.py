@@ -0,0 +1,601 @@
+import os
+import json
+import sqlite3
+import datetime
+import threading
+import logging
+from pathlib import Path
+from typing import Dict, List, Any, Optional, Tuple, Callable, Iterator
+
+from core.event_log import EventLog, GroupCommitter
+from core.task_repository import TaskRepository
+
+logger = logging.getLogger(__name__)
+
+class JSONResultStore:
+    """Stores results as one JSON array file per storage path"""
+
+    @staticmethod
+    def _file_path(storage_path: str) -> str:
+        # Ensure path has .json extension
+        if not storage_path.endswith(".json"):
+            storage_path += ".json"
+        return storage_path
+
+    def store(self, storage_path: str, entry: Dict[str, Any], task_id: Optional[str] = None) -> int:
+        """Append a result entry; returns the number of bytes written"""
+        storage_path = self._file_path(storage_path)
+
+        # Create directory if it doesn't exist
+        os.makedirs(os.path.dirname(storage_path) or ".", exist_ok=True)
+
+        # Load existing data or create new
+        data = []
+        if os.path.exists(storage_path):
+            try:
+                with open(storage_path, "r", encoding="utf-8") as f:
+                    data = json.load(f)
+            except json.JSONDecodeError:
+                # If file is corrupted, start fresh
+                data = []
+
+        # Append new entry
+        data.append(entry)
+
+        # Save updated data
+        payload = json.dumps(data, indent=2, ensure_ascii=False)
+        with open(storage_path, "w", encoding="utf-8") as f:
+            f.write(payload)
+        return len(payload.encode("utf-8"))
+
+    def get(self, storage_path: str) -> List[Dict[str, Any]]:
+        """Get stored results, oldest first"""
+        storage_path = self._file_path(storage_path)
+        if not os.path.exists(storage_path):
+            return []
+
+        with open(storage_path, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+class JSONRunStore:
+    """Stores run records as one JSON-lines file per task"""
+
+    def __init__(self, directory: str = "data/runs", read_only: bool = False):
+        self.directory = directory
+        self._lock = threading.Lock()
+        if not read_only:
+            os.makedirs(directory, exist_ok=True)
+
+    def _file_path(self, task_id: str) -> str:
+        return os.path.join(self.directory, f"{task_id}.jsonl")
+
+    def record(self, run: Dict[str, Any]) -> None:
+        """Append a run record"""
+        line = json.dumps(run, ensure_ascii=False) + "\n"
+        with self._lock:
+            with open(self._file_path(run["task_id"]), "a", encoding="utf-8") as f:
+                f.write(line)
+
+    def recent(self, task_id: str, limit: int = 20) -> List[Dict[str, Any]]:
+        """Return the latest run records of a task, newest first"""
+        path = self._file_path(task_id)
+        if not os.path.exists(path):
+            return []
+        runs = []
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    runs.append(json.loads(line))
+                except json.JSONDecodeError:
+                    continue
+        return runs[::-1][:limit]
+
+class StorageBackend:
+    """Persistence for tasks, events, results and runs behind one interface.
+
+    ``tasks`` offers all/get/save/save_many/delete/due and
+    add_reload_listener/reload_if_changed, ``events`` offers
+    append/query/add_listener/checkpoint/entries_after/flush/close,
+    ``results`` offers store/get and ``runs`` offers record/recent.
+    Counters are saved to ``counters_path``, which is specific to the
+    backend because log positions are.
+    """
+
+    name = ""
+    tasks: Any = None
+    events: Any = None
+    results: Any = None
+    runs: Any = None
+    counters_path = ""
+
+    def close(self) -> None:
+        """Flush and release everything the backend holds open"""
+        self.events.close()
+
+class JSONStorageBackend(StorageBackend):
+    """The default backend: JSON files under ``data_dir``"""
+
+    name = "json"
+
+    def __init__(self, data_dir: str = "data", read_only: bool = False, **log_options):
+        self.tasks = TaskRepository(os.path.join(data_dir, "tasks.json"), read_only=read_only)
+        self.events = EventLog(
+            os.path.join(data_dir, "events"),
+            legacy_file=os.path.join(data_dir, "logs.json"),
+            read_only=read_only,
+            **log_options
+        )
+        self.results = JSONResultStore()
+        self.runs = JSONRunStore(os.path.join(data_dir, "runs"), read_only=read_only)
+        self.counters_path = os.path.join(data_dir, "events", "counters.json")
+
+class SQLiteDatabase:
+    """A SQLite database in WAL mode with one connection per thread.
+
+    With ``read_only`` the database must exist and is opened with
+    ``mode=ro``: the schema and pragmas are left alone, and reads still see
+    what a writer in another process commits.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS tasks (
+            id TEXT PRIMARY KEY,
+            position INTEGER NOT NULL,
+            next_run TEXT,
+            active INTEGER NOT NULL DEFAULT 1,
+            data TEXT NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_tasks_active_next_run ON tasks (active, next_run);
+
+        CREATE TABLE IF NOT EXISTS events (
+            id INTEGER PRIMARY KEY,
+            timestamp TEXT NOT NULL,
+            level TEXT NOT NULL,
+            task_id TEXT,
+            event TEXT,
+            message TEXT NOT NULL,
+            data TEXT NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_events_timestamp ON events (timestamp);
+        CREATE INDEX IF NOT EXISTS idx_events_level_timestamp ON events (level, timestamp);
+        CREATE INDEX IF NOT EXISTS idx_events_task_timestamp ON events (task_id, timestamp);
+
+        CREATE TABLE IF NOT EXISTS results (
+            id INTEGER PRIMARY KEY,
+            storage_path TEXT NOT NULL,
+            task_id TEXT,
+            timestamp TEXT NOT NULL,
+            data TEXT NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_results_task_timestamp ON results (task_id, timestamp);
+        CREATE INDEX IF NOT EXISTS idx_results_path_timestamp ON results (storage_path, timestamp);
+
+        CREATE TABLE IF NOT EXISTS runs (
+            id TEXT PRIMARY KEY,
+            task_id TEXT NOT NULL,
+            started TEXT NOT NULL,
+            data TEXT NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_runs_task_started ON runs (task_id, started);
+
+        CREATE TABLE IF NOT EXISTS meta (
+            key TEXT PRIMARY KEY,
+            value INTEGER NOT NULL
+        );
+    """
+
+    def __init__(self, path: str = "data/storage.db", read_only: bool = False):
+        self.path = path
+        self.read_only = read_only
+        self._local = threading.local()
+        self._connections: Dict[threading.Thread, sqlite3.Connection] = {}
+        self._connections_lock = threading.Lock()
+        self.write_lock = threading.RLock()
+        if read_only:
+            if not os.path.exists(path):
+                raise FileNotFoundError(f"No database at {path}")
+            return
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        connection = self.connection()
+        connection.executescript(self.SCHEMA)
+        connection.commit()
+
+    def connection(self) -> sqlite3.Connection:
+        """Return this thread's connection"""
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            # Each connection is only used by its thread; check_same_thread is off so close() can close them all
+            if self.read_only:
+                connection = sqlite3.connect(Path(self.path).absolute().as_uri() + "?mode=ro", uri=True,
+                                             timeout=30, check_same_thread=False)
+            else:
+                connection = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+                # Lets deleted events give space back to the file system; only takes effect
+                # on a new database, so it must come before anything creates the file
+                connection.execute("PRAGMA auto_vacuum=INCREMENTAL")
+                connection.execute("PRAGMA journal_mode=WAL")
+                connection.execute("PRAGMA synchronous=NORMAL")
+            with self._connections_lock:
+                # Connections of finished threads are no longer reachable through _local
+                for thread in [thread for thread in self._connections if not thread.is_alive()]:
+                    self._connections.pop(thread).close()
+                self._connections[threading.current_thread()] = connection
+            self._local.connection = connection
+        return connection
+
+    def close(self) -> None:
+        """Close the connections of all threads"""
+        with self._connections_lock:
+            connections, self._connections = list(self._connections.values()), {}
+            self._local = threading.local()
+        for connection in connections:
+            connection.close()
+
+    def size(self) -> int:
+        """Return the size of the database and its WAL in bytes"""
+        total = 0
+        for suffix in ("", "-wal"):
+            try:
+                total += os.path.getsize(self.path + suffix)
+            except OSError:
+                pass
+        return total
+
+class SQLiteTaskStore:
+    """Tasks table; same interface as TaskRepository.
+
+    Every change bumps ``tasks_version`` in the meta table, so
+    ``reload_if_changed`` notices changes committed by another process.
+    """
+
+    def __init__(self, db: SQLiteDatabase):
+        self.db = db
+        self._lock = threading.Lock()
+        self._reload_listeners: List[Callable[[List[Dict[str, Any]]], None]] = []
+        self._version = self._read_version()
+
+    def all(self) -> List[Dict[str, Any]]:
+        rows = self.db.connection().execute("SELECT data FROM tasks ORDER BY position").fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+    def get(self, task_id: str) -> Optional[Dict[str, Any]]:
+        row = self.db.connection().execute("SELECT data FROM tasks WHERE id = ?", (task_id,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def due(self, now: datetime.datetime) -> List[Dict[str, Any]]:
+        """Return active tasks whose next run is at or before ``now``"""
+        rows = self.db.connection().execute(
+            "SELECT data FROM tasks WHERE active = 1 AND next_run <= ? ORDER BY next_run",
+            (now.isoformat(),)
+        ).fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+    def save(self, task: Dict[str, Any]) -> None:
+        self.save_many([task])
+
+    def save_many(self, tasks: List[Dict[str, Any]]) -> None:
+        with self.db.write_lock:
+            connection = self.db.connection()
+            with connection:
+                connection.executemany(
+                    """
+                    INSERT INTO tasks (id, position, next_run, active, data)
+                    VALUES (?, (SELECT IFNULL(MAX(position), 0) + 1 FROM tasks), ?, ?, ?)
+                    ON CONFLICT (id) DO UPDATE SET
+                        next_run = excluded.next_run, active = excluded.active, data = excluded.data
+                    """,
+                    [(task["id"], task.get("next_run"), int(bool(task.get("active", True))), json.dumps(task))
+                     for task in tasks]
+                )
+                self._bump_version(connection)
+
+    def delete(self, task_id: str) -> bool:
+        with self.db.write_lock:
+            connection = self.db.connection()
+            with connection:
+                cursor = connection.execute("DELETE FROM tasks WHERE id = ?", (task_id,))
+                self._bump_version(connection)
+            return cursor.rowcount > 0
+
+    def add_reload_listener(self, listener: Callable[[List[Dict[str, Any]]], None]) -> None:
+        """Get called with all tasks whenever another process changed them"""
+        with self._lock:
+            self._reload_listeners.append(listener)
+
+    def reload_if_changed(self) -> None:
+        """Notify reload listeners if another process changed the tasks"""
+        version = self._read_version()
+        with self._lock:
+            if version == self._version:
+                return
+            self._version = version
+            listeners = list(self._reload_listeners)
+        tasks = self.all()
+        for listener in listeners:
+            try:
+                listener(tasks)
+            except Exception as e:
+                logger.error(f"Error notifying task reload listener: {e}")
+
+    def _read_version(self) -> int:
+        row = self.db.connection().execute("SELECT value FROM meta WHERE key = 'tasks_version'").fetchone()
+        return row[0] if row else 0
+
+    def _bump_version(self, connection: sqlite3.Connection) -> None:
+        """Count a change made by this process (called inside its transaction)"""
+        connection.execute(
+            "INSERT INTO meta (key, value) VALUES ('tasks_version', 1) "
+            "ON CONFLICT (key) DO UPDATE SET value = value + 1"
+        )
+        version = connection.execute("SELECT value FROM meta WHERE key = 'tasks_version'").fetchone()[0]
+        with self._lock:
+            self._version = version
+
+class SQLiteEventStore:
+    """Events table; same interface as EventLog.
+
+    Inserts are group-committed like the JSON-lines log. Log positions are
+    ``(0, last event id)``. A maintenance thread applies the same retention
+    limits as ``EventLog``. ``read_only`` skips the writer and maintenance.
+    """
+
+    def __init__(self, db: SQLiteDatabase, flush_every: int = 256, flush_interval: float = 0.05,
+                 max_age_days: Optional[int] = None, max_entries: Optional[int] = None,
+                 max_bytes: Optional[int] = None, maintenance_interval: float = 3600.0,
+                 read_only: bool = False, **_):
+        self.db = db
+        self.read_only = read_only
+        self.max_age_days = max_age_days
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.maintenance_interval = maintenance_interval
+        self._lock = threading.RLock()
+        self._listeners: List[Callable[[Dict[str, Any]], None]] = []
+        self._last_id = db.connection().execute("SELECT IFNULL(MAX(id), 0) FROM events").fetchone()[0]
+        self._stopping = threading.Event()
+        self.writer: Optional[GroupCommitter] = None
+        self._maintenance_thread: Optional[threading.Thread] = None
+        if read_only:
+            return
+
+        self.writer = GroupCommitter(self._insert_rows, flush_every, flush_interval, name="group-commit:events")
+        self._maintenance_thread = threading.Thread(target=self._run_maintenance, name="event-store-maintenance",
+                                                    daemon=True)
+        self._maintenance_thread.start()
+
+    def append(self, entry: Dict[str, Any]) -> None:
+        if self.read_only:
+            raise RuntimeError("Event store is open read-only")
+        with self._lock:
+            self._last_id += 1
+            self.writer.write((
+                self._last_id, entry.get("timestamp", ""), entry.get("level", "info"), entry.get("task_id"),
+                entry.get("event"), entry.get("message", ""), json.dumps(entry, ensure_ascii=False)
+            ))
+            for listener in self._listeners:
+                listener(entry)
+
+    def add_listener(self, listener: Callable[[Dict[str, Any]], None]) -> None:
+        with self._lock:
+            self._listeners.append(listener)
+
+    def position(self) -> Tuple[int, int]:
+        with self._lock:
+            return 0, self._last_id
+
+    def checkpoint(self, callback: Callable[[Tuple[int, int]], None]) -> None:
+        with self._lock:
+            self.flush()
+            callback((0, self._last_id))
+
+    def entries_after(self, position: Tuple[int, int]) -> Iterator[Dict[str, Any]]:
+        self.flush()
+        cursor = self.db.connection().execute("SELECT data FROM events WHERE id > ? ORDER BY id", (position[1],))
+        for row in cursor:
+            yield json.loads(row[0])
+
+    def flush(self) -> None:
+        if self.writer:
+            self.writer.flush()
+
+    def close(self) -> None:
+        self._stopping.set()
+        if self._maintenance_thread:
+            self._maintenance_thread.join()
+        if self.writer:
+            self.writer.close()
+
+    def follow(self, stop: threading.Event, poll_interval: float = 1.0) -> Iterator[Dict[str, Any]]:
+        """Yield events inserted from now on, by this or another process, until ``stop`` is set"""
+        self.flush()
+        connection = self.db.connection()
+        last_id = connection.execute("SELECT IFNULL(MAX(id), 0) FROM events").fetchone()[0]
+        while not stop.is_set():
+            rows = connection.execute("SELECT id, data FROM events WHERE id > ? ORDER BY id", (last_id,)).fetchall()
+            for row_id, data in rows:
+                last_id = row_id
+                yield json.loads(data)
+            if not rows:
+                stop.wait(poll_interval)
+
+    def query(self, level: Optional[str] = None, since: Optional[datetime.datetime] = None,
+              until: Optional[datetime.datetime] = None, text: Optional[str] = None,
+              task_id: Optional[str] = None, limit: Optional[int] = 100, offset: int = 0,
+              cursor: Optional[str] = None) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """Return matching events newest first, plus a cursor for the next page"""
+        self.flush()
+        clauses, params = [], []
+        if level:
+            clauses.append("level = ?")
+            params.append(level)
+        if task_id:
+            clauses.append("task_id = ?")
+            params.append(task_id)
+        if since:
+            clauses.append("timestamp >= ?")
+            params.append(since.isoformat())
+        if until:
+            clauses.append("timestamp <= ?")
+            params.append(until.isoformat())
+        if text:
+            escaped = text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+            clauses.append("message LIKE ? ESCAPE '\\'")
+            params.append(f"%{escaped}%")
+        if cursor:
+            timestamp, last_id = cursor.rsplit("|", 1)
+            clauses.append("(timestamp < ? OR (timestamp = ? AND id > ?))")
+            params.extend([timestamp, timestamp, int(last_id)])
+
+        sql = "SELECT id, timestamp, data FROM events"
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        sql += " ORDER BY timestamp DESC, id ASC LIMIT ? OFFSET ?"
+        params.extend([-1 if limit is None else limit, offset])
+
+        rows = self.db.connection().execute(sql, params).fetchall()
+        entries = [json.loads(row[2]) for row in rows]
+        next_cursor = None
+        if limit is not None and rows and len(rows) == limit:
+            next_cursor = f"{rows[-1][1]}|{rows[-1][0]}"
+        return entries, next_cursor
+
+    def compact(self) -> None:
+        """Delete events beyond the retention limits"""
+        if self.read_only:
+            return
+        with self.db.write_lock:
+            connection = self.db.connection()
+            with connection:
+                if self.max_age_days:
+                    cutoff = datetime.datetime.now() - datetime.timedelta(days=self.max_age_days)
+                    connection.execute("DELETE FROM events WHERE timestamp < ?", (cutoff.isoformat(),))
+                if self.max_entries:
+                    connection.execute(
+                        "DELETE FROM events WHERE id <= (SELECT id FROM events ORDER BY id DESC LIMIT 1 OFFSET ?)",
+                        (self.max_entries,)
+                    )
+                if self.max_bytes:
+                    self._enforce_max_bytes(connection)
+            # Return freed pages to the file system (databases created with auto_vacuum=INCREMENTAL);
+            # executescript, because execute would free a single page
+            connection.executescript("PRAGMA incremental_vacuum; PRAGMA wal_checkpoint(TRUNCATE);")
+
+    def event_bytes(self) -> int:
+        """Return the size of the stored events (their JSON), which ``max_bytes`` limits"""
+        row = self.db.connection().execute("SELECT IFNULL(SUM(length(CAST(data AS BLOB))), 0) FROM events").fetchone()
+        return row[0]
+
+    def _enforce_max_bytes(self, connection: sqlite3.Connection) -> None:
+        """Delete just enough of the oldest events to get under ``max_bytes``"""
+        excess = self.event_bytes() - self.max_bytes
+        if excess <= 0:
+            return
+        row = connection.execute(
+            """
+            SELECT id FROM (
+                SELECT id, SUM(length(CAST(data AS BLOB))) OVER (ORDER BY id) AS running FROM events
+            ) WHERE running >= ? ORDER BY id LIMIT 1
+            """,
+            (excess,)
+        ).fetchone()
+        if row:
+            connection.execute("DELETE FROM events WHERE id <= ?", (row[0],))
+
+    def _insert_rows(self, rows: List[Tuple[Any, ...]], durable: bool) -> None:
+        with self.db.write_lock:
+            connection = self.db.connection()
+            with connection:
+                connection.executemany(
+                    "INSERT INTO events (id, timestamp, level, task_id, event, message, data) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    rows
+                )
+            if durable:
+                connection.execute("PRAGMA wal_checkpoint(PASSIVE)")
+
+    def _run_maintenance(self) -> None:
+        while not self._stopping.wait(self.maintenance_interval):
+            try:
+                self.compact()
+            except Exception as e:
+                logger.error(f"Error compacting events: {e}")
+
+class SQLiteResultStore:
+    """Results table; same interface as JSONResultStore"""
+
+    def __init__(self, db: SQLiteDatabase):
+        self.db = db
+
+    @staticmethod
+    def _key(storage_path: str) -> str:
+        return storage_path[:-5] if storage_path.endswith(".json") else storage_path
+
+    def store(self, storage_path: str, entry: Dict[str, Any], task_id: Optional[str] = None) -> int:
+        payload = json.dumps(entry, ensure_ascii=False)
+        with self.db.write_lock:
+            connection = self.db.connection()
+            with connection:
+                connection.execute(
+                    "INSERT INTO results (storage_path, task_id, timestamp, data) VALUES (?, ?, ?, ?)",
+                    (self._key(storage_path), task_id, entry.get("timestamp", ""), payload)
+                )
+        return len(payload.encode("utf-8"))
+
+    def get(self, storage_path: str) -> List[Dict[str, Any]]:
+        rows = self.db.connection().execute(
+            "SELECT data FROM results WHERE storage_path = ? ORDER BY timestamp, id",
+            (self._key(storage_path),)
+        ).fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+class SQLiteRunStore:
+    """Runs table; same interface as JSONRunStore"""
+
+    def __init__(self, db: SQLiteDatabase):
+        self.db = db
+
+    def record(self, run: Dict[str, Any]) -> None:
+        with self.db.write_lock:
+            connection = self.db.connection()
+            with connection:
+                connection.execute(
+                    "INSERT OR REPLACE INTO runs (id, task_id, started, data) VALUES (?, ?, ?, ?)",
+                    (run["id"], run["task_id"], run["started"], json.dumps(run, ensure_ascii=False))
+                )
+
+    def recent(self, task_id: str, limit: int = 20) -> List[Dict[str, Any]]:
+        rows = self.db.connection().execute(
+            "SELECT data FROM runs WHERE task_id = ? ORDER BY started DESC LIMIT ?",
+            (task_id, limit)
+        ).fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+class SQLiteStorageBackend(StorageBackend):
+    """Tasks, events and results in one SQLite database (WAL mode)"""
+
+    name = "sqlite"
+
+    def __init__(self, data_dir: str = "data", read_only: bool = False, **log_options):
+        self.db = SQLiteDatabase(os.path.join(data_dir, "storage.db"), read_only=read_only)
+        self.tasks = SQLiteTaskStore(self.db)
+        self.events = SQLiteEventStore(self.db, read_only=read_only, **log_options)
+        self.results = SQLiteResultStore(self.db)
+        self.runs = SQLiteRunStore(self.db)
+        self.counters_path = os.path.join(data_dir, "storage.counters.json")
+
+    def close(self) -> None:
+        super().close()
+        self.db.close()
+
+BACKENDS = {
+    "json": JSONStorageBackend,
+    "sqlite": SQLiteStorageBackend,
+}
+
+def create_storage_backend(name: str = "json", data_dir: str = "data", **log_options) -> StorageBackend:
+    """Create the storage backend selected in settings"""
+    backend_class = BACKENDS.get(name)
+    if backend_class is None:
+        logger.error(f"Unknown storage backend '{name}', using JSON files")
+        backend_class = JSONStorageBackend
+    return backend_class(data_dir, **log_options)
@@ -1,26 +1,22 @@
-import os
-import json
 import datetime
+import time
 import logging
 from typing import List, Dict, Any, Optional
 
+from core.storage_backend import JSONResultStore
+from core.metrics import STORAGE_WRITE_BYTES, STORAGE_WRITE_LATENCY
+
 logger = logging.getLogger(__name__)
 
 class StorageHandler:
-    def __init__(self):
-        pass
+    def __init__(self, results=None):
+        # Result store from the storage backend (JSON files by default)
+        self.results = results or JSONResultStore()
     
     def store_summary(self, summary: str, emails: List[Dict[str, Any]], 
-                      storage_path: str, task_name: str) -> bool:
-        """Store summary and emails in JSON format with history"""
+                      storage_path: str, task_name: str, task_id: Optional[str] = None) -> bool:
+        """Store summary and emails with history"""
         try:
-            # Ensure path has .json extension
-            if not storage_path.endswith(".json"):
-                storage_path += ".json"
-            
-            # Create directory if it doesn't exist
-            os.makedirs(os.path.dirname(storage_path), exist_ok=True)
-            
             # Prepare new entry
             new_entry = {
                 "timestamp": datetime.datetime.now().isoformat(),
@@ -35,22 +31,11 @@ class StorageHandler:
                 } for email in emails]
             }
             
-            # Load existing data or create new
-            data = []
-            if os.path.exists(storage_path):
-                try:
-                    with open(storage_path, "r", encoding="utf-8") as f:
-                        data = json.load(f)
-                except json.JSONDecodeError:
-                    # If file is corrupted, start fresh
-                    data = []
-            
-            # Append new entry
-            data.append(new_entry)
-            
-            # Save updated data
-            with open(storage_path, "w", encoding="utf-8") as f:
-                json.dump(data, f, indent=2, ensure_ascii=False)
+            # Append to the stored history
+            started = time.perf_counter()
+            written = self.results.store(storage_path, new_entry, task_id)
+            STORAGE_WRITE_LATENCY.observe(time.perf_counter() - started)
+            STORAGE_WRITE_BYTES.inc(written)
             
             logger.info(f"Stored summary and {len(emails)} emails with history at {storage_path}")
             return True
@@ -60,18 +45,9 @@ class StorageHandler:
             return False
     
     def get_results(self, storage_path: str) -> List[Dict[str, Any]]:
-        """Get stored results from a file"""
+        """Get stored results for a storage path"""
         try:
-            if not storage_path.endswith(".json"):
-                storage_path += ".json"
-            
-            if not os.path.exists(storage_path):
-                return []
-            
-            with open(storage_path, "r", encoding="utf-8") as f:
-                data = json.load(f)
-            
-            return data
+            return self.results.get(storage_path)
         except Exception as e:
             logger.error(f"Error reading results: {e}")
-            return []
\ No newline at end of file
+            return []
@@ -0,0 +1,147 @@
+import datetime
+import threading
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Dict, List, Any, Callable, Iterator, Optional
+
+from core.fair_queue import FairQueue, DEFAULT_PRIORITY
+from core.tracing import span
+from core.metrics import SCHEDULER_LAG, TASKS_RUNNING
+
+logger = logging.getLogger(__name__)
+
+def initialize_worker() -> None:
+    """Give each worker thread its own COM apartment (Outlook needs one per thread)"""
+    try:
+        import pythoncom
+        pythoncom.CoInitialize()
+    except ImportError:
+        pass
+
+class TaskExecutor:
+    """Runs task executions on a bounded pool of worker threads.
+
+    At most ``max_workers`` tasks run at once. Each task has a lock in
+    ``task_locks`` that is held from submission until the run finishes, so
+    the same task never runs twice at the same time. Listeners are called
+    as ``listener(kind, task, detail)`` with kind "started", "progress" or
+    "finished" (detail is the progress message or a success flag); they run
+    on worker threads.
+
+    Inside a run, work on a shared resource ("outlook", "ai" or another
+    mail transport added with ``add_resource``) is done in units wrapped
+    in ``unit(task, resource, cost)``. Each resource has a few slots that
+    are shared fairly between running tasks according to their "priority"
+    class and "weight", so one large campaign cannot starve small tasks.
+    """
+
+    def __init__(self, run: Callable[[Dict[str, Any], Optional[datetime.datetime]], bool], max_workers: int = 4,
+                 resource_slots: Optional[Dict[str, int]] = None):
+        self.run = run
+        self.max_workers = max_workers
+        slots = {"outlook": 1, "ai": 1}
+        slots.update(resource_slots or {})
+        self.resources = {name: FairQueue(name, count) for name, count in slots.items()}
+        self.task_locks: Dict[str, threading.Lock] = {}
+        self._locks_guard = threading.Lock()
+        self._listeners: List[Callable[[str, Dict[str, Any], Any], None]] = []
+        self._pool = ThreadPoolExecutor(
+            max_workers=max_workers,
+            thread_name_prefix="task-worker",
+            initializer=initialize_worker
+        )
+
+    def add_resource(self, name: str, slots: int = 1) -> None:
+        """Share a resource between tasks, unless it already is"""
+        with self._locks_guard:
+            if name not in self.resources:
+                self.resources = dict(self.resources, **{name: FairQueue(name, slots)})
+
+    def add_listener(self, listener: Callable[[str, Dict[str, Any], Any], None]) -> None:
+        """Register a callback for task started/progress/finished notifications"""
+        self._listeners.append(listener)
+
+    def lock_for(self, task_id: str) -> threading.Lock:
+        """Return the run lock for a task"""
+        with self._locks_guard:
+            return self.task_locks.setdefault(task_id, threading.Lock())
+
+    def try_acquire(self, task_id: str) -> bool:
+        """Reserve a task for running; False if it is already running"""
+        return self.lock_for(task_id).acquire(blocking=False)
+
+    def release(self, task_id: str) -> None:
+        """Give up a reservation made with try_acquire without running the task"""
+        self.lock_for(task_id).release()
+
+    def submit(self, task: Dict[str, Any], acquired: bool = False,
+               scheduled: Optional[datetime.datetime] = None) -> bool:
+        """Queue a task run; returns False if the task is already running.
+
+        Pass ``acquired=True`` if the caller already holds the task's lock
+        (from ``try_acquire``); it is released when the run finishes.
+        ``scheduled`` is the slot being run, used to measure scheduler lag.
+        """
+        if not acquired and not self.try_acquire(task["id"]):
+            return False
+        try:
+            self._pool.submit(self._run_task, task, scheduled)
+        except RuntimeError:
+            # Pool is shut down
+            self.release(task["id"])
+            return False
+        return True
+
+    def run_inline(self, task: Dict[str, Any]) -> Optional[bool]:
+        """Run a task on the calling thread; returns None if it is already running"""
+        if not self.try_acquire(task["id"]):
+            return None
+        return self._run_task(task, None)
+
+    def is_running(self, task_id: str) -> bool:
+        """Return True if a run of the task is queued or in progress"""
+        return self.lock_for(task_id).locked()
+
+    @contextmanager
+    def unit(self, task: Dict[str, Any], resource: str, cost: float = 1.0) -> Iterator[None]:
+        """Run a block of work on a shared resource once the task gets a fair slot"""
+        weight = float(task.get("weight", 1) or 1)
+        priority = task.get("priority", DEFAULT_PRIORITY)
+        queue = self.resources[resource]
+        with span(f"wait_{resource}"):
+            queue.acquire(task["id"], cost, weight, priority)
+        try:
+            yield
+        finally:
+            queue.release()
+
+    def notify(self, kind: str, task: Dict[str, Any], detail: Any = None) -> None:
+        """Send a notification to all listeners"""
+        for listener in self._listeners:
+            try:
+                listener(kind, task, detail)
+            except Exception as e:
+                logger.error(f"Error in task listener: {e}")
+
+    def shutdown(self) -> None:
+        """Drop queued runs and wait for running ones to finish"""
+        self._pool.shutdown(wait=True, cancel_futures=True)
+
+    def _run_task(self, task: Dict[str, Any], scheduled: Optional[datetime.datetime]) -> bool:
+        if scheduled is not None:
+            SCHEDULER_LAG.observe(max(0.0, (datetime.datetime.now() - scheduled).total_seconds()))
+        TASKS_RUNNING.inc()
+        success = False
+        try:
+            self.notify("started", task)
+            success = bool(self.run(task, scheduled))
+        except Exception as e:
+            logger.error(f"Unhandled error running task {task.get('id')}: {e}")
+        finally:
+            TASKS_RUNNING.dec()
+            for queue in self.resources.values():
+                queue.forget(task["id"])
+            self.release(task["id"])
+            self.notify("finished", task, success)
+        return success
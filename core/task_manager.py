@@ -1,88 +1,221 @@
 import os
 import json
 import datetime
+import itertools
 import threading
-import pandas as pd
 from pathlib import Path
 import logging
-from typing import Dict, List, Optional, Any
+from typing import Dict, List, Set, Optional, Any, Tuple, Callable
 
 from core.outlook_handler import OutlookHandler
 from core.ai_summarizer import AISummarizer
+from core.model_registry import ModelRegistry, DEFAULT_MODEL
 from core.storage_handler import StorageHandler
+from core.storage_backend import create_storage_backend
+from core.scheduler import Scheduler
+from core.task_executor import TaskExecutor
+from core.send_queue import SendQueue
+from core.mail_transport import MailTransport, create_transport
+from core.attachments import AttachmentCache
+from core.tracing import Trace, span, current_trace
+from core.recipients import RecipientSource
+from core.recipient_cache import RecipientCache, DEFAULT_CACHE_DIR
+from core.recipient_filter import RecipientFilter, SuppressionList, email_hash
+from core.send_ledger import SendLedgers, NullLedger, SENT, FAILED
+from core.templating import Template, run_context
+from core.metrics import MetricsExporter, EMAILS_SENT, EMAILS_FAILED
+from core.recurrence import advance as advance_schedule, MISFIRE_GRACE, DEFAULT_MISFIRE_POLICY
+from core.event_counters import (
+    EventCounters, EMAIL_SENT, EMAIL_FAILED, RESPONSES_FETCHED, SUMMARY_STORED
+)
 
 logger = logging.getLogger(__name__)
 
+# Work unit sizes for fair sharing of Outlook between running tasks
+SEND_BATCH_SIZE = 25  # Emails sent per unit
+INBOX_SCAN_COST = 25  # An inbox scan weighs about as much as a send batch
+
 class TaskManager:
     def __init__(self):
-        self.tasks_file = Path("data/tasks.json")
-        self.logs_file = Path("data/logs.json")
         self.settings_file = Path("data/settings.json")
         self.outlook = OutlookHandler()
         
-        # Load AI model from settings
-        ai_model = "llama2"  # default model
-        if self.settings_file.exists():
-            try:
-                with open(self.settings_file, "r") as f:
-                    settings = json.load(f)
-                    ai_model = settings.get("ai_model", ai_model)
-            except Exception as e:
-                logger.error(f"Error loading settings: {e}")
+        # Load settings
+        self._settings_stamp = self._settings_file_stamp()
+        settings = self._read_settings()
+        
+        # Load AI model from settings; the model list is fetched in the background
+        ai_model = settings.get("ai_model", DEFAULT_MODEL)
         
-        self.ai_summarizer = AISummarizer(model=ai_model)
-        self.storage_handler = StorageHandler()
-        self.task_locks = {}  # Dictionary to store locks for each task
+        self.model_registry = ModelRegistry()
+        self.ai_summarizer = AISummarizer(model=ai_model, registry=self.model_registry)
+        
+        # Export a Chrome trace of every run to logs/traces/ when enabled
+        self.trace_runs = settings.get("trace_task_runs", False)
         
         # Create data directory if it doesn't exist
         os.makedirs("data", exist_ok=True)
         
-        # Initialize tasks file if it doesn't exist
-        if not self.tasks_file.exists():
-            with open(self.tasks_file, "w") as f:
-                json.dump([], f)
+        # Open the storage backend for tasks, events and results (JSON files by default)
+        self.storage = create_storage_backend(
+            settings.get("storage_backend", "json"),
+            "data",
+            max_age_days=settings.get("log_retention_days", 90) or None,
+            max_entries=settings.get("log_max_entries", 1000000) or None,
+            max_bytes=(settings.get("log_max_size_mb", 500) or 0) * 1024 * 1024 or None,
+            compression=settings.get("log_archive_compression", "gzip")
+        )
+        self.tasks = self.storage.tasks
+        self.event_log = self.storage.events
+        self.event_counters = EventCounters(self.event_log, self.storage.counters_path)
+        self.storage_handler = StorageHandler(self.storage.results)
+        
+        # Parsed copies of recipient files, so recurring runs skip spreadsheet parsing
+        cache_mb = settings.get("recipient_cache_mb", 256)
+        self.recipient_cache = RecipientCache(DEFAULT_CACHE_DIR, cache_mb * 1024 * 1024) if cache_mb else None
+        
+        # Bounced and opted-out addresses, never sent to
+        self.suppressions = SuppressionList()
         
-        # Initialize logs file if it doesn't exist
-        if not self.logs_file.exists():
-            with open(self.logs_file, "w") as f:
-                json.dump([], f)
+        # Per-run records of who was sent to, so interrupted runs resume without duplicates
+        self.send_ledgers = SendLedgers(retention_days=settings.get("ledger_retention_days", 30))
+        self.scheduler = None
+        
+        # Run tasks on a bounded worker pool, never on the caller's (GUI) thread
+        self.executor = TaskExecutor(
+            self._execute_task,
+            settings.get("max_concurrent_tasks", 4),
+            {"outlook": settings.get("outlook_slots", 1), "ai": settings.get("ai_slots", 1)}
+        )
+        self.task_locks = self.executor.task_locks  # Per-task locks held while a task runs
+        
+        # Emails are sent through the task's mail transport (Outlook by default) by a few
+        # workers, each with its own connection, within a rate limit per transport
+        self.default_transport = settings.get("mail_transport", "outlook")
+        self.transports: Dict[str, MailTransport] = {self.outlook.name: self.outlook}
+        self.send_queues: Dict[str, SendQueue] = {}
+        self._transports_lock = threading.Lock()
+        
+        # Attachments are read and checked once per run and shared by all recipients
+        self.attachment_cache = AttachmentCache(
+            max_attachment_bytes=settings.get("max_attachment_mb", 20) * 1024 * 1024
+        )
+        
+        # Emails that are the same for every recipient go out once per this many recipients, in BCC
+        self.bcc_batch_size = settings.get("bcc_batch_size", 100)
+        
+        # Metrics on an optional localhost endpoint and in a periodic snapshot file
+        self.metrics_exporter = MetricsExporter(
+            port=settings.get("metrics_port", 0),
+            snapshot_path=settings.get("metrics_snapshot_file", "logs/metrics.prom") or None,
+            snapshot_interval=settings.get("metrics_snapshot_interval", 60)
+        )
+        self.metrics_exporter.start()
     
-    def get_all_tasks(self) -> List[Dict[str, Any]]:
-        """Get all tasks"""
+    def _read_settings(self) -> Dict[str, Any]:
+        """Read the settings file, or return an empty dict"""
+        if not self.settings_file.exists():
+            return {}
         try:
-            with open(self.tasks_file, "r") as f:
+            with open(self.settings_file, "r") as f:
                 return json.load(f)
         except Exception as e:
-            logger.error(f"Error loading tasks: {e}")
-            return []
+            logger.error(f"Error loading settings: {e}")
+            return {}
+    
+    def _settings_file_stamp(self) -> Optional[Tuple[int, int]]:
+        try:
+            stat = self.settings_file.stat()
+        except FileNotFoundError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+    
+    def _apply_settings_changes(self) -> None:
+        """Pick up settings that apply without a restart (the AI model)"""
+        stamp = self._settings_file_stamp()
+        if stamp == self._settings_stamp:
+            return
+        self._settings_stamp = stamp
+        settings = self._read_settings()
+        self.ai_summarizer.set_model(settings.get("ai_model", DEFAULT_MODEL))
+    
+    def start_scheduler(self, on_due: Optional[Callable[[List[str]], None]] = None) -> None:
+        """Start the precise scheduler; due tasks are dispatched to the worker pool by default"""
+        self.catch_up_missed_runs()
+        self._report_interrupted_sends()
+        self.scheduler = Scheduler(on_due or self.process_due_tasks, watch=self.tasks.reload_if_changed)
+        self.tasks.add_reload_listener(self._on_tasks_reloaded)
+        self.scheduler.load(self.get_all_tasks())
+        self.scheduler.start()
+    
+    def _on_tasks_reloaded(self, tasks: List[Dict[str, Any]]) -> None:
+        """Re-arm the scheduler after tasks were changed by another process"""
+        if self.scheduler:
+            self.scheduler.load(tasks)
+        logger.info(f"Tasks changed outside this process; rescheduled {len(tasks)} tasks")
+    
+    def _report_interrupted_sends(self) -> None:
+        """Log tasks whose last send was interrupted; running them again resumes it"""
+        for task_id, run_key in self.send_ledgers.interrupted():
+            task = self.get_task(task_id)
+            if task:
+                self.log_event(f"Sending for task '{task['name']}' was interrupted ({run_key}); "
+                               f"run it again to resume", "warning", task_id=task_id)
+    
+    def add_run_listener(self, listener: Callable[[str, Dict[str, Any], Any], None]) -> None:
+        """Get notified (on worker threads) when tasks start, make progress and finish"""
+        self.executor.add_listener(listener)
+    
+    def run_task_now(self, task_id: str, wait: bool = False) -> bool:
+        """Run a task immediately, queued on the worker pool or on this thread with ``wait``.
+        
+        Returns False if the task does not exist or is already running; with
+        ``wait`` it returns whether the run succeeded.
+        """
+        task = self.get_task(task_id)
+        if not task:
+            return False
+        if wait:
+            success = self.executor.run_inline(task)
+            if success is not None:
+                return success
+        elif self.executor.submit(task):
+            return True
+        self.log_event(f"Task '{task['name']}' is already running", "warning", task_id=task_id)
+        return False
+    
+    def close(self) -> None:
+        """Stop scheduling, wait for running tasks and flush events and counters to disk"""
+        if self.scheduler:
+            self.scheduler.stop()
+        self.executor.shutdown()
+        for send_queue in self.send_queues.values():
+            send_queue.shutdown()
+        for transport in self.transports.values():
+            transport.close()
+        self.metrics_exporter.stop()
+        self.event_counters.close()
+        self.storage.close()
+    
+    def get_all_tasks(self) -> List[Dict[str, Any]]:
+        """Get all tasks"""
+        return self.tasks.all()
     
     def get_task(self, task_id: str) -> Optional[Dict[str, Any]]:
         """Get a specific task by ID"""
-        tasks = self.get_all_tasks()
-        for task in tasks:
-            if task["id"] == task_id:
-                return task
-        return None
+        return self.tasks.get(task_id)
     
     def save_task(self, task: Dict[str, Any]) -> bool:
         """Save a task (create or update)"""
         try:
-            tasks = self.get_all_tasks()
+            # Create or update the task (written through to disk)
+            self.tasks.save(task)
             
-            # Check if task already exists
-            for i, existing_task in enumerate(tasks):
-                if existing_task["id"] == task["id"]:
-                    tasks[i] = task
-                    break
-            else:
-                # Task doesn't exist, add it
-                tasks.append(task)
+            # Re-arm the scheduler with the new next run
+            if self.scheduler:
+                self.scheduler.update(task)
             
-            # Save tasks
-            with open(self.tasks_file, "w") as f:
-                json.dump(tasks, f, indent=2)
-            
-            self.log_event(f"Task '{task['name']}' saved successfully")
+            self.log_event(f"Task '{task['name']}' saved successfully", task_id=task["id"])
             return True
         except Exception as e:
             logger.error(f"Error saving task: {e}")
@@ -92,136 +225,292 @@ class TaskManager:
     def delete_task(self, task_id: str) -> bool:
         """Delete a task by ID"""
         try:
-            tasks = self.get_all_tasks()
-            tasks = [task for task in tasks if task["id"] != task_id]
-            
-            # Save tasks
-            with open(self.tasks_file, "w") as f:
-                json.dump(tasks, f, indent=2)
+            self.tasks.delete(task_id)
+            if self.scheduler:
+                self.scheduler.remove(task_id)
             
-            self.log_event(f"Task with ID {task_id} deleted successfully")
+            self.log_event(f"Task with ID {task_id} deleted successfully", task_id=task_id)
             return True
         except Exception as e:
             logger.error(f"Error deleting task: {e}")
             self.log_event(f"Error deleting task: {e}", "error")
             return False
     
-    def process_due_tasks(self) -> None:
-        """Process tasks that are due to run"""
-        tasks = self.get_all_tasks()
+    def process_due_tasks(self, task_ids: Optional[List[str]] = None) -> None:
+        """Process tasks that are due to run (only ``task_ids`` if given by the scheduler)"""
         now = datetime.datetime.now()
         
+        if task_ids is None:
+            tasks = self.tasks.due(now)
+        else:
+            tasks = [task for task in map(self.get_task, task_ids) if task and task.get("active", True)]
+        
+        due = []  # (task, scheduled occurrence), with the task's lock held
         for task in tasks:
-            if not task.get("active", True):
-                continue
-            
             task_id = task.get("id")
-            if task_id not in self.task_locks:
-                self.task_locks[task_id] = threading.Lock()
             
             # Try to acquire lock - skip if task is already running
-            if not self.task_locks[task_id].acquire(blocking=False):
+            if not self.executor.try_acquire(task_id):
+                if self.scheduler:
+                    self.scheduler.retry(task_id, 30.0)
                 continue
             
             try:
-                # Check if task is due
+                # Check if task is due; if it was rescheduled meanwhile, arm it for its new time
                 next_run = datetime.datetime.fromisoformat(task["next_run"])
-                if next_run <= now:
-                    # Update next run time before executing to prevent multiple executions
-                    self._update_next_run_time(task)
-                    
-                    # Execute task directly instead of in a thread
-                    self._execute_task(task)
-            finally:
-                self.task_locks[task_id].release()
+                if next_run > now:
+                    if self.scheduler:
+                        self.scheduler.update(task)
+                    self.executor.release(task_id)
+                    continue
+                due.append((task, next_run))
+            except Exception as e:
+                self._dispatch_failed(task, e)
+        
+        # Update next run times before executing to prevent multiple executions
+        run_now = self._update_next_run_times([task for task, _ in due], now)
+        for task, scheduled in due:
+            if task["id"] not in run_now:
+                self.executor.release(task["id"])
+                continue
+            try:
+                # Hand the task to the worker pool; the lock is released when it finishes
+                self.executor.submit(task, acquired=True, scheduled=scheduled)
+            except Exception as e:
+                self._dispatch_failed(task, e)
+    
+    def _dispatch_failed(self, task: Dict[str, Any], error: Exception) -> None:
+        """Log a task that could not be dispatched and release its lock"""
+        task_id = task.get("id")
+        logger.error(f"Error dispatching task '{task.get('name')}': {error}")
+        self.log_event(f"Error dispatching task '{task.get('name')}': {error}", "error", task_id=task_id)
+        # Try again later, unless the schedule itself is invalid (saving a fixed task re-arms it)
+        if self.scheduler and not isinstance(error, (KeyError, TypeError, ValueError)):
+            self.scheduler.retry(task_id, 60.0)
+        self.executor.release(task_id)
     
-    def _execute_task(self, task: Dict[str, Any]) -> None:
-        """Execute a task"""
+    def _execute_task(self, task: Dict[str, Any], scheduled: Optional[datetime.datetime] = None) -> bool:
+        """Execute a task (``scheduled`` is the occurrence being run); returns True on success"""
+        success = False
+        with Trace(task, record_events=self.trace_runs) as trace:
+            try:
+                self.log_event(f"Starting execution of task '{task['name']}'", task_id=task.get("id"))
+                
+                # Step 1: Send emails if needed
+                if task.get("send_emails", False):
+                    with span("send_emails"):
+                        self._send_emails(task, scheduled)
+                
+                # Step 2: Process responses if needed
+                if task.get("process_responses", False):
+                    with span("process_responses"):
+                        self._process_responses(task)
+                
+                self.log_event(f"Task '{task['name']}' executed successfully", task_id=task.get("id"))
+                success = True
+            except Exception as e:
+                logger.error(f"Error executing task '{task['name']}': {e}")
+                self.log_event(f"Error executing task '{task['name']}': {e}", "error", task_id=task.get("id"))
+        
+        trace.finish(success)
+        self._record_run(trace)
+        return success
+    
+    def _record_run(self, trace: Trace) -> None:
+        """Store the run record (and export the trace if enabled)"""
         try:
-            self.log_event(f"Starting execution of task '{task['name']}'")
-            
-            # Step 1: Send emails if needed
-            if task.get("send_emails", False):
-                self._send_emails(task)
-            
-            # Step 2: Process responses if needed
-            if task.get("process_responses", False):
-                self._process_responses(task)
-            
-            self.log_event(f"Task '{task['name']}' executed successfully")
+            if trace.record_events:
+                trace.export()
+            self.storage.runs.record(trace.to_record())
         except Exception as e:
-            logger.error(f"Error executing task '{task['name']}': {e}")
-            self.log_event(f"Error executing task '{task['name']}': {e}", "error")
+            logger.error(f"Error recording run of task '{trace.task['name']}': {e}")
+    
+    def get_runs(self, task_id: str, limit: int = 20) -> List[Dict[str, Any]]:
+        """Get the latest run records of a task, newest first"""
+        return self.storage.runs.recent(task_id, limit)
     
-    def _send_emails(self, task: Dict[str, Any]) -> None:
-        """Send emails for a task"""
+    def _send_emails(self, task: Dict[str, Any], scheduled: Optional[datetime.datetime] = None) -> None:
+        """Send emails for a task; ``scheduled`` is the occurrence being run, if any"""
         try:
-            # Get recipients
-            recipients = self._get_recipients(task)
+            # Compile the email templates once per run; bodies are sent as HTML
+            subject_template = Template(task.get("email_subject", ""))
+            body_template = Template(task.get("email_body", ""), html=True)
+            context = run_context()
             
-            # Get email template
-            subject = task.get("email_subject", "")
-            body = task.get("email_body", "")
+            # Get recipients; rows are streamed and keep only the columns the templates use
+            with span("load_recipients"):
+                source = self._get_recipients(task)
+                columns = source.fields()
+                fields = columns | set(context)
+                rows = source.rows(subject_template.placeholders + body_template.placeholders)
             
-            # Send emails
-            for recipient in recipients:
-                # Replace placeholders in subject and body
-                personalized_subject = self._replace_placeholders(subject, recipient)
-                personalized_body = self._replace_placeholders(body, recipient)
-                
-                # Send email
-                self.outlook.send_email(
-                    recipient["email"],
-                    personalized_subject,
-                    personalized_body,
-                    task.get("email_attachments", [])
-                )
+            # Drop missing, malformed, duplicate and suppressed addresses before sending
+            self.suppressions.reload_if_changed()
+            recipient_filter = RecipientFilter(self.suppressions)
+            recipients = recipient_filter.filter(rows)
+            
+            # Warn about placeholders no recipient column or built-in value fills
+            unknown = list(dict.fromkeys(subject_template.unknown(fields) + body_template.unknown(fields)))
+            if unknown:
+                self.log_event(f"Unknown placeholders in task '{task['name']}': "
+                               f"{', '.join('{' + name + '}' for name in unknown)}", "warning", task_id=task.get("id"))
+            
+            # Check attachments before sending anything; a missing or oversized file fails the run here
+            with span("prepare_attachments"):
+                attachments, attachment_bytes_read = self.attachment_cache.prepare(task.get("email_attachments", []))
+            attachment_bytes = sum(attachment.size for attachment in attachments)
+            attachment_bytes_sent = 0
+            
+            # Without recipient columns in the templates every email is the same, so send it
+            # once per group of recipients, all in BCC
+            personalized = [name for name in subject_template.placeholders + body_template.placeholders
+                            if name in columns]
+            bulk_size = self.bcc_batch_size if not personalized else 0
+            
+            # Send emails in batches; each batch waits for a fair share of the mail transport.
+            # Every send is recorded in the run's ledger, so an interrupted run resumes where it stopped.
+            transport_name, send_queue = self._send_queue_for(task)
+            delivers = send_queue.transport.delivers
+            batch_size = bulk_size * send_queue.workers if bulk_size else SEND_BATCH_SIZE
+            if bulk_size:
+                self.log_event(f"Task '{task['name']}' is not personalized; sending in BCC batches of {bulk_size}",
+                               task_id=task.get("id"))
+            # Test transports deliver nothing, so they neither resume nor complete the task's ledger
+            ledger = self.send_ledgers.open(task["id"], scheduled) if delivers else NullLedger()
+            if ledger.sent_count:
+                self.log_event(f"Resuming task '{task['name']}': {ledger.sent_count} recipients were already sent to",
+                               task_id=task.get("id"))
+            sent_count = 0
+            recorded = 0
+            message_count = 0
+            processed = 0
+            already_sent = 0
+            self.executor.notify("progress", task, "Sending emails")
+            try:
+                while True:
+                    with span("load_recipients"):
+                        batch = list(itertools.islice(recipients, batch_size))
+                    if not batch:
+                        break
+                    processed += len(batch)
+                    
+                    pending = []
+                    for recipient in batch:
+                        hashed = email_hash(recipient["email"])
+                        if ledger.is_sent(hashed):
+                            already_sent += 1
+                        else:
+                            pending.append((recipient, hashed))
+                    if not pending:
+                        continue
+                    
+                    if bulk_size:
+                        # One message per group, rendered once for everyone
+                        groups = [pending[start:start + bulk_size] for start in range(0, len(pending), bulk_size)]
+                        subject, body = subject_template.render({}, context), body_template.render({}, context)
+                        messages = [([recipient["email"] for recipient, _ in group], subject, body, attachments)
+                                    for group in groups]
+                    else:
+                        # Replace placeholders in subject and body
+                        groups = [[entry] for entry in pending]
+                        messages = [
+                            (recipient["email"], subject_template.render(recipient, context),
+                             body_template.render(recipient, context), attachments)
+                            for recipient, _ in pending
+                        ]
+                    
+                    with self.executor.unit(task, transport_name, cost=len(messages)):
+                        # Send on the send queue's workers; their timings are added to the run's trace here
+                        trace = current_trace()
+                        with span("send_batch", size=len(messages)):
+                            results = send_queue.send_batch(messages, account=transport_name, bulk=bool(bulk_size))
+                            for index, result, (started, latency, worker) in results:
+                                if trace:
+                                    trace.add_span("send_email", started, latency, thread_id=worker,
+                                                   recipients=len(groups[index]))
+                                accepted = result if bulk_size else [result]
+                                if not delivers:
+                                    # Only recorded by a test transport; nobody received it
+                                    recorded += sum(map(bool, accepted))
+                                    continue
+                                if any(accepted):
+                                    message_count += 1
+                                    attachment_bytes_sent += attachment_bytes
+                                
+                                for (recipient, hashed), sent in zip(groups[index], accepted):
+                                    ledger.record(hashed, SENT if sent else FAILED)
+                                    if sent:
+                                        sent_count += 1
+                                        EMAILS_SENT.inc()
+                                        self.log_event(f"Email sent to {recipient['email']}" + (" (BCC)" if bulk_size else ""),
+                                                       task_id=task.get("id"), event=EMAIL_SENT)
+                                    else:
+                                        EMAILS_FAILED.inc()
+                                        self.log_event(f"Failed to send email to {recipient['email']}", "error",
+                                                       task_id=task.get("id"), event=EMAIL_FAILED)
+                    
+                    # One fsync per batch
+                    ledger.commit()
+                    self.executor.notify("progress", task, f"Sent {sent_count} emails ({processed} recipients processed)")
                 
-                self.log_event(f"Email sent to {recipient['email']}")
+                ledger.finish()
+            finally:
+                ledger.close()
             
-            self.log_event(f"Sent {len(recipients)} emails for task '{task['name']}'")
+            trace = current_trace()
+            if trace:
+                trace.set("recipients", processed)
+                trace.set("removed", {reason: count for reason, count in recipient_filter.removed.items() if count})
+                if already_sent:
+                    trace.set("already_sent", already_sent)
+                if bulk_size:
+                    trace.set("bcc_messages", message_count)
+                if attachments:
+                    trace.set("attachment_bytes_read", attachment_bytes_read)
+                    trace.set("attachment_bytes_sent", attachment_bytes_sent)
+            removed = sum(recipient_filter.removed.values())
+            if removed:
+                reasons = ", ".join(f"{count} {reason}" for reason, count in recipient_filter.removed.items() if count)
+                self.log_event(f"Skipped {removed} recipients for task '{task['name']}' ({reasons})",
+                               "warning", task_id=task.get("id"))
+            if delivers:
+                self.log_event(f"Sent {sent_count} emails for task '{task['name']}'", task_id=task.get("id"))
+            else:
+                self.log_event(f"Recorded {recorded} emails for task '{task['name']}' without sending them "
+                               f"({transport_name} transport)", "warning", task_id=task.get("id"))
         except Exception as e:
             logger.error(f"Error sending emails for task '{task['name']}': {e}")
-            self.log_event(f"Error sending emails for task '{task['name']}': {e}", "error")
+            self.log_event(f"Error sending emails for task '{task['name']}': {e}", "error", task_id=task.get("id"))
             raise
     
-    def _get_recipients(self, task: Dict[str, Any]) -> List[Dict[str, str]]:
-        """Get recipients for a task"""
-        recipients = []
-        
-        # Manual recipients
-        if task.get("manual_recipients"):
-            recipients.extend(task["manual_recipients"])
-        
-        # File recipients
-        if task.get("recipient_file"):
-            try:
-                file_path = task["recipient_file"]
-                if file_path.endswith(".csv"):
-                    df = pd.read_csv(file_path)
-                elif file_path.endswith((".xlsx", ".xls")):
-                    df = pd.read_excel(file_path)
-                else:
-                    raise ValueError(f"Unsupported file format: {file_path}")
-                
-                # Convert DataFrame to list of dictionaries
-                file_recipients = df.to_dict(orient="records")
-                recipients.extend(file_recipients)
-            except Exception as e:
-                logger.error(f"Error loading recipients from file: {e}")
-                self.log_event(f"Error loading recipients from file: {e}", "error")
-        
-        return recipients
+    def _send_queue_for(self, task: Dict[str, Any]) -> Tuple[str, SendQueue]:
+        """Return the name of the task's mail transport and its send queue, creating them on first use"""
+        name = task.get("mail_transport") or self.default_transport
+        with self._transports_lock:
+            send_queue = self.send_queues.get(name)
+            if send_queue is None:
+                settings = self._read_settings()
+                transport = self.transports.get(name)
+                if transport is None:
+                    transport = self.transports[name] = create_transport(name, settings)
+                self.executor.add_resource(name)
+                send_queue = self.send_queues[name] = SendQueue(
+                    transport,
+                    settings.get("send_workers", 2),
+                    settings.get("send_rate_per_minute", 0)
+                )
+            return name, send_queue
     
-    def _replace_placeholders(self, text: str, data: Dict[str, str]) -> str:
-        """Replace placeholders in text with data"""
-        for key, value in data.items():
-            text = text.replace(f"{{{key}}}", str(value))
-        
-        # Add current date
-        text = text.replace("{current_date}", datetime.datetime.now().strftime("%Y-%m-%d"))
-        
-        return text
+    def _get_recipients(self, task: Dict[str, Any]) -> RecipientSource:
+        """Get the recipients of a task; falls back to manual recipients if the file cannot be read"""
+        try:
+            source = RecipientSource(task, cache=self.recipient_cache)
+            source.fields()  # Reads the file's header
+            return source
+        except Exception as e:
+            logger.error(f"Error loading recipients from file: {e}")
+            self.log_event(f"Error loading recipients from file: {e}", "error", task_id=task.get("id"))
+            return RecipientSource(dict(task, recipient_file=None))
     
     def _process_responses(self, task: Dict[str, Any]) -> None:
         """Process email responses for a task"""
@@ -237,15 +526,26 @@ class TaskManager:
             }
             
             # Get responses
-            responses = self.outlook.get_responses(filter_criteria)
+            self.executor.notify("progress", task, "Fetching responses")
+            with self.executor.unit(task, "outlook", cost=INBOX_SCAN_COST):
+                with span("get_responses") as stage:
+                    responses = self.outlook.get_responses(filter_criteria)
+                    stage.set("count", len(responses))
             
             if not responses:
-                self.log_event(f"No responses found for task '{task['name']}'")
+                self.log_event(f"No responses found for task '{task['name']}'", task_id=task.get("id"))
                 return
             
-            # Summarize responses
+            self.log_event(f"Fetched {len(responses)} responses for task '{task['name']}'",
+                           task_id=task.get("id"), event=RESPONSES_FETCHED, count=len(responses))
+            
+            # Summarize responses with the currently configured model
+            self._apply_settings_changes()
+            self.executor.notify("progress", task, f"Summarizing {len(responses)} responses")
             ai_prompt = task.get("ai_prompt", "Summarize the following email responses:")
-            summary = self.ai_summarizer.summarize(responses, ai_prompt)
+            with self.executor.unit(task, "ai"):
+                with span("summarize", responses=len(responses)):
+                    summary = self.ai_summarizer.summarize(responses, ai_prompt)
             
             # Store summary
             storage_path = task.get("storage_path", f"data/summaries/{task['id']}")
@@ -253,67 +553,113 @@ class TaskManager:
             # Ensure directory exists
             os.makedirs(os.path.dirname(storage_path), exist_ok=True)
             
-            self.storage_handler.store_summary(
-                summary,
-                responses,
-                storage_path,
-                task["name"]
-            )
+            with span("store_summary"):
+                self.storage_handler.store_summary(
+                    summary,
+                    responses,
+                    storage_path,
+                    task["name"],
+                    task["id"]
+                )
             
-            self.log_event(f"Processed and stored {len(responses)} responses for task '{task['name']}'")
+            self.log_event(f"Processed and stored {len(responses)} responses for task '{task['name']}'",
+                           task_id=task.get("id"), event=SUMMARY_STORED)
         except Exception as e:
             logger.error(f"Error processing responses for task '{task['name']}': {e}")
-            self.log_event(f"Error processing responses for task '{task['name']}': {e}", "error")
+            self.log_event(f"Error processing responses for task '{task['name']}': {e}", "error", task_id=task.get("id"))
             raise
     
-    def _update_next_run_time(self, task: Dict[str, Any]) -> None:
-        """Update the next run time for a task based on recurrence"""
+    def _update_next_run_times(self, tasks: List[Dict[str, Any]], now: datetime.datetime) -> Set[str]:
+        """Advance due tasks to their next slot with a single write; returns the ids that should run now"""
+        advanced = []
+        run_now = set()
+        for task in tasks:
+            try:
+                run, skipped = advance_schedule(task, now)
+            except Exception as e:
+                # Leave the task out: it is neither run nor re-armed until it is fixed and saved
+                logger.error(f"Error updating next run time for task '{task['name']}': {e}")
+                self.log_event(f"Error updating next run time for task '{task['name']}': {e}", "error",
+                               task_id=task.get("id"))
+                continue
+            if skipped:
+                self.log_event(f"Skipped {skipped} missed run(s) of task '{task['name']}'", "warning",
+                               task_id=task.get("id"))
+            advanced.append(task)
+            if run:
+                run_now.add(task["id"])
+        
+        if not advanced:
+            return set()
         try:
-            recurrence = task.get("recurrence", "once")
-            current_next_run = datetime.datetime.fromisoformat(task["next_run"])
-            
-            if recurrence == "once":
-                # For one-time tasks, deactivate after running
-                task["active"] = False
-                new_next_run = current_next_run
-            elif recurrence == "daily":
-                new_next_run = current_next_run + datetime.timedelta(days=1)
-            elif recurrence == "weekly":
-                new_next_run = current_next_run + datetime.timedelta(weeks=1)
-            elif recurrence == "monthly":
-                # Add one month (approximately)
-                if current_next_run.month == 12:
-                    new_next_run = current_next_run.replace(year=current_next_run.year + 1, month=1)
-                else:
-                    new_next_run = current_next_run.replace(month=current_next_run.month + 1)
-            else:
-                # Default to daily
-                new_next_run = current_next_run + datetime.timedelta(days=1)
-            
-            # Update task
-            task["next_run"] = new_next_run.isoformat()
-            self.save_task(task)
+            self.tasks.save_many(advanced)
         except Exception as e:
-            logger.error(f"Error updating next run time for task '{task['name']}': {e}")
-            self.log_event(f"Error updating next run time for task '{task['name']}': {e}", "error")
+            # Not advanced on disk, so running now could run them twice; try again later
+            logger.error(f"Error saving next run times: {e}")
+            self.log_event(f"Error saving next run times: {e}", "error")
+            if self.scheduler:
+                for task in advanced:
+                    self.scheduler.retry(task["id"], 60.0)
+            return set()
+        
+        # Re-arm the scheduler with the new next runs
+        if self.scheduler:
+            for task in advanced:
+                self.scheduler.update(task)
+        return run_now
+    
+    def catch_up_missed_runs(self) -> int:
+        """Apply misfire policies to all overdue tasks at once; returns how many were skipped ahead.
+        
+        Tasks whose policy skips missed runs are moved to their next slot with a
+        single write. The others stay due and are run by the scheduler.
+        """
+        now = datetime.datetime.now()
+        skipped_tasks = []
+        skipped_runs = 0
+        for task in self.tasks.due(now - MISFIRE_GRACE):
+            if task.get("misfire_policy", DEFAULT_MISFIRE_POLICY) != "skip":
+                continue
+            try:
+                _, skipped = advance_schedule(task, now)
+            except ValueError as e:
+                logger.error(f"Task '{task['name']}' has an invalid schedule: {e}")
+                continue
+            skipped_tasks.append(task)
+            skipped_runs += skipped
+        
+        if skipped_tasks:
+            self.tasks.save_many(skipped_tasks)
+            self.log_event(f"Skipped {skipped_runs} missed run(s) across {len(skipped_tasks)} task(s)", "warning")
+        return len(skipped_tasks)
     
     def get_logs(self, limit: int = 100) -> List[Dict[str, Any]]:
         """Get logs with optional limit"""
+        logs, _ = self.query_logs(limit=limit)
+        return logs
+    
+    def query_logs(self, level: Optional[str] = None, since: Optional[datetime.datetime] = None,
+                   until: Optional[datetime.datetime] = None, text: Optional[str] = None,
+                   task_id: Optional[str] = None, limit: Optional[int] = 100, offset: int = 0,
+                   cursor: Optional[str] = None) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """Query logs newest first; returns the page and a cursor for the next one"""
         try:
-            with open(self.logs_file, "r") as f:
-                logs = json.load(f)
-            
-            # Sort logs by timestamp (newest first)
-            logs.sort(key=lambda x: x["timestamp"], reverse=True)
-            
-            # Apply limit
-            return logs[:limit]
+            return self.event_log.query(
+                level=level, since=since, until=until, text=text, task_id=task_id,
+                limit=limit, offset=offset, cursor=cursor
+            )
         except Exception as e:
             logger.error(f"Error loading logs: {e}")
-            return []
+            return [], None
+    
+    def get_event_counts(self, window: datetime.timedelta = datetime.timedelta(days=7),
+                         task_id: Optional[str] = None) -> Dict[str, int]:
+        """Get event counts by kind (email_sent, summary_stored, ...) for a recent window"""
+        return self.event_counters.counts(window, task_id)
     
-    def log_event(self, message: str, level: str = "info") -> None:
-        """Log an event"""
+    def log_event(self, message: str, level: str = "info", task_id: Optional[str] = None,
+                  event: Optional[str] = None, count: int = 1) -> None:
+        """Log an event, optionally tagged with a counted event kind"""
         try:
             # Create log entry
             log_entry = {
@@ -321,20 +667,15 @@ class TaskManager:
                 "message": message,
                 "level": level
             }
+            if task_id:
+                log_entry["task_id"] = task_id
+            if event:
+                log_entry["event"] = event
+                if count != 1:
+                    log_entry["count"] = count
             
-            # Load existing logs
-            try:
-                with open(self.logs_file, "r") as f:
-                    logs = json.load(f)
-            except (FileNotFoundError, json.JSONDecodeError):
-                logs = []
-            
-            # Add new log entry
-            logs.append(log_entry)
-            
-            # Save logs
-            with open(self.logs_file, "w") as f:
-                json.dump(logs, f, indent=2)
+            # Append to the event log (written to disk in batches)
+            self.event_log.append(log_entry)
             
             # Log to logger as well
             if level == "error":
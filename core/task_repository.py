@@ -0,0 +1,153 @@
+import os
+import json
+import tempfile
+import datetime
+import threading
+import logging
+from pathlib import Path
+from typing import Dict, List, Any, Optional, Tuple, Callable
+
+logger = logging.getLogger(__name__)
+
+class TaskRepository:
+    """In-memory task store with write-through persistence.
+
+    Tasks are kept in a dict keyed by id (in file order) so lookups are
+    O(1). Every change is written through to ``path`` atomically via a temp
+    file and rename. Edits made to the file by something else are detected
+    by its mtime/inode/size and picked up on the next access (or on
+    ``reload_if_changed``), and reload listeners get the new task list. All
+    methods are thread-safe; callers get copies and must ``save`` to change
+    a task. With ``read_only`` a missing file reads as no tasks and changes
+    raise RuntimeError.
+    """
+
+    def __init__(self, path: str = "data/tasks.json", read_only: bool = False):
+        self.path = Path(path)
+        self.read_only = read_only
+        self._lock = threading.RLock()
+        self._tasks: Dict[str, Dict[str, Any]] = {}
+        self._stamp: Optional[Tuple[int, int, int]] = None
+        self._reload_listeners: List[Callable[[List[Dict[str, Any]]], None]] = []
+
+        if read_only:
+            if self.path.exists():
+                self._load()
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        if not self.path.exists():
+            self._persist()
+        self._load()
+
+    def all(self) -> List[Dict[str, Any]]:
+        """Return all tasks"""
+        with self._lock:
+            self._reload_if_changed()
+            return [dict(task) for task in self._tasks.values()]
+
+    def get(self, task_id: str) -> Optional[Dict[str, Any]]:
+        """Return a task by id, or None"""
+        with self._lock:
+            self._reload_if_changed()
+            task = self._tasks.get(task_id)
+            return dict(task) if task is not None else None
+
+    def due(self, now: datetime.datetime) -> List[Dict[str, Any]]:
+        """Return active tasks whose next run is at or before ``now``"""
+        now_str = now.isoformat()
+        return [task for task in self.all()
+                if task.get("active", True) and task.get("next_run", "") <= now_str]
+
+    def save(self, task: Dict[str, Any]) -> None:
+        """Create or update a task"""
+        self.save_many([task])
+
+    def save_many(self, tasks: List[Dict[str, Any]]) -> None:
+        """Create or update several tasks with a single write"""
+        with self._lock:
+            self._reload_if_changed()
+            previous = dict(self._tasks)
+            for task in tasks:
+                self._tasks[task["id"]] = dict(task)
+            try:
+                self._persist()
+            except Exception:
+                self._tasks = previous
+                raise
+
+    def delete(self, task_id: str) -> bool:
+        """Delete a task; returns False if it did not exist"""
+        with self._lock:
+            self._reload_if_changed()
+            if task_id not in self._tasks:
+                return False
+            previous = dict(self._tasks)
+            del self._tasks[task_id]
+            try:
+                self._persist()
+            except Exception:
+                self._tasks = previous
+                raise
+            return True
+
+    def add_reload_listener(self, listener: Callable[[List[Dict[str, Any]]], None]) -> None:
+        """Get called with all tasks whenever changes made by another process are loaded"""
+        with self._lock:
+            self._reload_listeners.append(listener)
+
+    def reload_if_changed(self) -> None:
+        """Pick up changes made to the file by another process"""
+        with self._lock:
+            self._reload_if_changed()
+
+    def _file_stamp(self) -> Optional[Tuple[int, int, int]]:
+        try:
+            stat = self.path.stat()
+        except FileNotFoundError:
+            return None
+        return stat.st_mtime_ns, stat.st_ino, stat.st_size
+
+    def _reload_if_changed(self) -> None:
+        if self._file_stamp() == self._stamp:
+            return
+        self._load()
+        tasks = [dict(task) for task in self._tasks.values()]
+        for listener in self._reload_listeners:
+            try:
+                listener(tasks)
+            except Exception as e:
+                logger.error(f"Error notifying task reload listener: {e}")
+
+    def _load(self) -> None:
+        """Load tasks from disk, keeping the cached copy if the file is unreadable"""
+        stamp = self._file_stamp()
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                tasks = json.load(f)
+        except (OSError, json.JSONDecodeError) as e:
+            logger.error(f"Error loading tasks: {e}")
+            self._stamp = stamp
+            return
+
+        self._tasks = {task["id"]: task for task in tasks}
+        self._stamp = stamp
+        logger.debug(f"Loaded {len(self._tasks)} tasks from {self.path}")
+
+    def _persist(self) -> None:
+        """Write all tasks atomically (temp file + rename)"""
+        if self.read_only:
+            raise RuntimeError("Task repository is open read-only")
+        fd, temp_path = tempfile.mkstemp(dir=self.path.parent, prefix=self.path.name, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(list(self._tasks.values()), f, indent=2)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(temp_path, self.path)
+        except Exception:
+            try:
+                os.unlink(temp_path)
+            except OSError:
+                pass
+            raise
+        self._stamp = self._file_stamp()
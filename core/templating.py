@@ -0,0 +1,76 @@
+import re
+import html
+import datetime
+from typing import Dict, List, Any, Optional, Tuple, Iterable
+
+# {name} placeholders; names may contain spaces, dots and dashes (spreadsheet headers).
+# Anything else in braces, such as CSS rules in an HTML body, is left alone.
+PLACEHOLDER = re.compile(r"\{([A-Za-z0-9_][\w .\-]*)\}")
+
+def run_context() -> Dict[str, Any]:
+    """Return the built-in values shared by every email of a run"""
+    return {"current_date": datetime.datetime.now().strftime("%Y-%m-%d")}
+
+def _is_missing(value: Any) -> bool:
+    # None, or NaN from pandas (NaN is the only value not equal to itself)
+    return value is None or value != value
+
+class Template:
+    """An email subject or body parsed once into literal and placeholder segments.
+
+    ``render`` fills placeholders from a recipient row, then from
+    ``context`` (values shared by the whole run, such as current_date),
+    with a single join. A placeholder with no value in either is kept as
+    written, matching the old str.replace behaviour. With ``html=True``
+    values are HTML-escaped so recipient data cannot break the markup.
+    """
+
+    def __init__(self, source: str, html: bool = False):
+        self.source = source or ""
+        self.html = html
+        self.segments: List[Tuple[str, Optional[str]]] = []  # (literal, placeholder or None)
+
+        position = 0
+        for match in PLACEHOLDER.finditer(self.source):
+            self.segments.append((self.source[position:match.start()], match.group(1)))
+            position = match.end()
+        if position < len(self.source) or not self.segments:
+            self.segments.append((self.source[position:], None))
+
+        self.placeholders = list(dict.fromkeys(name for _, name in self.segments if name is not None))
+
+    def unknown(self, fields: Iterable[str]) -> List[str]:
+        """Return placeholders that none of ``fields`` will fill"""
+        fields = set(fields)
+        return [name for name in self.placeholders if name not in fields]
+
+    def render(self, data: Dict[str, Any], context: Optional[Dict[str, Any]] = None,
+               missing: Optional[List[str]] = None) -> str:
+        """Fill the template for one recipient; placeholders left empty are appended to ``missing``"""
+        if len(self.segments) == 1 and self.segments[0][1] is None:
+            return self.segments[0][0]
+
+        context = context or {}
+        escape = self.html
+        parts = []
+        for literal, name in self.segments:
+            parts.append(literal)
+            if name is None:
+                continue
+            if name in data:
+                value = data[name]
+            elif name in context:
+                value = context[name]
+            else:
+                parts.append("{" + name + "}")
+                if missing is not None:
+                    missing.append(name)
+                continue
+            if _is_missing(value):
+                value = ""
+                if missing is not None:
+                    missing.append(name)
+            else:
+                value = str(value)
+            parts.append(html.escape(value) if escape else value)
+        return "".join(parts)
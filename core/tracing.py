@@ -0,0 +1,180 @@
+import os
+import json
+import time
+import uuid
+import datetime
+import threading
+import logging
+from typing import Dict, List, Any, Optional
+
+logger = logging.getLogger(__name__)
+
+_local = threading.local()
+
+class _NullSpan:
+    """Shared no-op span returned when no trace is active on the thread"""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    def set(self, key: str, value: Any) -> None:
+        pass
+
+_NULL_SPAN = _NullSpan()
+
+class Span:
+    """A timed stage of a task run; use as a context manager"""
+
+    __slots__ = ("trace", "name", "attributes", "start")
+
+    def __init__(self, trace: "Trace", name: str, attributes: Dict[str, Any]):
+        self.trace = trace
+        self.name = name
+        self.attributes = attributes
+        self.start = 0.0
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        end = time.perf_counter()
+        if exc_type is not None:
+            self.attributes["error"] = str(exc)
+        self.trace._finish_span(self, end)
+        return False
+
+    def set(self, key: str, value: Any) -> None:
+        """Attach an attribute to the span"""
+        self.attributes[key] = value
+
+class Trace:
+    """Timings of one task run.
+
+    Spans opened with ``span(name, **attributes)`` on the thread that
+    activated the trace are aggregated per name (count, total and max
+    time) for the run record. With ``record_events`` each span is also
+    kept as a Chrome trace event so the run can be exported and opened in
+    chrome://tracing or Perfetto. Without an active trace, ``span`` returns
+    a shared no-op object, so instrumented code costs next to nothing.
+    """
+
+    def __init__(self, task: Dict[str, Any], record_events: bool = False):
+        self.id = uuid.uuid4().hex
+        self.task = task
+        self.record_events = record_events
+        self.started = datetime.datetime.now()
+        self.finished: Optional[datetime.datetime] = None
+        self.success: Optional[bool] = None
+        self.stages: Dict[str, Dict[str, float]] = {}
+        self.attributes: Dict[str, Any] = {}
+        self.events: List[Dict[str, Any]] = []
+        self._origin = time.perf_counter()
+        self._thread_id = threading.get_ident()
+        self._previous = None
+
+    def __enter__(self):
+        """Make this the active trace of the current thread"""
+        self._previous = getattr(_local, "trace", None)
+        _local.trace = self
+        return self
+
+    def __exit__(self, *exc_info):
+        _local.trace = self._previous
+        return False
+
+    def set(self, key: str, value: Any) -> None:
+        """Attach a value to the run record"""
+        self.attributes[key] = value
+
+    def add(self, key: str, amount: int = 1) -> None:
+        """Increase a counter in the run record"""
+        self.attributes[key] = self.attributes.get(key, 0) + amount
+
+    def finish(self, success: bool) -> None:
+        """Mark the run as finished"""
+        self.finished = datetime.datetime.now()
+        self.success = success
+
+    def add_span(self, name: str, start: float, elapsed: float, thread_id: Optional[int] = None,
+                 **attributes) -> None:
+        """Record a stage timed on another thread; ``start`` is its time.perf_counter() value.
+
+        Call it from the thread that activated the trace, like ``span``.
+        """
+        self._record(name, start, elapsed, attributes, thread_id or self._thread_id)
+
+    def _finish_span(self, span: Span, end: float) -> None:
+        self._record(span.name, span.start, end - span.start, span.attributes, self._thread_id)
+
+    def _record(self, name: str, start: float, elapsed: float, attributes: Dict[str, Any], thread_id: int) -> None:
+        stage = self.stages.get(name)
+        if stage is None:
+            stage = self.stages[name] = {"count": 0, "total_ms": 0.0, "max_ms": 0.0}
+        stage["count"] += 1
+        stage["total_ms"] += elapsed * 1000
+        stage["max_ms"] = max(stage["max_ms"], elapsed * 1000)
+
+        if self.record_events:
+            self.events.append({
+                "name": name,
+                "cat": "task",
+                "ph": "X",
+                "ts": round((start - self._origin) * 1e6, 3),
+                "dur": round(elapsed * 1e6, 3),
+                "pid": os.getpid(),
+                "tid": thread_id,
+                "args": attributes
+            })
+
+    def to_record(self) -> Dict[str, Any]:
+        """Return the run record stored for the task"""
+        finished = self.finished or datetime.datetime.now()
+        record = {
+            "id": self.id,
+            "task_id": self.task.get("id"),
+            "task_name": self.task.get("name"),
+            "started": self.started.isoformat(),
+            "finished": finished.isoformat(),
+            "success": self.success,
+            "duration_ms": round((finished - self.started).total_seconds() * 1000, 1),
+            "stages": {
+                name: {"count": int(stage["count"]),
+                       "total_ms": round(stage["total_ms"], 1),
+                       "max_ms": round(stage["max_ms"], 1)}
+                for name, stage in self.stages.items()
+            }
+        }
+        record.update(self.attributes)
+        return record
+
+    def export(self, directory: str = "logs/traces") -> str:
+        """Write the recorded spans as a Chrome trace-event JSON file; returns its path"""
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(
+            directory,
+            f"{self.task.get('id')}-{self.started.strftime('%Y%m%d-%H%M%S')}-{self.id[:8]}.json"
+        )
+        metadata = [
+            {"name": "process_name", "ph": "M", "pid": os.getpid(), "args": {"name": "Outlook Email Automation"}},
+            {"name": "thread_name", "ph": "M", "pid": os.getpid(), "tid": self._thread_id,
+             "args": {"name": f"task {self.task.get('name')}"}}
+        ]
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"traceEvents": metadata + self.events, "displayTimeUnit": "ms"}, f, default=str)
+        self.attributes["trace_file"] = path
+        return path
+
+def current_trace() -> Optional[Trace]:
+    """Return the trace active on this thread, if any"""
+    return getattr(_local, "trace", None)
+
+def span(name: str, **attributes):
+    """Open a span in the thread's active trace, or a no-op span if there is none"""
+    trace = getattr(_local, "trace", None)
+    if trace is None:
+        return _NULL_SPAN
+    return Span(trace, name, attributes)
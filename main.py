@@ -1,19 +1,17 @@
 import sys
 import os
+import json
 from PySide6.QtWidgets import (
     QApplication, QMainWindow, QStackedWidget, 
-    QSystemTrayIcon, QMenu, QStyle
+    QSystemTrayIcon, QMenu, QStyle, QMessageBox
 )
-from PySide6.QtCore import QTimer, Qt
+from PySide6.QtCore import QObject, Signal, Qt
 from PySide6.QtGui import QIcon, QAction
 from dotenv import load_dotenv
 
 from ui.dashboard import DashboardWidget
-from ui.task_config import TaskConfigWidget
-from ui.settings import SettingsWidget
-from ui.logs import LogsWidget
-from ui.results import ResultsWidget
 from core.task_manager import TaskManager
+from core.daemon import DEFAULT_PIDFILE, write_pidfile, remove_pidfile
 from core.logger import setup_logger
 
 # Load environment variables
@@ -22,6 +20,20 @@ load_dotenv()
 # Setup logging
 logger = setup_logger()
 
+class TaskRunSignals(QObject):
+    """Carries task run notifications from worker threads to the GUI thread"""
+    started = Signal(dict)
+    progress = Signal(dict, str)
+    finished = Signal(dict, bool)
+    
+    def emit(self, kind, task, detail=None):
+        if kind == "started":
+            self.started.emit(task)
+        elif kind == "progress":
+            self.progress.emit(task, str(detail))
+        elif kind == "finished":
+            self.finished.emit(task, bool(detail))
+
 def resource_path(relative_path):
     if hasattr(sys, '_MEIPASS'):
         return os.path.join(sys._MEIPASS, relative_path)
@@ -40,27 +52,23 @@ class MainWindow(QMainWindow):
         # Create stacked widget for different screens
         self.stacked_widget = QStackedWidget()
         
-        # Create widgets for different screens
+        # Create the dashboard; other screens are built on first navigation
         self.dashboard = DashboardWidget(self.task_manager, self.navigate_to)
-        self.task_config = TaskConfigWidget(self.task_manager, self.navigate_to)
-        self.settings = SettingsWidget(self.navigate_to)
-        self.logs = LogsWidget(self.navigate_to)
-        self.results = ResultsWidget(self.task_manager, self.navigate_to)
-        
-        # Add widgets to stacked widget
         self.stacked_widget.addWidget(self.dashboard)
-        self.stacked_widget.addWidget(self.task_config)
-        self.stacked_widget.addWidget(self.settings)
-        self.stacked_widget.addWidget(self.logs)
-        self.stacked_widget.addWidget(self.results)
+        self.screens = {"dashboard": self.dashboard}
         
         # Set central widget
         self.setCentralWidget(self.stacked_widget)
         
-        # Set up timer for background task checking
-        self.timer = QTimer(self)
-        self.timer.timeout.connect(self.check_tasks)
-        self.timer.start(60000)  # Check every minute
+        # Tasks run on worker threads; their progress is reported through signals
+        self.run_signals = TaskRunSignals()
+        self.run_signals.started.connect(self.on_task_started)
+        self.run_signals.progress.connect(self.on_task_progress)
+        self.run_signals.finished.connect(self.on_task_finished)
+        self.task_manager.add_run_listener(self.run_signals.emit)
+        
+        # Start the scheduler; it wakes up exactly when a task is due
+        self.task_manager.start_scheduler()
         
         # Set up system tray
         self.setup_system_tray()
@@ -121,9 +129,41 @@ class MainWindow(QMainWindow):
         """Quit the application"""
         QApplication.quit()
     
+    def screen(self, name):
+        """Return a screen widget, creating it on first use"""
+        widget = self.screens.get(name)
+        if widget is None:
+            if name == "task_config":
+                from ui.task_config import TaskConfigWidget
+                widget = TaskConfigWidget(self.task_manager, self.navigate_to)
+            elif name == "settings":
+                from ui.settings import SettingsWidget
+                widget = SettingsWidget(self.navigate_to, self.task_manager.model_registry)
+            elif name == "logs":
+                from ui.logs import LogsWidget
+                widget = LogsWidget(self.navigate_to)
+            elif name == "results":
+                from ui.results import ResultsWidget
+                widget = ResultsWidget(self.task_manager, self.navigate_to)
+            else:
+                raise ValueError(f"Unknown screen: {name}")
+            self.stacked_widget.addWidget(widget)
+            self.screens[name] = widget
+        return widget
+    
+    def minimize_to_tray(self):
+        """Return whether closing the window should hide it to the tray"""
+        if "settings" in self.screens:
+            return self.screens["settings"].minimize_to_tray.isChecked()
+        try:
+            with open("data/settings.json", "r") as f:
+                return json.load(f).get("minimize_to_tray", True)
+        except (OSError, json.JSONDecodeError):
+            return True
+    
     def closeEvent(self, event):
         """Handle window close event"""
-        if self.settings.minimize_to_tray.isChecked():
+        if self.minimize_to_tray():
             event.ignore()
             self.hide_window()
             self.tray_icon.showMessage(
@@ -141,24 +181,36 @@ class MainWindow(QMainWindow):
             self.dashboard.refresh_data()
             self.stacked_widget.setCurrentWidget(self.dashboard)
         elif screen == "task_config":
+            task_config = self.screen("task_config")
             if data:  # task_id
-                self.task_config.load_task(data)
+                task_config.load_task(data)
             else:
-                self.task_config.clear_form()
-            self.stacked_widget.setCurrentWidget(self.task_config)
+                task_config.clear_form()
+            self.stacked_widget.setCurrentWidget(task_config)
         elif screen == "settings":
-            self.stacked_widget.setCurrentWidget(self.settings)
+            self.stacked_widget.setCurrentWidget(self.screen("settings"))
         elif screen == "logs":
-            self.logs.refresh_logs()
-            self.stacked_widget.setCurrentWidget(self.logs)
+            logs = self.screen("logs")
+            logs.refresh_logs()
+            self.stacked_widget.setCurrentWidget(logs)
         elif screen == "results":
             if data:  # task data
-                self.results.load_results(data)
-                self.stacked_widget.setCurrentWidget(self.results)
+                results = self.screen("results")
+                results.load_results(data)
+                self.stacked_widget.setCurrentWidget(results)
+    
+    def on_task_started(self, task):
+        """Show that a task has started running"""
+        self.statusBar().showMessage(f"Running task '{task['name']}'...")
+    
+    def on_task_progress(self, task, message):
+        """Show progress of a running task"""
+        self.statusBar().showMessage(f"{task['name']}: {message}")
     
-    def check_tasks(self):
-        """Check for tasks that need to be executed"""
-        self.task_manager.process_due_tasks()
+    def on_task_finished(self, task, success):
+        """Report a finished task and refresh the dashboard"""
+        status = "completed" if success else "failed"
+        self.statusBar().showMessage(f"Task '{task['name']}' {status}", 5000)
         # Refresh dashboard if it's the current widget
         if self.stacked_widget.currentWidget() == self.dashboard:
             self.dashboard.refresh_data()
@@ -178,7 +230,19 @@ if __name__ == "__main__":
     except Exception as e:
         logger.error(f"Failed to load stylesheet: {e}")
     
+    # Only one process (this window, the daemon or run-task) may schedule and run tasks
+    try:
+        write_pidfile(DEFAULT_PIDFILE, "gui")
+    except RuntimeError as e:
+        logger.error(str(e))
+        QMessageBox.critical(None, "Outlook Email Automation", f"{e}.\n\nStop it before starting the application.")
+        sys.exit(1)
+    
     window = MainWindow()
     window.show()
     
+    # Flush the event log and release the data directory before exiting
+    app.aboutToQuit.connect(window.task_manager.close)
+    app.aboutToQuit.connect(lambda: remove_pidfile(DEFAULT_PIDFILE))
+    
     sys.exit(app.exec())
\ No newline at end of file
@@ -0,0 +1,130 @@
+import os
+import tempfile
+import threading
+import unittest
+from collections import Counter
+
+from core.outlook_handler import OutlookHandler
+from core.send_ledger import SendLedgers, SENT, FAILED
+from core.recipient_filter import email_hash
+
+UNRESOLVABLE = "nobody@example.com"
+
+class FakeMail:
+    def __init__(self, outlook: "FakeOutlook"):
+        self.outlook = outlook
+        self.To = self.BCC = self.Subject = self.HTMLBody = ""
+
+    def Send(self):
+        bcc = [address for address in self.BCC.split("; ") if address]
+        with self.outlook.lock:
+            self.outlook.attempts += 1
+            # Like Outlook, refuse the whole item when any recipient cannot be resolved
+            if UNRESOLVABLE in bcc or self.To == UNRESOLVABLE:
+                raise RuntimeError(f"Outlook does not recognize '{UNRESOLVABLE}'")
+            self.outlook.sent.append(bcc or [self.To])
+
+class FakeOutlook:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.attempts = 0
+        self.sent = []  # Recipients of each delivered item
+
+    def CreateItem(self, item_type):
+        return FakeMail(self)
+
+class FakeOutlookHandler(OutlookHandler):
+    """OutlookHandler on a fake Outlook shared by every thread"""
+
+    def __init__(self):
+        super().__init__()
+        self.fake = FakeOutlook()
+
+    @property
+    def outlook(self):
+        return self.fake
+
+class SpyLedgers(SendLedgers):
+    """Send ledgers that also keep every record in memory"""
+
+    def __init__(self, directory: str):
+        super().__init__(directory)
+        self.records = []
+
+    def open(self, task_id, scheduled=None):
+        ledger = super().open(task_id, scheduled)
+        record = ledger.record
+
+        def spy(hashed, status):
+            self.records.append((hashed, status))
+            record(hashed, status)
+        ledger.record = spy
+        return ledger
+
+class OutlookBulkTest(unittest.TestCase):
+    def test_unresolvable_address_fails_only_itself(self):
+        handler = FakeOutlookHandler()
+        recipients = [f"user{i}@example.com" for i in range(16)]
+        recipients[5] = UNRESOLVABLE
+        with self.assertLogs("core.outlook_handler", "WARNING"):
+            accepted = handler.send_bulk(recipients, "News", "Hello")
+
+        self.assertEqual(accepted, [recipient != UNRESOLVABLE for recipient in recipients])
+        delivered = [address for item in handler.fake.sent for address in item]
+        self.assertEqual(sorted(delivered), sorted(set(recipients) - {UNRESOLVABLE}))
+        self.assertLessEqual(handler.fake.attempts, 2 * 4 + 1)  # Halving: two sends per level of 16
+
+class TaskManagerBulkTest(unittest.TestCase):
+    """Bulk (BCC) and personalized sending through TaskManager, with the send ledger"""
+
+    def setUp(self):
+        from core.task_manager import TaskManager
+
+        self.cwd = os.getcwd()
+        self.directory = tempfile.TemporaryDirectory()
+        os.chdir(self.directory.name)
+        self.manager = TaskManager()
+        self.manager.bcc_batch_size = 10
+        self.handler = self.manager.transports["outlook"] = FakeOutlookHandler()
+        self.manager.send_ledgers = SpyLedgers(os.path.join("data", "ledgers"))
+
+    def tearDown(self):
+        self.manager.close()
+        os.chdir(self.cwd)
+        self.directory.cleanup()
+
+    def _run(self, subject: str, recipients: list) -> None:
+        self.manager.tasks.save({
+            "id": "task-1", "name": "Campaign", "active": True, "recurrence": "once",
+            "next_run": "2099-01-01T00:00:00", "send_emails": True, "mail_transport": "outlook",
+            "email_subject": subject, "email_body": "<p>Hello</p>",
+            "manual_recipients": [{"email": email, "name": f"Name {i}"} for i, email in enumerate(recipients)],
+        })
+        self.manager.run_task_now("task-1", wait=True)
+
+    def test_templates_without_recipient_columns_go_out_in_bcc_groups(self):
+        recipients = [f"user{i}@example.com" for i in range(25)]
+        self._run("News for {current_date}", recipients)
+
+        self.assertEqual(sorted(len(item) for item in self.handler.fake.sent), [5, 10, 10])
+        self.assertEqual(self.manager.send_ledgers.records,
+                         [(email_hash(recipient), SENT) for recipient in recipients])
+
+    def test_personalized_templates_go_out_one_by_one(self):
+        recipients = [f"user{i}@example.com" for i in range(25)]
+        self._run("Hello {name}", recipients)
+
+        self.assertEqual(sorted(self.handler.fake.sent), sorted([recipient] for recipient in recipients))
+        self.assertEqual(Counter(status for _, status in self.manager.send_ledgers.records), {SENT: 25})
+
+    def test_unresolvable_address_fails_only_itself_in_the_ledger(self):
+        recipients = [f"user{i}@example.com" for i in range(25)]
+        recipients[3] = UNRESOLVABLE
+        self._run("News for {current_date}", recipients)
+
+        expected = [(email_hash(recipient), FAILED if recipient == UNRESOLVABLE else SENT)
+                    for recipient in recipients]
+        self.assertEqual(self.manager.send_ledgers.records, expected)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,91 @@
+import os
+import gzip
+import json
+import mailbox
+import tempfile
+import unittest
+from email.header import decode_header, make_header
+
+from core.dry_run import dry_run
+
+# Set DRY_RUN_MESSAGES=1000000 to render the full target instead of measuring the rate on a sample
+MESSAGES = int(os.environ.get("DRY_RUN_MESSAGES", 200000))
+TARGET_PER_MINUTE = 1000000
+
+def make_task(recipients: list) -> dict:
+    return {
+        "id": "task-1",
+        "name": "Campaign",
+        "email_subject": "Héllo {name}",
+        "email_body": "<p>Dear {name} of {company},</p>\nFrom the team\n<p>Sent {current_date}</p>",
+        "manual_recipients": recipients,
+    }
+
+class DryRunOutputTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.recipients = [{"email": f"user{i}@example.com", "name": f"User <{i}>", "company": f"Co {i}"}
+                           for i in range(50)]
+        self.recipients[7]["company"] = None
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.directory.name, name)
+
+    def test_jsonl_output_in_recipient_order(self):
+        # Small chunks on two processes: chunks are written in order, each one a gzip member
+        report = dry_run(make_task(self.recipients), self._path("out.jsonl.gz"), "jsonl",
+                         processes=2, chunk_size=8)
+        with gzip.open(report.path, "rt", encoding="utf-8") as f:
+            records = [json.loads(line) for line in f]
+
+        self.assertEqual(report.messages, 50)
+        self.assertEqual([record["to"] for record in records], [r["email"] for r in self.recipients])
+        self.assertEqual(records[0]["subject"], "Héllo User <0>")
+        self.assertIn("<p>Dear User &lt;0&gt; of Co 0,</p>", records[0]["body"])
+        self.assertNotIn("{current_date}", records[0]["body"])
+        self.assertEqual(records[7]["missing"], ["company"])
+        self.assertNotIn("missing", records[0])
+        self.assertEqual(dict(report.missing), {"company": 1})
+        self.assertEqual(len(report.sizes), 50)
+        self.assertEqual(report.bytes_written, os.path.getsize(report.path))
+
+    def test_mbox_output(self):
+        report = dry_run(make_task(self.recipients), self._path("out.mbox"), "mbox", processes=1)
+        box = mailbox.mbox(report.path)
+        try:
+            messages = list(box)
+        finally:
+            box.close()
+
+        self.assertEqual(len(messages), 50)
+        first = messages[0]
+        self.assertEqual(first["To"], "user0@example.com")
+        self.assertEqual(str(make_header(decode_header(first["Subject"]))), "Héllo User <0>")
+        body = first.get_payload(decode=True).decode("utf-8")
+        self.assertIn(">From the team", body)  # mboxrd escaping of "From " lines
+        self.assertEqual(messages[7]["X-Missing-Placeholders"], "company")
+
+    def test_unknown_format(self):
+        with self.assertRaises(ValueError):
+            dry_run(make_task(self.recipients), self._path("out.txt"), "txt")
+
+class DryRunBenchmark(unittest.TestCase):
+    """Rendering throughput against the target of 1M messages a minute"""
+
+    def test_render_rate(self):
+        recipients = [{"email": f"user{i}@example.com", "name": f"User {i}", "company": f"Co {i % 100}"}
+                      for i in range(MESSAGES)]
+        task = make_task(recipients)
+        task["email_body"] += "<p>Lorem ipsum dolor sit amet, consectetur adipiscing elit.</p>\n" * 20
+        with tempfile.TemporaryDirectory() as directory:
+            report = dry_run(task, os.path.join(directory, "out.jsonl.gz"), "jsonl")
+
+        print(f"\n{report.summary()}", end="")
+        self.assertEqual(report.messages, MESSAGES)
+        self.assertGreaterEqual(report.rate * 60, TARGET_PER_MINUTE)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,130 @@
+import time
+import datetime
+import tempfile
+import unittest
+
+from core.event_log import EventLog
+
+DAYS = 180
+EVENTS_PER_DAY = 1500
+MAX_ENTRIES = 30 * EVENTS_PER_DAY  # About a month of events
+MAX_BYTES = 256 * 1024  # Binds before MAX_ENTRIES once segments are compressed
+
+def event(timestamp: datetime.datetime, i: int) -> dict:
+    return {
+        "timestamp": timestamp.isoformat(),
+        "message": f"Email sent {i % 50} to user{i}@example.com for task 'Campaign {i % 10}'",
+        "level": "error" if i % 100 == 0 else "info",
+        "task_id": f"task-{i % 10}",
+    }
+
+class EventLogRetentionTest(unittest.TestCase):
+    """Six months of high-volume logging under entry and size limits"""
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.log = EventLog(self.directory.name, legacy_file=None, segment_max_entries=5000,
+                            max_entries=MAX_ENTRIES, max_bytes=MAX_BYTES)
+
+    def tearDown(self):
+        self.log.close()
+        self.directory.cleanup()
+
+    def _disk_bytes(self) -> int:
+        return sum(path.stat().st_size for path in self.log.directory.iterdir())
+
+    def _settle(self, timeout: float = 30.0) -> None:
+        """Wait for background maintenance to archive and trim everything it should"""
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            indexes = list(self.log.indexes)
+            # Retention keeps the oldest segment only while the log is within its limits without it
+            if all(self.log._is_archived(index.path) for index in indexes[:-1]) and \
+                    sum(index.count for index in indexes[1:]) <= MAX_ENTRIES and \
+                    sum(self.log._disk_size(index) for index in indexes[1:]) <= MAX_BYTES:
+                return
+            time.sleep(0.05)
+        self.fail("Event log maintenance did not catch up")
+
+    def _time_queries(self) -> float:
+        """Return the slowest of a few typical dashboard queries, in seconds"""
+        slowest = 0.0
+        for kwargs in ({}, {"level": "error"}, {"task_id": "task-3"}, {"text": "sent 25"}):
+            started = time.perf_counter()
+            entries, _ = self.log.query(limit=100, **kwargs)
+            slowest = max(slowest, time.perf_counter() - started)
+            self.assertTrue(entries)
+        return slowest
+
+    def test_steady_state_size_and_query_latency(self):
+        start = datetime.datetime.now() - datetime.timedelta(days=DAYS)
+        step = datetime.timedelta(days=1) / EVENTS_PER_DAY
+        monthly = []
+        for day in range(DAYS):
+            for i in range(EVENTS_PER_DAY):
+                self.log.append(event(start + day * datetime.timedelta(days=1) + i * step, i))
+            if (day + 1) % 30 == 0:
+                self._settle()
+                monthly.append((self._disk_bytes(), sum(index.count for index in self.log.indexes),
+                                self._time_queries()))
+
+        for month, (size, entries, latency) in enumerate(monthly, 1):
+            print(f"\nmonth {month}: {size / 1048576:.1f} MB on disk, {entries} events kept, "
+                  f"slowest query {latency * 1000:.1f} ms", end="")
+
+        # Once the limits are reached, size, kept events and query time stop growing
+        steady = monthly[1:]
+        for size, entries, _ in steady:
+            self.assertLessEqual(size, MAX_BYTES + 1024 * 1024)  # Plus the active segment
+            self.assertLessEqual(entries, MAX_ENTRIES + self.log.segment_max_entries)
+        self.assertLess(max(latency for _, _, latency in steady), 3 * min(latency for _, _, latency in steady) + 0.1)
+        self.assertLess(max(latency for _, _, latency in monthly), 0.5)
+
+    def test_old_archives_are_dropped_and_still_queryable_until_then(self):
+        self.log.close()
+        self.log = EventLog(self.directory.name, legacy_file=None, segment_max_entries=1000, max_age_days=30)
+        now = datetime.datetime.now()
+        for i in range(3000):
+            self.log.append(event(now - datetime.timedelta(days=60), i))
+        for i in range(3000):
+            self.log.append(event(now - datetime.timedelta(days=1), i))
+        self.log.append(event(now, 0))
+        self.log.compact()
+
+        kept = self.log.read_all()
+        self.assertEqual(len(kept), 3001)
+        self.assertTrue(all(entry["timestamp"] >= (now - datetime.timedelta(days=30)).isoformat() for entry in kept))
+        entries, _ = self.log.query(level="error", limit=None)
+        self.assertEqual(len(entries), 31)
+
+class EventLogIndexTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.log = EventLog(self.directory.name, legacy_file=None, segment_max_entries=1000)
+
+    def tearDown(self):
+        self.log.close()
+        self.directory.cleanup()
+
+    def test_index_offsets_match_segment_bytes(self):
+        now = datetime.datetime.now()
+        for i in range(2500):
+            entry = event(now + datetime.timedelta(seconds=i), i)
+            entry["message"] += " \u00e9\u20ac"  # Multi-byte characters
+            self.log.append(entry)
+        self.log.flush()
+
+        # Sealed segments may be archived meanwhile; the active one is plain
+        index = self.log.active_index
+        data = index.path.read_bytes()
+        self.assertEqual(index.size, len(data))
+        for block_number in range(len(index.blocks)):
+            start, end = index.block_range(block_number)
+            self.assertTrue(start == 0 or data[start - 1:start] == b"\n")
+            self.assertEqual(len(self.log._read_block(index, start, end)), index.blocks[block_number][1])
+
+        entries, _ = self.log.query(limit=None)
+        self.assertEqual(len(entries), 2500)
+
+if __name__ == "__main__":
+    unittest.main()
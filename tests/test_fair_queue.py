@@ -0,0 +1,89 @@
+import time
+import threading
+import unittest
+from collections import Counter
+
+from core.fair_queue import FairQueue, PRIORITY_CLASSES
+
+SERVICE_TIME = 0.005  # Seconds a unit holds its slot
+
+def percentiles(values: list) -> dict:
+    values = sorted(values)
+    last = len(values) - 1
+    return {"p50": values[last * 50 // 100], "p90": values[last * 90 // 100], "p99": values[last * 99 // 100]}
+
+class FairQueueSimulation(unittest.TestCase):
+    """Mixed workloads sharing two Outlook slots"""
+
+    def test_mixed_workload_latency_by_class(self):
+        queue = FairQueue("outlook", slots=2)
+        stop = threading.Event()
+        waits = {priority: [] for priority in PRIORITY_CLASSES}
+
+        def run_flow(flow: str, priority: str, cost: float, pause: float):
+            """Acquire slots back to back (a campaign), or every ``pause`` seconds (small tasks)"""
+            while not stop.is_set():
+                started = time.perf_counter()
+                with queue.slot(flow, cost=cost, priority=priority):
+                    waits[priority].append(time.perf_counter() - started)
+                    time.sleep(SERVICE_TIME)
+                if pause:
+                    time.sleep(pause)
+
+        flows = [
+            # A 50k-recipient campaign sending batches from four workers
+            *[("campaign", "low", 50.0, 0.0) for _ in range(4)],
+            # Regular tasks sending a batch now and then
+            *[(f"newsletter-{i}", "normal", 10.0, 0.02) for i in range(3)],
+            # Response processing: short inbox scans and summaries
+            *[(f"responses-{i}", "high", 1.0, 0.05) for i in range(3)],
+        ]
+        threads = [threading.Thread(target=run_flow, args=flow, daemon=True) for flow in flows]
+        for thread in threads:
+            thread.start()
+        time.sleep(2.0)
+        stop.set()
+        for thread in threads:
+            thread.join()
+
+        print()
+        report = {}
+        for priority in PRIORITY_CLASSES:
+            report[priority] = percentiles(waits[priority])
+            print(f"{priority:>6}: {len(waits[priority]):4d} units, wait " +
+                  ", ".join(f"{key} {value * 1000:.1f} ms" for key, value in report[priority].items()))
+
+        # High-priority units wait for at most a slot to free up, however busy the campaign keeps Outlook
+        self.assertLess(report["high"]["p99"], 4 * SERVICE_TIME + 0.02)
+        self.assertLess(report["high"]["p50"], report["low"]["p50"])
+        self.assertLess(report["normal"]["p50"], report["low"]["p50"])
+        # The campaign still makes progress
+        self.assertGreater(len(waits["low"]), 20)
+
+    def test_weights_share_slots_within_a_class(self):
+        queue = FairQueue("ollama", slots=1)
+        stop = threading.Event()
+        served = Counter()
+
+        def run_flow(flow: str, weight: float):
+            while not stop.is_set():
+                with queue.slot(flow, weight=weight):
+                    served[flow] += 1
+                    time.sleep(0.001)
+
+        threads = [threading.Thread(target=run_flow, args=(flow, weight), daemon=True)
+                   for flow, weight in (("heavy", 2.0), ("heavy", 2.0), ("light", 1.0), ("light", 1.0))]
+        for thread in threads:
+            thread.start()
+        time.sleep(1.0)
+        stop.set()
+        for thread in threads:
+            thread.join()
+
+        ratio = served["heavy"] / served["light"]
+        print(f"\nweight 2 vs 1: served {served['heavy']} vs {served['light']} units ({ratio:.2f}x)", end="")
+        self.assertGreater(ratio, 1.5)
+        self.assertLess(ratio, 2.5)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,195 @@
+import time
+import asyncio
+import threading
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+
+from core.mail_transport import SMTPTransport
+
+class StandInSMTPServer:
+    """A local SMTP server on its own event loop thread.
+
+    Offers PIPELINING, refuses RCPT for addresses in ``refused`` and
+    rejects DATA when no recipient was accepted. ``latency`` seconds are
+    spent before accepting each message. Each envelope records how many
+    commands arrived before the server sent its first reply.
+    """
+
+    def __init__(self, refused=(), latency: float = 0.0):
+        self.refused = set(refused)
+        self.latency = latency
+        self.messages = []  # (recipients, data)
+        self.envelopes = []  # Commands received before the first reply
+        self.connections = 0
+        self._writers = set()
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, daemon=True)
+        self._thread.start()
+        self._server = self._run(asyncio.start_server(self._handle, "127.0.0.1", 0))
+        self.port = self._server.sockets[0].getsockname()[1]
+
+    def _run(self, coroutine):
+        return asyncio.run_coroutine_threadsafe(coroutine, self._loop).result()
+
+    def drop_connections(self) -> None:
+        """Close every client connection, as a server timing out idle sessions would"""
+        async def drop():
+            for writer in list(self._writers):
+                writer.close()
+        self._run(drop())
+
+    def close(self) -> None:
+        self.drop_connections()
+        self._server.close()
+        self._run(self._server.wait_closed())
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._loop.close()
+
+    async def _handle(self, reader, writer):
+        self.connections += 1
+        self._writers.add(writer)
+
+        def reply(line: str) -> None:
+            writer.write(line.encode("utf-8") + b"\r\n")
+
+        try:
+            reply("220 localhost ready")
+            while True:
+                line = await reader.readline()
+                if not line:
+                    return
+                command = line.decode("utf-8").strip()
+                verb = command.upper()
+                if verb.startswith("EHLO"):
+                    reply("250-localhost")
+                    reply("250-PIPELINING")
+                    reply("250 8BITMIME")
+                elif verb.startswith("MAIL FROM"):
+                    # Collect the rest of a pipelined envelope before replying
+                    envelope = [command]
+                    while not envelope[-1].upper().startswith("DATA"):
+                        try:
+                            next_line = await asyncio.wait_for(reader.readline(), 0.5)
+                        except asyncio.TimeoutError:
+                            break
+                        envelope.append(next_line.decode("utf-8").strip())
+                    self.envelopes.append(len(envelope))
+                    await self._envelope(envelope, reader, reply)
+                elif verb == "RSET":
+                    reply("250 OK")
+                elif verb == "QUIT":
+                    reply("221 Bye")
+                    await writer.drain()
+                    return
+                else:
+                    reply("502 Not implemented")
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            self._writers.discard(writer)
+            writer.close()
+
+    async def _envelope(self, envelope, reader, reply):
+        recipients = []
+        reply("250 OK")  # MAIL FROM
+        for command in envelope[1:]:
+            if command.upper().startswith("RCPT TO"):
+                address = command.split(":", 1)[1].strip("<>")
+                if address in self.refused:
+                    reply("550 No such user")
+                else:
+                    recipients.append(address)
+                    reply("250 OK")
+            elif command.upper().startswith("DATA"):
+                if not recipients:
+                    reply("554 No valid recipients")
+                    return
+                reply("354 Go ahead")
+                lines = []
+                while True:
+                    line = await reader.readline()
+                    if line == b".\r\n":
+                        break
+                    lines.append(line[1:] if line.startswith(b"..") else line)
+                if self.latency:
+                    await asyncio.sleep(self.latency)
+                self.messages.append((recipients, b"".join(lines)))
+                reply("250 Queued")
+
+class SMTPTransportTest(unittest.TestCase):
+    def setUp(self):
+        self.server = StandInSMTPServer(refused={"nobody@example.com"})
+        self.transport = self._transport(self.server)
+
+    def tearDown(self):
+        self.transport.close()
+        self.server.close()
+
+    @staticmethod
+    def _transport(server: StandInSMTPServer, pool_size: int = 1) -> SMTPTransport:
+        return SMTPTransport(host="127.0.0.1", port=server.port, security="none",
+                             sender="sender@example.com", pool_size=pool_size, timeout=5.0)
+
+    def test_envelope_is_pipelined(self):
+        self.assertTrue(self.transport.send_email("a@example.com", "Hello", "<p>.Hi</p>"))
+        self.assertEqual(self.server.envelopes, [3])  # MAIL FROM, RCPT TO and DATA in one write
+        recipients, data = self.server.messages[0]
+        self.assertEqual(recipients, ["a@example.com"])
+        self.assertIn(b"Subject: Hello", data)
+
+    def test_refused_recipient(self):
+        accepted = self.transport.send_bulk(["a@example.com", "nobody@example.com", "b@example.com"],
+                                            "Hello", "Hi")
+        self.assertEqual(accepted, [True, False, True])
+        self.assertEqual(self.server.envelopes, [5])
+        self.assertEqual(self.server.messages[0][0], ["a@example.com", "b@example.com"])
+
+    def test_every_recipient_refused(self):
+        with self.assertLogs("core.mail_transport", "ERROR"):
+            self.assertFalse(self.transport.send_email("nobody@example.com", "Hello", "Hi"))
+        self.assertEqual(self.server.messages, [])
+
+        # The session was reset and is reused for the next message
+        self.assertTrue(self.transport.send_email("a@example.com", "Hello", "Hi"))
+        self.assertEqual(self.server.connections, 1)
+
+    def test_reconnects_after_server_drops_connection(self):
+        self.assertTrue(self.transport.send_email("a@example.com", "Hello", "Hi"))
+        self.server.drop_connections()
+        time.sleep(0.1)
+        self.assertTrue(self.transport.send_email("b@example.com", "Hello", "Hi"))
+        self.assertEqual(self.server.connections, 2)
+        self.assertEqual([recipients for recipients, _ in self.server.messages],
+                         [["a@example.com"], ["b@example.com"]])
+
+class SMTPThroughputBenchmark(unittest.TestCase):
+    """Send throughput through the connection pool, against a server that takes 20 ms per message"""
+
+    MESSAGES = 40
+
+    def _throughput(self, pool_size: int) -> float:
+        server = StandInSMTPServer(latency=0.02)
+        transport = SMTPTransportTest._transport(server, pool_size)
+        try:
+            started = time.perf_counter()
+            with ThreadPoolExecutor(8) as pool:
+                results = list(pool.map(lambda i: transport.send_email(f"user{i}@example.com", "Hello", "Hi"),
+                                        range(self.MESSAGES)))
+            seconds = time.perf_counter() - started
+        finally:
+            transport.close()
+            server.close()
+        self.assertTrue(all(results))
+        self.assertEqual(len(server.messages), self.MESSAGES)
+        self.assertLessEqual(server.connections, pool_size)
+        return self.MESSAGES / seconds
+
+    def test_throughput_scales_with_pool_size(self):
+        rates = {pool_size: self._throughput(pool_size) for pool_size in (1, 4)}
+        print("\nSMTP: " + ", ".join(f"pool of {size} {rate:,.0f}/s" for size, rate in rates.items()), end="")
+        self.assertGreater(rates[4], 2 * rates[1])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,46 @@
+import time
+import threading
+import unittest
+
+from core.model_registry import ModelRegistry, DEFAULT_MODEL
+
+class StubRegistry(ModelRegistry):
+    """ModelRegistry whose refresh returns ``models`` once ``release`` is set"""
+
+    def __init__(self, models, **kwargs):
+        self.stub_models = models
+        self.release = threading.Event()
+        super().__init__(**kwargs)
+
+    def _refresh(self):
+        self.release.wait()
+        with self._lock:
+            self._models = list(self.stub_models)
+            self._expires = time.monotonic() + self.ttl
+            self._resolved = {}
+        self._loaded.set()
+
+class ModelRegistryResolveTest(unittest.TestCase):
+    def test_resolve_falls_back_when_ollama_hangs(self):
+        registry = StubRegistry(["mistral:latest"], load_timeout=0.2)
+        try:
+            started = time.monotonic()
+            with self.assertLogs("core.model_registry", "WARNING"):
+                self.assertEqual(registry.resolve("llama3"), "llama3")
+                self.assertEqual(registry.resolve(""), DEFAULT_MODEL)
+            self.assertLess(time.monotonic() - started, 2.0)
+        finally:
+            registry.release.set()
+
+        # The fallback was not remembered: once the list loads, it is used
+        self.assertTrue(registry.wait_until_loaded(5.0))
+        self.assertEqual(registry.resolve("llama3"), "mistral:latest")
+
+    def test_resolve_uses_loaded_models(self):
+        registry = StubRegistry(["llama3:8b", "mistral:latest"])
+        registry.release.set()
+        self.assertEqual(registry.resolve("llama3"), "llama3:8b")
+        self.assertEqual(registry.resolve("mistral:latest"), "mistral:latest")
+
+if __name__ == "__main__":
+    unittest.main()
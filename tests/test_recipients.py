@@ -0,0 +1,116 @@
+import os
+import csv
+import tempfile
+import unittest
+import zipfile
+import tracemalloc
+import importlib.util
+from xml.sax.saxutils import escape
+
+from core.recipients import RecipientFile
+
+COLUMNS = ["email", "name", "company", "city", "notes", "extra"]
+
+def row(i: int) -> list:
+    return [f"user{i}@example.com", f"User {i}", f"Company {i % 1000}", "Amsterdam",
+            "Lorem ipsum dolor sit amet " * 3, f"value {i}"]
+
+def column_name(index: int) -> str:
+    return chr(ord("A") + index)  # Enough for COLUMNS
+
+def peak_bytes(recipient_file: RecipientFile, columns: list) -> tuple:
+    """Return (rows, peak traced bytes) while streaming every row"""
+    tracemalloc.start()
+    try:
+        count = 0
+        for recipient in recipient_file.rows(columns):
+            count += 1
+        return count, tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+class RecipientFileMemoryTest(unittest.TestCase):
+    """Peak memory while streaming a recipient file must not grow with its row count"""
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def _csv(self, rows: int) -> str:
+        path = os.path.join(self.directory.name, f"recipients-{rows}.csv")
+        with open(path, "w", encoding="utf-8", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(COLUMNS)
+            for i in range(rows):
+                writer.writerow(row(i))
+        return path
+
+    def _xlsx(self, rows: int) -> str:
+        """Write a minimal .xlsx laid out like Excel's, with inline strings and a dimension record"""
+        path = os.path.join(self.directory.name, f"recipients-{rows}.xlsx")
+        main = "http://schemas.openxmlformats.org/spreadsheetml/2006/main"
+        relationships = "http://schemas.openxmlformats.org/officeDocument/2006/relationships"
+        package = "http://schemas.openxmlformats.org/package/2006/relationships"
+
+        def xml_row(number: int, values: list) -> str:
+            cells = "".join(f'<c r="{column_name(i)}{number}" t="inlineStr"><is><t>{escape(value)}</t></is></c>'
+                            for i, value in enumerate(values))
+            return f'<row r="{number}">{cells}</row>'
+
+        with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as archive:
+            archive.writestr("[Content_Types].xml",
+                '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+                '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+                '<Default Extension="xml" ContentType="application/xml"/>'
+                '<Override PartName="/xl/workbook.xml" '
+                'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+                '<Override PartName="/xl/worksheets/sheet1.xml" '
+                'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+                '</Types>')
+            archive.writestr("_rels/.rels",
+                f'<Relationships xmlns="{package}"><Relationship Id="rId1" Target="xl/workbook.xml" '
+                f'Type="{relationships}/officeDocument"/></Relationships>')
+            archive.writestr("xl/workbook.xml",
+                f'<workbook xmlns="{main}" xmlns:r="{relationships}"><sheets>'
+                f'<sheet name="Sheet1" sheetId="1" r:id="rId1"/></sheets></workbook>')
+            archive.writestr("xl/_rels/workbook.xml.rels",
+                f'<Relationships xmlns="{package}"><Relationship Id="rId1" Target="worksheets/sheet1.xml" '
+                f'Type="{relationships}/worksheet"/></Relationships>')
+            with archive.open("xl/worksheets/sheet1.xml", "w") as f:
+                f.write(f'<worksheet xmlns="{main}"><dimension ref="A1:{column_name(len(COLUMNS) - 1)}{rows + 1}"/>'
+                        f'<sheetData>'.encode("utf-8"))
+                f.write(xml_row(1, COLUMNS).encode("utf-8"))
+                for i in range(rows):
+                    f.write(xml_row(i + 2, row(i)).encode("utf-8"))
+                f.write(b"</sheetData></worksheet>")
+        return path
+
+    def _assert_bounded(self, small_path: str, large_path: str, small_rows: int, large_rows: int) -> None:
+        columns = ["email", "name", "company"]
+        peak_bytes(RecipientFile(small_path), columns)  # Warm up: lazy imports are not part of the peak
+        small_count, small_peak = peak_bytes(RecipientFile(small_path, chunk_size=10000), columns)
+        large_count, large_peak = peak_bytes(RecipientFile(large_path, chunk_size=10000), columns)
+        print(f"\npeak memory: {small_peak / 1048576:.1f} MB for {small_rows:,} rows, "
+              f"{large_peak / 1048576:.1f} MB for {large_rows:,} rows", end="")
+        self.assertEqual((small_count, large_count), (small_rows, large_rows))
+        # Ten times the rows, about the same peak
+        self.assertLess(large_peak, 1.5 * small_peak + 1024 * 1024)
+
+    @unittest.skipUnless(importlib.util.find_spec("pandas"), "needs pandas")
+    def test_csv_1m_rows(self):
+        self._assert_bounded(self._csv(100000), self._csv(1000000), 100000, 1000000)
+
+    @unittest.skipUnless(importlib.util.find_spec("openpyxl"), "needs openpyxl")
+    def test_xlsx_rows(self):
+        self._assert_bounded(self._xlsx(5000), self._xlsx(50000), 5000, 50000)
+
+    @unittest.skipUnless(importlib.util.find_spec("pandas"), "needs pandas")
+    def test_only_requested_columns_are_kept(self):
+        path = self._csv(10)
+        rows = list(RecipientFile(path).rows(["email", "company"]))
+        self.assertEqual(rows[3], {"email": "user3@example.com", "company": "Company 3"})
+
+if __name__ == "__main__":
+    unittest.main()
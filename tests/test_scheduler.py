@@ -0,0 +1,77 @@
+import time
+import datetime
+import threading
+import unittest
+
+from core.scheduler import Scheduler
+
+TASKS = 10000
+
+def task(task_id: str, deadline: float) -> dict:
+    return {"id": task_id, "active": True, "next_run": datetime.datetime.fromtimestamp(deadline).isoformat()}
+
+def far_tasks(count: int) -> list:
+    later = time.time() + 86400
+    return [task(f"task-{i}", later + i) for i in range(count)]
+
+class SchedulerBenchmark(unittest.TestCase):
+    """Start latency and per-tick cost with 10k scheduled tasks"""
+
+    def test_start_latency_with_10k_tasks(self):
+        fired = {}
+        done = threading.Event()
+
+        def on_due(task_ids):
+            now = time.time()
+            for task_id in task_ids:
+                fired[task_id] = now
+            if len(fired) >= 20:
+                done.set()
+
+        scheduler = Scheduler(on_due)
+        scheduler.load(far_tasks(TASKS))
+        scheduler.start()
+        try:
+            # next_run has microsecond precision, so deadlines are exact
+            base = time.time() + 0.5
+            deadlines = {f"due-{i}": base + i * 0.05 for i in range(20)}
+            for task_id, deadline in deadlines.items():
+                scheduler.update(task(task_id, deadline))
+            self.assertTrue(done.wait(10))
+        finally:
+            scheduler.stop()
+
+        lateness = sorted(fired[task_id] - deadline for task_id, deadline in deadlines.items())
+        print(f"\nstart latency with {TASKS} tasks: median {lateness[10] * 1000:.1f} ms, "
+              f"max {lateness[-1] * 1000:.1f} ms", end="")
+        self.assertGreaterEqual(lateness[0], -0.001)
+        self.assertLess(lateness[-1], 0.5)
+
+    def _tick_cost(self, count: int, rounds: int = 2000) -> float:
+        """Return the seconds to re-arm a task and find the next deadline, as on each wake-up"""
+        scheduler = Scheduler(lambda task_ids: None)
+        tasks = far_tasks(count)
+        scheduler.load(tasks)
+        started = time.perf_counter()
+        for i in range(rounds):
+            changed = dict(tasks[i % count], next_run=tasks[(i * 7919) % count]["next_run"])
+            scheduler.update(changed)
+            scheduler.next_deadline()
+        return (time.perf_counter() - started) / rounds
+
+    def test_tick_cost_does_not_grow_with_task_count(self):
+        small, large = min(self._tick_cost(100) for _ in range(3)), min(self._tick_cost(TASKS) for _ in range(3))
+        print(f"\nper-tick cost: {small * 1e6:.1f} us with 100 tasks, {large * 1e6:.1f} us with {TASKS}", end="")
+        self.assertLess(large, 5 * small)
+
+    def test_heap_stays_bounded_under_rearming(self):
+        scheduler = Scheduler(lambda task_ids: None)
+        tasks = far_tasks(TASKS)
+        scheduler.load(tasks)
+        for _ in range(5):
+            for item in tasks:
+                scheduler.update(item)
+        self.assertLessEqual(len(scheduler._heap), 2 * TASKS + 64)
+
+if __name__ == "__main__":
+    unittest.main()
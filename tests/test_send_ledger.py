@@ -0,0 +1,129 @@
+import os
+import time
+import datetime
+import tempfile
+import unittest
+
+from core.send_ledger import SendLedgers, SENT, FAILED, OPEN_SUFFIX, DONE_SUFFIX
+from core.recipient_filter import email_hash
+
+def hashes(count: int, start: int = 0) -> list:
+    return [email_hash(f"user{i}@example.com") for i in range(start, start + count)]
+
+class SendLedgerTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.ledgers = SendLedgers(self.directory.name)
+        self.scheduled = datetime.datetime(2024, 5, 1, 9, 0)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_resume_after_crash_skips_sent_recipients(self):
+        recipients = hashes(100)
+        ledger = self.ledgers.open("task-1", self.scheduled)
+        for hashed in recipients[:40]:
+            ledger.record(hashed, SENT)
+        ledger.record(recipients[40], FAILED)
+        ledger.commit()
+        ledger.close()  # Interrupted: never finished
+
+        # A crash mid-write leaves a torn last line
+        path = ledger.path
+        with open(path, "a", encoding="utf-8") as f:
+            f.write(recipients[41][:10])
+
+        self.assertEqual(self.ledgers.interrupted(), [("task-1", ledger.run_key)])
+        resumed = self.ledgers.open("task-1", self.scheduled)
+        try:
+            self.assertEqual(resumed.path, path)
+            self.assertEqual(resumed.sent_count, 40)
+            pending = [hashed for hashed in recipients if not resumed.is_sent(hashed)]
+            self.assertEqual(pending, recipients[40:])
+            for hashed in pending:
+                resumed.record(hashed, SENT)
+            resumed.finish()
+        finally:
+            resumed.close()
+
+        # Re-running the completed occurrence still skips everyone
+        again = self.ledgers.open("task-1", self.scheduled)
+        try:
+            self.assertTrue(all(again.is_sent(hashed) for hashed in recipients))
+        finally:
+            again.close()
+
+    def test_finish_compacts_to_sent_recipients(self):
+        recipients = hashes(10)
+        ledger = self.ledgers.open("task-1", self.scheduled)
+        for hashed in recipients:
+            ledger.record(hashed, FAILED)
+        for hashed in recipients[:6]:
+            ledger.record(hashed, SENT)  # Retried successfully
+        done_path = ledger.finish()
+
+        self.assertEqual(done_path.suffix, DONE_SUFFIX)
+        self.assertFalse(ledger.path.exists())
+        with open(done_path, encoding="utf-8") as f:
+            lines = f.read().splitlines()
+        self.assertTrue(lines[0].startswith("#run\t"))
+        self.assertTrue(lines[-1].startswith("#complete\t"))
+        self.assertEqual([line.split("\t")[:2] for line in lines[1:-1]], [[hashed, SENT] for hashed in recipients[:6]])
+        self.assertEqual(self.ledgers.interrupted(), [])
+
+    def test_next_occurrence_starts_fresh(self):
+        ledger = self.ledgers.open("task-1", self.scheduled)
+        ledger.record(hashes(1)[0], SENT)
+        ledger.close()
+
+        later = self.ledgers.open("task-1", self.scheduled + datetime.timedelta(days=1))
+        try:
+            self.assertEqual(later.sent_count, 0)
+        finally:
+            later.close()
+        # The earlier occurrence's ledger was closed out, not left to resume
+        task_dir = os.path.join(self.directory.name, "task-1")
+        self.assertEqual(sorted(name.endswith(DONE_SUFFIX) for name in os.listdir(task_dir)), [False, True])
+
+    def _lookup_seconds(self, ledger, probes: list) -> float:
+        started = time.perf_counter()
+        for hashed in probes:
+            ledger.is_sent(hashed)
+        return (time.perf_counter() - started) / len(probes)
+
+    def test_lookup_time_is_constant_at_1m_recipients(self):
+        probes = hashes(1000) + hashes(1000, start=2000000)  # Half sent, half not
+
+        small = self.ledgers.open("small", self.scheduled)
+        large = self.ledgers.open("large", self.scheduled)
+        try:
+            for hashed in hashes(1000):
+                small.record(hashed, SENT)
+            started = time.perf_counter()
+            for hashed in hashes(1000000):
+                large.record(hashed, SENT)
+            large.commit()
+            record_seconds = time.perf_counter() - started
+
+            small_lookup = min(self._lookup_seconds(small, probes) for _ in range(5))
+            large_lookup = min(self._lookup_seconds(large, probes) for _ in range(5))
+        finally:
+            small.close()
+            large.close()
+
+        # Reloading a 1M-recipient ledger, as a resumed run does
+        started = time.perf_counter()
+        reloaded = self.ledgers.open("large", self.scheduled)
+        reload_seconds = time.perf_counter() - started
+        try:
+            self.assertEqual(reloaded.sent_count, 1000000)
+        finally:
+            reloaded.close()
+
+        print(f"\n1M recipients: recorded in {record_seconds:.1f}s, reloaded in {reload_seconds:.1f}s; "
+              f"lookup {small_lookup * 1e9:.0f} ns with 1k sent, {large_lookup * 1e9:.0f} ns with 1M", end="")
+        self.assertLess(large_lookup, 3 * small_lookup)
+        self.assertTrue(reloaded.path.name.endswith(OPEN_SUFFIX))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,66 @@
+import time
+import unittest
+
+from core.mail_transport import InMemoryTransport
+from core.send_queue import SendQueue
+
+LATENCY = 0.01  # Seconds per send, standing in for an Outlook COM round trip
+MESSAGES = 200
+
+def messages(count: int) -> list:
+    return [(f"user{i}@example.com", "Subject", "Body", []) for i in range(count)]
+
+class FailingTransport(InMemoryTransport):
+    """A fake Outlook that starts failing after ``healthy`` sends"""
+
+    def __init__(self, healthy: int):
+        super().__init__()
+        self.healthy = healthy
+        self.sends = 0
+
+    def send_email(self, recipient, subject, body, attachments=None):
+        with self._lock:
+            self.sends += 1
+            healthy = self.sends <= self.healthy
+        return healthy and super().send_email(recipient, subject, body, attachments)
+
+class SendQueueBenchmark(unittest.TestCase):
+    """Send throughput against a fake Outlook with injected latency"""
+
+    def _throughput(self, workers: int, **kwargs) -> float:
+        transport = InMemoryTransport(latency=LATENCY)
+        queue = SendQueue(transport, workers=workers, **kwargs)
+        try:
+            started = time.perf_counter()
+            results = [result for _, result, _ in queue.send_batch(messages(MESSAGES))]
+            seconds = time.perf_counter() - started
+        finally:
+            queue.shutdown()
+        self.assertTrue(all(results))
+        return MESSAGES / seconds
+
+    def test_throughput_scales_with_workers(self):
+        rates = {workers: self._throughput(workers) for workers in (1, 2, 4, 8)}
+        print(f"\n{LATENCY * 1000:.0f} ms per send: " +
+              ", ".join(f"{workers} workers {rate:,.0f}/s" for workers, rate in rates.items()), end="")
+        self.assertGreater(rates[8], 4 * rates[1])
+
+    def test_rate_limit_caps_throughput(self):
+        rate = self._throughput(8, rate_per_minute=6000, burst=10)  # 100 per second
+        print(f"\nlimited to 6,000/min: {rate * 60:,.0f}/min", end="")
+        self.assertLess(rate, 100 * 1.1)  # The initial burst of 10 comes on top
+
+    def test_backs_off_when_sends_fail(self):
+        queue = SendQueue(FailingTransport(healthy=20), workers=4)
+        try:
+            started = time.perf_counter()
+            results = [result for _, result, _ in queue.send_batch(messages(40))]
+            seconds = time.perf_counter() - started
+        finally:
+            queue.shutdown()
+        self.assertEqual(results.count(True), 20)
+        self.assertEqual(queue.controller.limit, 2)
+        self.assertGreaterEqual(seconds, 1.0)  # The first backoff pauses sending for a second
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,86 @@
+import os
+import sys
+import json
+import subprocess
+import tempfile
+import unittest
+import importlib.util
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Startup budgets; the measurements are printed so regressions show up before they fail
+IMPORT_BUDGET_MS = 500  # python -X importtime, cumulative for core.task_manager
+FIRST_PAINT_BUDGET_MS = 2000  # Process start to the main window's first paint
+
+# Loaded on first use, never at startup
+DEFERRED_MODULES = ("pandas", "ollama", "win32com", "PySide6", "http.server")
+
+FIRST_PAINT_SCRIPT = """
+import os, sys, time
+started = time.perf_counter()
+from PySide6.QtWidgets import QApplication
+from PySide6.QtCore import QObject, QEvent, QTimer
+import main
+
+class FirstPaint(QObject):
+    def eventFilter(self, watched, event):
+        if event.type() == QEvent.Paint:
+            print((time.perf_counter() - started) * 1000, flush=True)
+            os._exit(0)
+        return False
+
+app = QApplication(sys.argv)
+window = main.MainWindow()
+first_paint = FirstPaint()
+window.installEventFilter(first_paint)
+window.show()
+QTimer.singleShot(30000, lambda: os._exit(1))  # Never painted
+app.exec()
+"""
+
+def run_python(args: list, cwd: str) -> subprocess.CompletedProcess:
+    env = dict(os.environ, PYTHONPATH=ROOT, QT_QPA_PLATFORM="offscreen")
+    return subprocess.run([sys.executable] + args, cwd=cwd, env=env, capture_output=True, text=True, timeout=120)
+
+class StartupBenchmark(unittest.TestCase):
+    """Import time and time to first paint, against fixed budgets"""
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_task_manager_import_time(self):
+        code = "import sys, json, core.task_manager; print(json.dumps(sorted(sys.modules)))"
+        result = run_python(["-X", "importtime", "-c", code], self.directory.name)
+        self.assertEqual(result.returncode, 0, result.stderr)
+
+        # Lines look like "import time:  <self us> | <cumulative us> | <indented module name>"
+        timings = {}
+        for line in result.stderr.splitlines():
+            if line.startswith("import time:") and not line.endswith("imported package"):
+                own, cumulative, name = line[len("import time:"):].split("|")
+                timings[name.strip()] = (int(own), int(cumulative))
+
+        total_ms = timings["core.task_manager"][1] / 1000
+        print(f"\nimport core.task_manager: {total_ms:.0f} ms (budget {IMPORT_BUDGET_MS} ms); slowest modules:")
+        for name, (own, _) in sorted(timings.items(), key=lambda item: item[1][0], reverse=True)[:10]:
+            print(f"  {own / 1000:7.1f} ms  {name}")
+
+        modules = json.loads(result.stdout)
+        loaded = [name for name in DEFERRED_MODULES if name in modules]
+        self.assertEqual(loaded, [], "imported at startup instead of on first use")
+        self.assertLess(total_ms, IMPORT_BUDGET_MS)
+
+    @unittest.skipUnless(importlib.util.find_spec("PySide6") and importlib.util.find_spec("dotenv"),
+                         "needs PySide6 and python-dotenv")
+    def test_time_to_first_paint(self):
+        result = run_python(["-c", FIRST_PAINT_SCRIPT], self.directory.name)
+        self.assertEqual(result.returncode, 0, result.stderr)
+        first_paint_ms = float(result.stdout.split()[-1])
+        print(f"\ntime to first paint: {first_paint_ms:.0f} ms (budget {FIRST_PAINT_BUDGET_MS} ms)", end="")
+        self.assertLess(first_paint_ms, FIRST_PAINT_BUDGET_MS)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,90 @@
+import os
+import sqlite3
+import tempfile
+import threading
+import unittest
+
+from core.storage_backend import create_storage_backend, SQLiteDatabase
+
+def task(task_id: str) -> dict:
+    return {"id": task_id, "name": task_id, "active": True, "next_run": "2099-01-01T00:00:00"}
+
+class ReadOnlyStorageTest(unittest.TestCase):
+    """Opening storage read-only, as the daemon's list/tail/export commands do, must not write"""
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.data_dir = os.path.join(self.directory.name, "data")
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_json_read_only_creates_nothing(self):
+        storage = create_storage_backend("json", self.data_dir, read_only=True)
+        try:
+            self.assertEqual(storage.tasks.all(), [])
+            self.assertEqual(storage.events.query()[0], [])
+            with self.assertRaises(RuntimeError):
+                storage.tasks.save(task("task-1"))
+        finally:
+            storage.close()
+        self.assertFalse(os.path.exists(self.data_dir))
+
+    def test_json_read_only_sees_tasks(self):
+        writer = create_storage_backend("json", self.data_dir)
+        try:
+            writer.tasks.save(task("task-1"))
+        finally:
+            writer.close()
+        storage = create_storage_backend("json", self.data_dir, read_only=True)
+        try:
+            self.assertEqual([t["id"] for t in storage.tasks.all()], ["task-1"])
+        finally:
+            storage.close()
+
+    def test_sqlite_read_only_leaves_database_untouched(self):
+        writer = create_storage_backend("sqlite", self.data_dir)
+        try:
+            writer.tasks.save(task("task-1"))
+        finally:
+            writer.close()
+        path = os.path.join(self.data_dir, "storage.db")
+        with open(path, "rb") as f:
+            before = f.read()
+
+        storage = create_storage_backend("sqlite", self.data_dir, read_only=True)
+        try:
+            self.assertEqual([t["id"] for t in storage.tasks.all()], ["task-1"])
+            self.assertEqual(storage.events.query()[0], [])
+            with self.assertRaises(sqlite3.OperationalError):
+                storage.tasks.save(task("task-2"))
+        finally:
+            storage.close()
+        with open(path, "rb") as f:
+            self.assertEqual(f.read(), before)
+
+    def test_sqlite_read_only_needs_a_database(self):
+        with self.assertRaises(FileNotFoundError):
+            create_storage_backend("sqlite", self.data_dir, read_only=True)
+        self.assertFalse(os.path.exists(self.data_dir))
+
+    def test_close_closes_every_thread_connection(self):
+        db = SQLiteDatabase(os.path.join(self.data_dir, "storage.db"))
+        connections = [db.connection()]
+
+        def connect():
+            connections.append(db.connection())
+        threads = [threading.Thread(target=connect) for _ in range(3)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        db.close()
+        self.assertEqual(len(connections), 4)
+        for connection in connections:
+            with self.assertRaises(sqlite3.ProgrammingError):
+                connection.execute("SELECT 1")
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,74 @@
+import os
+import datetime
+import tempfile
+import unittest
+
+class DueTasksTest(unittest.TestCase):
+    """Dispatching due tasks: next runs are advanced together, before any task runs"""
+
+    def setUp(self):
+        from core.task_manager import TaskManager
+
+        self.cwd = os.getcwd()
+        self.directory = tempfile.TemporaryDirectory()
+        os.chdir(self.directory.name)
+        self.manager = TaskManager()
+        self.writes = []
+        self.submitted = []
+        save_many = self.manager.tasks.save_many
+
+        def spy_save_many(tasks):
+            self.writes.append([task["id"] for task in tasks])
+            save_many(tasks)
+        self.manager.tasks.save_many = spy_save_many
+
+        def submit(task, acquired=False, scheduled=None):
+            self.submitted.append(task["id"])
+            self.manager.executor.release(task["id"])
+            return True
+        self.manager.executor.submit = submit
+
+    def tearDown(self):
+        self.manager.close()
+        os.chdir(self.cwd)
+        self.directory.cleanup()
+
+    def _task(self, task_id: str, next_run: datetime.datetime, **fields) -> dict:
+        task = {"id": task_id, "name": task_id, "active": True, "recurrence": "daily",
+                "next_run": next_run.isoformat()}
+        task.update(fields)
+        return task
+
+    def test_overdue_tasks_are_advanced_with_one_write(self):
+        missed = datetime.datetime.now() - datetime.timedelta(hours=3)
+        tasks = [self._task(f"task-{i}", missed) for i in range(50)]
+        tasks.append(self._task("skipped", missed, misfire_policy="skip"))
+        self.manager.tasks.save_many(tasks)
+        self.writes.clear()
+
+        self.manager.catch_up_missed_runs()
+        self.manager.process_due_tasks()
+
+        # One write for the skipped task at catch-up, one for everything dispatched
+        self.assertEqual(self.writes, [["skipped"], [f"task-{i}" for i in range(50)]])
+        self.assertEqual(sorted(self.submitted), sorted(f"task-{i}" for i in range(50)))
+        now = datetime.datetime.now().isoformat()
+        self.assertTrue(all(task["next_run"] > now for task in self.manager.get_all_tasks()))
+
+    def test_task_that_cannot_be_advanced_is_not_run(self):
+        missed = datetime.datetime.now() - datetime.timedelta(hours=3)
+        self.manager.tasks.save_many([self._task("broken", missed, recurrence="monthly", anchor_day="x"),
+                                      self._task("fine", missed)])
+        self.writes.clear()
+
+        with self.assertLogs("core.task_manager", "ERROR"):
+            self.manager.process_due_tasks()
+
+        self.assertEqual(self.submitted, ["fine"])
+        self.assertEqual(self.writes, [["fine"]])
+        self.assertEqual(self.manager.get_task("broken")["next_run"], missed.isoformat())
+        # The lock was released, so the task can run once it is fixed
+        self.assertTrue(self.manager.executor.try_acquire("broken"))
+
+if __name__ == "__main__":
+    unittest.main()
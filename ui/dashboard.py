@@ -309,39 +309,16 @@ class DashboardWidget(QWidget):
             message_item = QTableWidgetItem(log.get("message", ""))
             self.logs_table.setItem(i, 2, message_item)
         
-        # Update email stats
-        email_logs = [log for log in self.task_manager.get_logs() 
-                     if "Email sent to" in log.get("message", "")
-                     and self._is_within_days(log.get("timestamp", ""), 7)]
-        self.emails_sent_count.setText(str(len(email_logs)))
-        
-        # Update response stats
-        response_logs = [log for log in self.task_manager.get_logs() 
-                        if "Processed and stored" in log.get("message", "")
-                        and self._is_within_days(log.get("timestamp", ""), 7)]
-        self.responses_count.setText(str(len(response_logs)))
+        # Update email and response stats from the hourly counters
+        counts = self.task_manager.get_event_counts(datetime.timedelta(days=7))
+        self.emails_sent_count.setText(str(counts.get("email_sent", 0)))
+        self.responses_count.setText(str(counts.get("summary_stored", 0)))
     
     def _delete_task(self, task_id):
         """Delete a task"""
         self.task_manager.delete_task(task_id)
         self.refresh_data()
     
-    def _is_within_days(self, timestamp_str, days):
-        """Check if a timestamp is within the specified number of days"""
-        if not timestamp_str:
-            return False
-            
-        try:
-            timestamp = datetime.datetime.fromisoformat(timestamp_str)
-            now = datetime.datetime.now()
-            delta = now - timestamp
-            return delta.days < days
-        except:
-            return False
-    
     def _run_task_now(self, task_id):
-        """Execute a task immediately"""
-        task = self.task_manager.get_task(task_id)
-        if task:
-            self.task_manager._execute_task(task)
-            self.refresh_data()
\ No newline at end of file
+        """Queue a task to run immediately on the worker pool"""
+        self.task_manager.run_task_now(task_id)
\ No newline at end of file
@@ -1,7 +1,7 @@
 from PySide6.QtWidgets import (
     QWidget, QVBoxLayout, QHBoxLayout, QLabel, QPushButton, 
     QTableWidget, QTableWidgetItem, QHeaderView, QComboBox,
-    QSpinBox, QFormLayout
+    QSpinBox, QFormLayout, QLineEdit
 )
 from PySide6.QtCore import Qt
 from PySide6.QtGui import QColor
@@ -52,6 +52,16 @@ class LogsWidget(QWidget):
         self.log_level_filter.currentIndexChanged.connect(self.apply_filters)
         filter_form.addRow("Level:", self.log_level_filter)
         
+        self.log_period_filter = QComboBox()
+        self.log_period_filter.addItems(["All Time", "Last 24 Hours", "Last 7 Days", "Last 30 Days"])
+        self.log_period_filter.currentIndexChanged.connect(self.apply_filters)
+        filter_form.addRow("Period:", self.log_period_filter)
+        
+        self.log_search = QLineEdit()
+        self.log_search.setPlaceholderText("Search messages")
+        self.log_search.returnPressed.connect(self.apply_filters)
+        filter_form.addRow("Search:", self.log_search)
+        
         self.log_limit = QSpinBox()
         self.log_limit.setMinimum(10)
         self.log_limit.setMaximum(1000)
@@ -105,17 +115,22 @@ class LogsWidget(QWidget):
         if not self.task_manager:
             return
             
-        # Get logs
-        logs = self.task_manager.get_logs(1000)  # Get a large number to filter
-        
-        # Apply level filter
+        # Level filter
         level_filter = self.log_level_filter.currentText().lower()
-        if level_filter != "all levels":
-            logs = [log for log in logs if log.get("level", "").lower() == level_filter]
-        
-        # Apply limit
-        limit = self.log_limit.value()
-        logs = logs[:limit]
+        level = None if level_filter == "all levels" else level_filter
+        
+        # Period filter
+        period_days = {"Last 24 Hours": 1, "Last 7 Days": 7, "Last 30 Days": 30}
+        days = period_days.get(self.log_period_filter.currentText())
+        since = datetime.datetime.now() - datetime.timedelta(days=days) if days else None
+        
+        # Get logs (filtering and limit are applied by the indexed query)
+        logs, _ = self.task_manager.query_logs(
+            level=level,
+            since=since,
+            text=self.log_search.text().strip() or None,
+            limit=self.log_limit.value()
+        )
         
         # Update logs table
         self.logs_table.setRowCount(0)
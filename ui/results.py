@@ -65,6 +65,33 @@ class ResultsWidget(QWidget):
         results_layout.addWidget(self.results_table)
         splitter.addWidget(results_frame)
         
+        # Recent runs table
+        runs_frame = QFrame()
+        runs_layout = QVBoxLayout(runs_frame)
+        runs_layout.setContentsMargins(0, 0, 0, 0)
+        
+        runs_label = QLabel("Recent Runs")
+        runs_label.setStyleSheet("font-size: 16px; font-weight: bold;")
+        runs_layout.addWidget(runs_label)
+        
+        self.runs_table = QTableWidget()
+        self.runs_table.setColumnCount(4)
+        self.runs_table.setHorizontalHeaderLabels([
+            "Started", "Duration", "Status", "Slowest Stages"
+        ])
+        self.runs_table.horizontalHeader().setSectionResizeMode(0, QHeaderView.ResizeToContents)
+        self.runs_table.horizontalHeader().setSectionResizeMode(1, QHeaderView.ResizeToContents)
+        self.runs_table.horizontalHeader().setSectionResizeMode(2, QHeaderView.ResizeToContents)
+        self.runs_table.horizontalHeader().setSectionResizeMode(3, QHeaderView.Stretch)
+        self.runs_table.verticalHeader().setVisible(False)
+        self.runs_table.setEditTriggers(QTableWidget.NoEditTriggers)
+        self.runs_table.setSelectionBehavior(QTableWidget.SelectRows)
+        self.runs_table.setAlternatingRowColors(True)
+        self.runs_table.selectionModel().selectionChanged.connect(self._show_run_details)
+        
+        runs_layout.addWidget(self.runs_table)
+        splitter.addWidget(runs_frame)
+        
         # Detail view
         detail_frame = QFrame()
         detail_layout = QVBoxLayout(detail_frame)
@@ -81,7 +108,7 @@ class ResultsWidget(QWidget):
         splitter.addWidget(detail_frame)
         
         # Set initial splitter sizes
-        splitter.setSizes([300, 400])
+        splitter.setSizes([300, 150, 400])
         main_layout.addWidget(splitter)
     
     def load_results(self, task: Dict[str, Any]):
@@ -114,6 +141,70 @@ class ResultsWidget(QWidget):
             # Store full result data
             for col in range(3):
                 self.results_table.item(i, col).setData(Qt.UserRole, result)
+        
+        self._load_runs(task)
+    
+    def _load_runs(self, task: Dict[str, Any]):
+        """Load the latest run records for a task"""
+        runs = self.task_manager.get_runs(task.get("id"))
+        
+        self.runs_table.setRowCount(0)
+        for i, run in enumerate(runs):
+            self.runs_table.insertRow(i)
+            
+            started = datetime.datetime.fromisoformat(run["started"])
+            self.runs_table.setItem(i, 0, QTableWidgetItem(started.strftime("%Y-%m-%d %H:%M:%S")))
+            self.runs_table.setItem(i, 1, QTableWidgetItem(self._format_ms(run.get("duration_ms", 0))))
+            
+            status_item = QTableWidgetItem("Success" if run.get("success") else "Failed")
+            status_item.setForeground(QColor("#16a34a") if run.get("success") else QColor("#dc2626"))
+            self.runs_table.setItem(i, 2, status_item)
+            
+            stages = sorted(run.get("stages", {}).items(), key=lambda item: item[1]["total_ms"], reverse=True)
+            slowest = ", ".join(f"{name} {self._format_ms(stage['total_ms'])}" for name, stage in stages[:3])
+            self.runs_table.setItem(i, 3, QTableWidgetItem(slowest))
+            
+            for col in range(4):
+                self.runs_table.item(i, col).setData(Qt.UserRole, run)
+    
+    @staticmethod
+    def _format_ms(ms: float) -> str:
+        """Format a duration in milliseconds for display"""
+        if ms >= 1000:
+            return f"{ms / 1000:.1f} s"
+        return f"{ms:.0f} ms"
+    
+    def _show_run_details(self):
+        """Show the per-stage timings of the selected run"""
+        selected_items = self.runs_table.selectedItems()
+        if not selected_items:
+            return
+        
+        run = selected_items[0].data(Qt.UserRole)
+        
+        details = []
+        details.append(f"Run started: {datetime.datetime.fromisoformat(run['started']).strftime('%Y-%m-%d %H:%M:%S')}")
+        details.append(f"Duration: {self._format_ms(run.get('duration_ms', 0))}")
+        details.append(f"Status: {'Success' if run.get('success') else 'Failed'}")
+        details.append("\nStages:")
+        for name, stage in sorted(run.get("stages", {}).items(), key=lambda item: item[1]["total_ms"], reverse=True):
+            details.append(
+                f"  {name}: {stage['count']} call(s), total {self._format_ms(stage['total_ms'])}, "
+                f"slowest {self._format_ms(stage['max_ms'])}"
+            )
+        if "recipients" in run:
+            details.append(f"\nRecipients: {run['recipients']}")
+            for reason, count in run.get("removed", {}).items():
+                details.append(f"  Removed ({reason}): {count}")
+        if "bcc_messages" in run:
+            details.append(f"Sent in BCC batches: {run['bcc_messages']} emails")
+        if "attachment_bytes_sent" in run:
+            details.append(f"Attachments: {run.get('attachment_bytes_read', 0) / 1048576:.1f} MB read, "
+                           f"{run['attachment_bytes_sent'] / 1048576:.1f} MB sent")
+        if run.get("trace_file"):
+            details.append(f"\nTrace file: {run['trace_file']}")
+        
+        self.detail_text.setText("\n".join(details))
     
     def _show_details(self):
         """Show details for selected result"""
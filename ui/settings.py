@@ -3,22 +3,32 @@ from PySide6.QtWidgets import (
     QLineEdit, QComboBox, QFormLayout, QGroupBox, QCheckBox,
     QSpinBox, QFileDialog
 )
-from PySide6.QtCore import Qt
+from PySide6.QtCore import Qt, QObject, Signal
 from PySide6.QtGui import QFont
 
 import os
 import json
-import ollama
 from typing import Callable, Dict, Any
 
+class ModelListSignals(QObject):
+    """Carries model list updates from the registry's refresh thread to the GUI thread"""
+    models_changed = Signal(list)
+
 class SettingsWidget(QWidget):
-    def __init__(self, navigate_callback):
+    def __init__(self, navigate_callback, model_registry):
         super().__init__()
         self.navigate_callback = navigate_callback
+        self.model_registry = model_registry
         self.settings_file = "data/settings.json"
+        self.saved_ai_model = ""
+        
+        self.model_signals = ModelListSignals()
+        self.model_signals.models_changed.connect(self.update_model_list)
+        self.model_registry.add_listener(self.model_signals.models_changed.emit)
         
         self.setup_ui()
         self.load_settings()
+        self.update_model_list()
     
     def setup_ui(self):
         """Set up the settings UI"""
@@ -51,9 +61,17 @@ class SettingsWidget(QWidget):
         ai_group = QGroupBox("AI Settings")
         ai_layout = QFormLayout(ai_group)
         
+        model_layout = QHBoxLayout()
+        
         self.ai_model = QComboBox()
-        self.update_model_list()  # Fetch available models from Ollama
-        ai_layout.addRow("AI Model:", self.ai_model)
+        self.ai_model.setToolTip("Applied from the next summarization on")
+        model_layout.addWidget(self.ai_model, 1)
+        
+        refresh_models_btn = QPushButton("Refresh")
+        refresh_models_btn.clicked.connect(self.model_registry.refresh)
+        model_layout.addWidget(refresh_models_btn)
+        
+        ai_layout.addRow("AI Model:", model_layout)
         
         main_layout.addWidget(ai_group)
         
@@ -69,6 +87,71 @@ class SettingsWidget(QWidget):
         self.auto_bcc.setPlaceholderText("Enter email address to BCC on all outgoing emails")
         email_layout.addRow("Auto BCC:", self.auto_bcc)
         
+        self.send_workers = QSpinBox()
+        self.send_workers.setMinimum(1)
+        self.send_workers.setMaximum(16)
+        self.send_workers.setValue(2)
+        self.send_workers.setToolTip("Emails sent in parallel, each through its own Outlook connection. Applied on restart.")
+        email_layout.addRow("Send Workers:", self.send_workers)
+        
+        self.send_rate_per_minute = QSpinBox()
+        self.send_rate_per_minute.setMinimum(0)
+        self.send_rate_per_minute.setMaximum(100000)
+        self.send_rate_per_minute.setValue(0)
+        self.send_rate_per_minute.setSuffix(" per minute")
+        self.send_rate_per_minute.setSpecialValueText("No limit")
+        self.send_rate_per_minute.setToolTip("Stay within your mail account's sending quota. Applied on restart.")
+        email_layout.addRow("Send Rate Limit:", self.send_rate_per_minute)
+        
+        self.max_attachment_mb = QSpinBox()
+        self.max_attachment_mb.setMinimum(0)
+        self.max_attachment_mb.setMaximum(1000)
+        self.max_attachment_mb.setValue(20)
+        self.max_attachment_mb.setSuffix(" MB")
+        self.max_attachment_mb.setSpecialValueText("No limit")
+        self.max_attachment_mb.setToolTip("Tasks with a larger attachment fail before sending anything. Applied on restart.")
+        email_layout.addRow("Maximum Attachment Size:", self.max_attachment_mb)
+        
+        self.bcc_batch_size = QSpinBox()
+        self.bcc_batch_size.setMinimum(0)
+        self.bcc_batch_size.setMaximum(500)
+        self.bcc_batch_size.setValue(100)
+        self.bcc_batch_size.setSuffix(" recipients")
+        self.bcc_batch_size.setSpecialValueText("Off")
+        self.bcc_batch_size.setToolTip("When a task's subject and body use no recipient columns, send one email "
+                                       "per this many recipients, all in BCC. Applied on restart.")
+        email_layout.addRow("BCC Batch Size:", self.bcc_batch_size)
+        
+        self.mail_transport = QComboBox()
+        self.mail_transport.addItem("Outlook", "outlook")
+        self.mail_transport.addItem("SMTP server", "smtp")
+        self.mail_transport.setToolTip("Used by tasks that do not choose one. Applied on restart.")
+        email_layout.addRow("Send Via:", self.mail_transport)
+        
+        self.smtp_host = QLineEdit()
+        self.smtp_host.setPlaceholderText("smtp.example.com")
+        email_layout.addRow("SMTP Server:", self.smtp_host)
+        
+        self.smtp_port = QSpinBox()
+        self.smtp_port.setMinimum(1)
+        self.smtp_port.setMaximum(65535)
+        self.smtp_port.setValue(587)
+        email_layout.addRow("SMTP Port:", self.smtp_port)
+        
+        self.smtp_security = QComboBox()
+        self.smtp_security.addItem("STARTTLS", "starttls")
+        self.smtp_security.addItem("SSL/TLS", "ssl")
+        self.smtp_security.addItem("None", "none")
+        email_layout.addRow("SMTP Security:", self.smtp_security)
+        
+        self.smtp_username = QLineEdit()
+        self.smtp_username.setToolTip("The password is read from the SMTP_PASSWORD environment variable (or .env file)")
+        email_layout.addRow("SMTP Username:", self.smtp_username)
+        
+        self.smtp_sender = QLineEdit()
+        self.smtp_sender.setPlaceholderText("Defaults to the username")
+        email_layout.addRow("SMTP Sender:", self.smtp_sender)
+        
         main_layout.addWidget(email_group)
         
         # Storage settings
@@ -97,8 +180,57 @@ class SettingsWidget(QWidget):
         self.backup_interval.setSuffix(" days")
         storage_layout.addRow("Backup Interval:", self.backup_interval)
         
+        self.storage_backend = QComboBox()
+        self.storage_backend.addItem("JSON files", "json")
+        self.storage_backend.addItem("SQLite database", "sqlite")
+        self.storage_backend.setToolTip("Applied on restart. Run 'python -m core.migrate_storage' to copy existing data.")
+        storage_layout.addRow("Storage Engine:", self.storage_backend)
+        
+        self.recipient_cache_mb = QSpinBox()
+        self.recipient_cache_mb.setMinimum(0)
+        self.recipient_cache_mb.setMaximum(100000)
+        self.recipient_cache_mb.setValue(256)
+        self.recipient_cache_mb.setSuffix(" MB")
+        self.recipient_cache_mb.setSpecialValueText("Disabled")
+        self.recipient_cache_mb.setToolTip("Parsed copies of recipient files are kept in data/cache/recipients. Applied on restart.")
+        storage_layout.addRow("Recipient Cache:", self.recipient_cache_mb)
+        
         main_layout.addWidget(storage_group)
         
+        # Log settings
+        log_group = QGroupBox("Log Settings")
+        log_layout = QFormLayout(log_group)
+        
+        self.log_retention_days = QSpinBox()
+        self.log_retention_days.setMinimum(0)
+        self.log_retention_days.setMaximum(3650)
+        self.log_retention_days.setValue(90)
+        self.log_retention_days.setSuffix(" days")
+        self.log_retention_days.setSpecialValueText("Keep forever")
+        log_layout.addRow("Keep Logs For:", self.log_retention_days)
+        
+        self.log_max_entries = QSpinBox()
+        self.log_max_entries.setMinimum(0)
+        self.log_max_entries.setMaximum(100000000)
+        self.log_max_entries.setSingleStep(100000)
+        self.log_max_entries.setValue(1000000)
+        self.log_max_entries.setSpecialValueText("No limit")
+        log_layout.addRow("Maximum Entries:", self.log_max_entries)
+        
+        self.log_max_size_mb = QSpinBox()
+        self.log_max_size_mb.setMinimum(0)
+        self.log_max_size_mb.setMaximum(100000)
+        self.log_max_size_mb.setValue(500)
+        self.log_max_size_mb.setSuffix(" MB")
+        self.log_max_size_mb.setSpecialValueText("No limit")
+        log_layout.addRow("Maximum Size:", self.log_max_size_mb)
+        
+        self.log_archive_compression = QComboBox()
+        self.log_archive_compression.addItems(["gzip", "zstd"])
+        log_layout.addRow("Archive Compression:", self.log_archive_compression)
+        
+        main_layout.addWidget(log_group)
+        
         # Application settings
         app_group = QGroupBox("Application Settings")
         app_layout = QFormLayout(app_group)
@@ -110,29 +242,45 @@ class SettingsWidget(QWidget):
         self.minimize_to_tray.setChecked(True)
         app_layout.addRow("System Tray:", self.minimize_to_tray)
         
+        self.max_concurrent_tasks = QSpinBox()
+        self.max_concurrent_tasks.setMinimum(1)
+        self.max_concurrent_tasks.setMaximum(16)
+        self.max_concurrent_tasks.setValue(4)
+        self.max_concurrent_tasks.setToolTip("Applied on restart")
+        app_layout.addRow("Concurrent Tasks:", self.max_concurrent_tasks)
+        
+        self.trace_task_runs = QCheckBox("Export a trace of each task run to logs/traces")
+        self.trace_task_runs.setToolTip("Open the files in chrome://tracing or ui.perfetto.dev. Applied on restart.")
+        app_layout.addRow("Tracing:", self.trace_task_runs)
+        
+        self.metrics_port = QSpinBox()
+        self.metrics_port.setMinimum(0)
+        self.metrics_port.setMaximum(65535)
+        self.metrics_port.setSpecialValueText("Disabled")
+        self.metrics_port.setToolTip("Serve Prometheus metrics on http://127.0.0.1:<port>/metrics. Applied on restart.")
+        app_layout.addRow("Metrics Port:", self.metrics_port)
+        
         main_layout.addWidget(app_group)
         
         main_layout.addStretch()
     
-    def update_model_list(self):
-        """Fetch and update the list of available models from Ollama"""
-        try:
-            # Clear existing items
-            self.ai_model.clear()
-            
-            # Get list of models from Ollama
-            models = ollama.list()
-            
-            # Add models to combobox
-            for model in models['models']:
-                self.ai_model.addItem(model['name'])
-                
-            if self.ai_model.count() == 0:
-                self.ai_model.addItem("No models found")
-                
-        except Exception as e:
-            print(f"Error fetching models from Ollama: {e}")
-            self.ai_model.addItem("Error fetching models")
+    def update_model_list(self, models=None):
+        """Fill the model list from the registry's last known models"""
+        if models is None:
+            models = self.model_registry.models()
+        selected = self.ai_model.currentText() or self.saved_ai_model
+        
+        # Clear existing items
+        self.ai_model.clear()
+        
+        # Add models to combobox, keeping the configured one even if Ollama is unreachable
+        self.ai_model.addItems(models)
+        if selected and selected not in models:
+            self.ai_model.addItem(selected)
+        if self.ai_model.count() == 0:
+            self.ai_model.addItem("No models found")
+        elif selected:
+            self.ai_model.setCurrentText(selected)
     
     def load_settings(self):
         """Load settings from file"""
@@ -142,20 +290,43 @@ class SettingsWidget(QWidget):
                     settings = json.load(f)
                 
                 # AI settings
-                self.ai_model.setCurrentText(settings.get("ai_model", ""))
+                self.saved_ai_model = settings.get("ai_model", "")
                 
                 # Email settings
                 self.default_signature.setText(settings.get("default_signature", ""))
                 self.auto_bcc.setText(settings.get("auto_bcc", ""))
+                self.send_workers.setValue(settings.get("send_workers", 2))
+                self.send_rate_per_minute.setValue(settings.get("send_rate_per_minute", 0))
+                self.max_attachment_mb.setValue(settings.get("max_attachment_mb", 20))
+                self.bcc_batch_size.setValue(settings.get("bcc_batch_size", 100))
+                self.mail_transport.setCurrentIndex(max(0, self.mail_transport.findData(settings.get("mail_transport", "outlook"))))
+                self.smtp_host.setText(settings.get("smtp_host", ""))
+                self.smtp_port.setValue(settings.get("smtp_port", 587))
+                self.smtp_security.setCurrentIndex(max(0, self.smtp_security.findData(settings.get("smtp_security", "starttls"))))
+                self.smtp_username.setText(settings.get("smtp_username", ""))
+                self.smtp_sender.setText(settings.get("smtp_sender", ""))
                 
                 # Storage settings
                 self.default_storage_dir.setText(settings.get("default_storage_dir", ""))
                 self.auto_backup.setChecked(settings.get("auto_backup", False))
                 self.backup_interval.setValue(settings.get("backup_interval", 7))
+                self.storage_backend.setCurrentIndex(
+                    max(0, self.storage_backend.findData(settings.get("storage_backend", "json")))
+                )
+                self.recipient_cache_mb.setValue(settings.get("recipient_cache_mb", 256))
+                
+                # Log settings
+                self.log_retention_days.setValue(settings.get("log_retention_days", 90))
+                self.log_max_entries.setValue(settings.get("log_max_entries", 1000000))
+                self.log_max_size_mb.setValue(settings.get("log_max_size_mb", 500))
+                self.log_archive_compression.setCurrentText(settings.get("log_archive_compression", "gzip"))
                 
                 # Application settings
                 self.run_at_startup.setChecked(settings.get("run_at_startup", False))
                 self.minimize_to_tray.setChecked(settings.get("minimize_to_tray", True))
+                self.max_concurrent_tasks.setValue(settings.get("max_concurrent_tasks", 4))
+                self.trace_task_runs.setChecked(settings.get("trace_task_runs", False))
+                self.metrics_port.setValue(settings.get("metrics_port", 0))
         except Exception as e:
             print(f"Error loading settings: {e}")
     
@@ -165,22 +336,47 @@ class SettingsWidget(QWidget):
             # Create data directory if it doesn't exist
             os.makedirs(os.path.dirname(self.settings_file), exist_ok=True)
             
+            ai_model = self.ai_model.currentText()
+            if ai_model == "No models found":
+                ai_model = self.saved_ai_model
+            
             settings = {
                 # AI settings
-                "ai_model": self.ai_model.currentText(),
+                "ai_model": ai_model,
                 
                 # Email settings
                 "default_signature": self.default_signature.text(),
                 "auto_bcc": self.auto_bcc.text(),
+                "send_workers": self.send_workers.value(),
+                "send_rate_per_minute": self.send_rate_per_minute.value(),
+                "max_attachment_mb": self.max_attachment_mb.value(),
+                "bcc_batch_size": self.bcc_batch_size.value(),
+                "mail_transport": self.mail_transport.currentData(),
+                "smtp_host": self.smtp_host.text(),
+                "smtp_port": self.smtp_port.value(),
+                "smtp_security": self.smtp_security.currentData(),
+                "smtp_username": self.smtp_username.text(),
+                "smtp_sender": self.smtp_sender.text(),
                 
                 # Storage settings
                 "default_storage_dir": self.default_storage_dir.text(),
                 "auto_backup": self.auto_backup.isChecked(),
                 "backup_interval": self.backup_interval.value(),
+                "storage_backend": self.storage_backend.currentData(),
+                "recipient_cache_mb": self.recipient_cache_mb.value(),
+                
+                # Log settings (applied on next start)
+                "log_retention_days": self.log_retention_days.value(),
+                "log_max_entries": self.log_max_entries.value(),
+                "log_max_size_mb": self.log_max_size_mb.value(),
+                "log_archive_compression": self.log_archive_compression.currentText(),
                 
                 # Application settings
                 "run_at_startup": self.run_at_startup.isChecked(),
-                "minimize_to_tray": self.minimize_to_tray.isChecked()
+                "minimize_to_tray": self.minimize_to_tray.isChecked(),
+                "max_concurrent_tasks": self.max_concurrent_tasks.value(),
+                "trace_task_runs": self.trace_task_runs.isChecked(),
+                "metrics_port": self.metrics_port.value()
             }
             
             with open(self.settings_file, "w") as f:
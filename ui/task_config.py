@@ -81,6 +81,26 @@ class TaskConfigWidget(QWidget):
         self.task_next_run.setCalendarPopup(True)
         basic_layout.addRow("Next Run:", self.task_next_run)
         
+        self.task_priority = QComboBox()
+        self.task_priority.addItems(["High", "Normal", "Low"])
+        self.task_priority.setCurrentText("Normal")
+        self.task_priority.setToolTip("Higher priority tasks get Outlook and AI time first")
+        basic_layout.addRow("Priority:", self.task_priority)
+        
+        self.task_weight = QSpinBox()
+        self.task_weight.setMinimum(1)
+        self.task_weight.setMaximum(10)
+        self.task_weight.setValue(1)
+        self.task_weight.setToolTip("Share of Outlook and AI time relative to tasks of the same priority")
+        basic_layout.addRow("Weight:", self.task_weight)
+        
+        self.task_misfire_policy = QComboBox()
+        self.task_misfire_policy.addItem("Run once, then resume schedule", "run_once")
+        self.task_misfire_policy.addItem("Run every missed time", "run_all")
+        self.task_misfire_policy.addItem("Skip missed runs", "skip")
+        self.task_misfire_policy.setToolTip("What to do when the application was not running at the scheduled time")
+        basic_layout.addRow("Missed Runs:", self.task_misfire_policy)
+        
         scroll_layout.addWidget(basic_group)
         
         # Tab widget for different sections
@@ -109,6 +129,12 @@ class TaskConfigWidget(QWidget):
         self.email_body.setMinimumHeight(200)
         email_form.addRow("Body:", self.email_body)
         
+        self.mail_transport = QComboBox()
+        self.mail_transport.addItem("Default (from settings)", "")
+        self.mail_transport.addItem("Outlook", "outlook")
+        self.mail_transport.addItem("SMTP server", "smtp")
+        email_form.addRow("Send Via:", self.mail_transport)
+        
         # Recipients section
         recipients_group = QGroupBox("Recipients")
         recipients_layout = QVBoxLayout(recipients_group)
@@ -337,10 +363,21 @@ class TaskConfigWidget(QWidget):
             next_run.hour, next_run.minute, next_run.second
         ))
         
+        self.task_priority.setCurrentText(task.get("priority", "normal").capitalize())
+        self.task_weight.setValue(task.get("weight", 1))
+        self.task_misfire_policy.setCurrentIndex(
+            max(0, self.task_misfire_policy.findData(task.get("misfire_policy", "run_once")))
+        )
+        
         # Email settings
         self.send_emails.setChecked(task.get("send_emails", False))
         self.email_subject.setText(task.get("email_subject", ""))
         self.email_body.setText(task.get("email_body", ""))
+        transport = task.get("mail_transport", "")
+        if transport and self.mail_transport.findData(transport) < 0:
+            # Chosen outside this form (such as the in-memory test transport); keep it when saving
+            self.mail_transport.addItem(transport, transport)
+        self.mail_transport.setCurrentIndex(max(0, self.mail_transport.findData(transport)))
         
         # Recipients
         self.recipients_list.clear()
@@ -387,11 +424,15 @@ class TaskConfigWidget(QWidget):
         self.task_active.setChecked(True)
         self.task_recurrence.setCurrentText("One-time")
         self.task_next_run.setDateTime(QDateTime.currentDateTime().addSecs(3600))
+        self.task_priority.setCurrentText("Normal")
+        self.task_weight.setValue(1)
+        self.task_misfire_policy.setCurrentIndex(0)
         
         # Email settings
         self.send_emails.setChecked(True)
         self.email_subject.clear()
         self.email_body.clear()
+        self.mail_transport.setCurrentIndex(0)
         
         # Recipients
         self.recipients_list.clear()
@@ -428,11 +469,15 @@ class TaskConfigWidget(QWidget):
             "active": self.task_active.isChecked(),
             "recurrence": self.task_recurrence.currentText().lower(),
             "next_run": self.task_next_run.dateTime().toPython().isoformat(),
+            "priority": self.task_priority.currentText().lower(),
+            "weight": self.task_weight.value(),
+            "misfire_policy": self.task_misfire_policy.currentData(),
             
             # Email settings
             "send_emails": self.send_emails.isChecked(),
             "email_subject": self.email_subject.text(),
             "email_body": self.email_body.toPlainText(),
+            "mail_transport": self.mail_transport.currentData(),
             
             # Recipients
             "manual_recipients": [